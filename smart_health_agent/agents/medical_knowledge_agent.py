@@ -1,8 +1,120 @@
 """
 Medical Knowledge Agent for searching and retrieving relevant health insights
 """
+import itertools
+import threading
+import document_processor as dp
 from core.state import HealthAgentState
 from core.rag_system import rag_system
+from config import HEART_RATE_NORMAL_RANGE, SLEEP_OPTIMAL_RANGE, ACTIVITY_THRESHOLD, KNOWLEDGE_BUCKETED_RETRIEVAL
+
+# Same thresholds as HealthMetricsAgent's vitals status; "unknown" when a metric is missing
+HEART_RATE_BUCKETS = ("low", "normal", "high", "unknown")
+SLEEP_BUCKETS = ("short", "optimal", "long", "unknown")
+ACTIVITY_BUCKETS = ("sedentary", "active", "unknown")
+
+def metric_buckets(health_data: dict) -> tuple:
+    """Quantize heart rate, sleep and steps into (heart_rate, sleep, activity) buckets"""
+    hr = health_data.get('heart_rate')
+    sleep_hrs = health_data.get('sleep_hours')
+    steps = health_data.get('steps')
+    hr_min, hr_max = HEART_RATE_NORMAL_RANGE
+    sleep_min, sleep_max = SLEEP_OPTIMAL_RANGE
+
+    if hr is None:
+        hr_bucket = "unknown"
+    else:
+        hr_bucket = "low" if hr < hr_min else "high" if hr > hr_max else "normal"
+    if sleep_hrs is None:
+        sleep_bucket = "unknown"
+    else:
+        sleep_bucket = "short" if sleep_hrs < sleep_min else "long" if sleep_hrs > sleep_max else "optimal"
+    if steps is None:
+        activity_bucket = "unknown"
+    else:
+        activity_bucket = "active" if steps >= ACTIVITY_THRESHOLD else "sedentary"
+    return hr_bucket, sleep_bucket, activity_bucket
+
+def bucket_query(buckets: tuple) -> str:
+    """Search query describing a bucket combination"""
+    hr_bucket, sleep_bucket, activity_bucket = buckets
+    hr_min, hr_max = HEART_RATE_NORMAL_RANGE
+    sleep_min, sleep_max = SLEEP_OPTIMAL_RANGE
+    heart_rate = {
+        "low": f"low resting heart rate (below {hr_min} bpm, bradycardia)",
+        "normal": f"normal resting heart rate ({hr_min}-{hr_max} bpm)",
+        "high": f"high resting heart rate (above {hr_max} bpm, tachycardia)"
+    }.get(hr_bucket, "heart rate")
+    sleep = {
+        "short": f"insufficient sleep (under {sleep_min} hours)",
+        "optimal": f"healthy sleep duration ({sleep_min}-{sleep_max} hours)",
+        "long": f"excessive sleep (over {sleep_max} hours)"
+    }.get(sleep_bucket, "sleep")
+    activity = {
+        "sedentary": f"sedentary lifestyle (under {ACTIVITY_THRESHOLD} steps per day)",
+        "active": f"active lifestyle ({ACTIVITY_THRESHOLD}+ steps per day)"
+    }.get(activity_bucket, "physical activity")
+    return f"Health insights for: {heart_rate}, {sleep}, {activity}"
+
+class BucketedKnowledgeCache:
+    """
+    Retrieved knowledge per metric bucket combination.
+
+    Entries belong to one version of the RAG index and are dropped when it
+    changes. precompute() fills all combinations right after indexing, so the
+    knowledge step at request time is a dictionary lookup.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._index_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self):
+        if self._index_version != rag_system.index_version:
+            self._entries = {}
+            self._index_version = rag_system.index_version
+
+    def get(self, buckets: tuple) -> list:
+        """Retrieved texts for a bucket combination, searching (and caching) on a miss"""
+        with self._lock:
+            self._check_version()
+            texts = self._entries.get(buckets)
+            if texts is not None:
+                self.hits += 1
+                return texts
+            self.misses += 1
+            index_version = self._index_version
+        texts = [dp.document_text(doc) for doc in rag_system.similarity_search(bucket_query(buckets))]
+        self._store(buckets, texts, index_version)
+        return texts
+
+    def _store(self, buckets: tuple, texts: list, index_version: int):
+        # Dropped if the index changed while searching
+        with self._lock:
+            self._check_version()
+            if index_version == self._index_version:
+                self._entries[buckets] = texts
+
+    def precompute(self):
+        """Retrieve knowledge for every bucket combination of the current index"""
+        if not rag_system.vectorstore:
+            return 0
+        combinations = list(itertools.product(HEART_RATE_BUCKETS, SLEEP_BUCKETS, ACTIVITY_BUCKETS))
+        index_version = rag_system.index_version
+        for buckets in combinations:
+            texts = [dp.document_text(doc) for doc in rag_system.similarity_search(bucket_query(buckets))]
+            self._store(buckets, texts, index_version)
+        print(f"[KNOWLEDGE_AGENT] Precomputed knowledge for {len(combinations)} metric bucket combinations.")
+        return len(combinations)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+# Global knowledge cache instance
+knowledge_cache = BucketedKnowledgeCache()
 
 class MedicalKnowledgeAgent:
     """
@@ -16,22 +128,28 @@ class MedicalKnowledgeAgent:
         """Search medical documents for relevant insights"""
         print("\n[KNOWLEDGE_AGENT] Processing medical knowledge...")
 
-        relevant_docs = []
+        retrieved = []
         num_docs = 0
         
         # Check if the vectorstore is initialized
         if rag_system.vectorstore:
-            query = f"Health insights for: Heart rate: {state.health_data.get('heart_rate')}, Sleep: {state.health_data.get('sleep_hours')} hours, Steps: {state.health_data.get('steps')}"
             try:
-                relevant_docs = rag_system.similarity_search(query)
-                num_docs = len(relevant_docs)
+                if KNOWLEDGE_BUCKETED_RETRIEVAL:
+                    buckets = metric_buckets(state.health_data)
+                    print(f"[KNOWLEDGE_AGENT] Metric buckets: {buckets}")
+                    retrieved = knowledge_cache.get(buckets)
+                    state.rag_context["metric_buckets"] = buckets
+                else:
+                    query = f"Health insights for: Heart rate: {state.health_data.get('heart_rate')}, Sleep: {state.health_data.get('sleep_hours')} hours, Steps: {state.health_data.get('steps')}"
+                    retrieved = [dp.document_text(doc) for doc in rag_system.similarity_search(query)]
+                num_docs = len(retrieved)
             except Exception as e:
                 print(f"[KNOWLEDGE_AGENT] Error during similarity search: {e}")
-                relevant_docs = []
+                retrieved = []
         else:
             print("[KNOWLEDGE_AGENT] Warning: Global vectorstore not initialized. Skipping document search.")
 
-        state.rag_context["retrieved_knowledge"] = "\n".join([doc.page_content for doc in relevant_docs])
+        state.rag_context["retrieved_knowledge"] = "\n".join(retrieved)
         state.rag_context["current_metrics"] = state.health_data
         
         state.agent_reasoning["MedicalKnowledge"] = f"Retrieved {num_docs} medical documents" if rag_system.vectorstore else "Skipped document retrieval (vectorstore not initialized)"
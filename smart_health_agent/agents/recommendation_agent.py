@@ -44,7 +44,7 @@ class RecommendationAgent:
         """
         
         response = ""
-        for chunk in llm_manager.stream_response(prompt):
+        for chunk in llm_manager.stream_response(prompt, task="recommendation"):
             response += chunk
             state.streaming_response = response
         
@@ -3,8 +3,23 @@ Weather Agent for retrieving and analyzing weather conditions
 """
 import json
 import requests
+from config import OPEN_METEO_URL
 from core.llm_manager import llm_manager
 
+REQUIRED_FIELDS = ['exercise_recommendation', 'intensity_level', 'weather_alert', 'reasoning']
+
+# Output constraint for the recommendation call (Ollama format)
+RECOMMENDATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "exercise_recommendation": {"type": "string", "enum": ["Indoor", "Outdoor"]},
+        "intensity_level": {"type": "string", "enum": ["Low", "Moderate", "High"]},
+        "weather_alert": {"type": "boolean"},
+        "reasoning": {"type": "string"}
+    },
+    "required": REQUIRED_FIELDS
+}
+
 class WeatherAgent:
     """
     Agent: Retrieves and analyzes weather conditions to inform health recommendations.
@@ -16,7 +31,7 @@ class WeatherAgent:
     
     def get_weather_data(self, latitude: float, longitude: float) -> dict:
         """Get weather data and provide exercise recommendations"""
-        base_url = "https://api.open-meteo.com/v1/forecast"
+        base_url = OPEN_METEO_URL
         params = {
             "latitude": latitude,
             "longitude": longitude,
@@ -70,15 +85,12 @@ class WeatherAgent:
                 - reasoning: brief explanation
                 Return only JSON."""
             
-            response = llm_manager.invoke(prompt)
-            llm_recommendations = json.loads(response)
-            
-            # Verify all required fields exist
-            required_fields = ['exercise_recommendation', 'intensity_level', 'weather_alert', 'reasoning']
-            if all(field in llm_recommendations for field in required_fields):
-                weather_data.update(llm_recommendations)
-            else:
-                weather_data.update(self._get_fallback_recommendations(weather_data))
+            # Streamed into a JSON parser that stops at the end of the object and checks
+            # the required fields; same weather, same answer, so valid results are cached
+            llm_recommendations = llm_manager.invoke_json(
+                prompt, task="weather_json", required=REQUIRED_FIELDS, schema=RECOMMENDATION_SCHEMA, cache=True
+            )
+            weather_data.update({field: llm_recommendations[field] for field in REQUIRED_FIELDS})
                 
         except (json.JSONDecodeError, Exception) as e:
             print(f"[WEATHER_AGENT] LLM recommendation failed: {e}")
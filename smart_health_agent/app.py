@@ -3,7 +3,8 @@ Main application entry point for Smart Health Agent
 """
 from ui.gradio_interface import create_gradio_layout
 from ui.event_handlers import event_handlers
-from config import SERVER_NAME, SERVER_PORT, ENABLE_SHARE, ENABLE_DEBUG
+from core.warmup import warmup
+from config import SERVER_NAME, SERVER_PORT, ENABLE_SHARE, ENABLE_DEBUG, WARMUP_ENABLED
 
 def create_ui():
     """
@@ -25,6 +26,10 @@ def main():
         default_concurrency_limit=2
     )
     
+    # Heavy components load in the background while the UI binds its port
+    if WARMUP_ENABLED:
+        warmup.start()
+    
     demo.launch(
         server_name=SERVER_NAME,
         server_port=SERVER_PORT,
@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for Smart Health Agent
+
+Run from the smart_health_agent directory, e.g.:
+    python -m benchmarks.bench_ingest /path/to/pdf_folder
+    python -m benchmarks.bench_e2e --output bench.json  # fake Ollama/Open-Meteo, no GPU needed
+"""
@@ -0,0 +1,96 @@
+"""
+Benchmark: recall@k and query latency of the FAISS index types against the flat baseline
+"""
+import argparse
+import time
+import numpy as np
+import faiss
+from core.faiss_index import FaissIndexBuilder
+
+def make_vectors(num_vectors, num_queries, dim, num_clusters=256, seed=0):
+    """Clustered, normalized synthetic embeddings (sentence embeddings are not uniform)"""
+    rng = np.random.RandomState(seed)
+    centers = rng.normal(size=(num_clusters, dim)).astype(np.float32)
+    def sample(n):
+        points = centers[rng.randint(num_clusters, size=n)] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+        return points / np.linalg.norm(points, axis=1, keepdims=True)
+    return sample(num_vectors), sample(num_queries)
+
+def recall_at_k(found, truth):
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+def time_queries(index, queries, k):
+    """Search one query at a time (as similarity_search does); returns (ids, latencies in ms)"""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids[i] = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return ids, np.array(latencies)
+
+def run(index_type, vectors, queries, truth, k, builder_args, sweep):
+    """Build one index type and measure recall/latency for each query-time setting"""
+    builder = FaissIndexBuilder(index_type, **builder_args)
+    start = time.perf_counter()
+    index = builder.build(vectors)
+    index.add(vectors)
+    build_s = time.perf_counter() - start
+    size_mb = faiss.serialize_index(index).nbytes / 2**20
+
+    results = []
+    for value in sweep:
+        if index_type in ("ivf", "ivfpq"):
+            builder.nprobe = value
+            setting = f"nprobe={value}"
+        elif index_type == "hnsw":
+            builder.ef_search = value
+            setting = f"efSearch={value}"
+        else:
+            setting = "-"
+        builder.configure(index)
+        ids, latencies = time_queries(index, queries, k)
+        results.append({
+            "type": index_type,
+            "setting": setting,
+            "build_s": build_s,
+            "size_mb": size_mb,
+            "recall": recall_at_k(ids, truth),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99))
+        })
+        if index_type not in ("ivf", "ivfpq", "hnsw"):
+            break
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=["flat", "sq8", "ivf", "ivfpq", "hnsw"])
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    args = parser.parse_args()
+
+    vectors, queries = make_vectors(args.vectors, args.queries, args.dim)
+    baseline = faiss.IndexFlatL2(args.dim)
+    baseline.add(vectors)
+    _, truth = baseline.search(queries, args.k)
+
+    builder_args = {"nlist": args.nlist, "pq_m": args.pq_m, "hnsw_m": args.hnsw_m, "train_size": args.vectors}
+    print(f"{args.vectors} vectors, dim {args.dim}, {args.queries} queries, recall@{args.k} vs flat")
+    print(f"{'type':>6} {'setting':>13} {'build s':>8} {'size MB':>8} {'recall':>7} {'p50 ms':>7} {'p99 ms':>7}")
+    for index_type in args.types:
+        sweep = {"ivf": args.nprobe, "ivfpq": args.nprobe, "hnsw": args.ef_search}.get(index_type, [None])
+        for r in run(index_type, vectors, queries, truth, args.k, builder_args, sweep):
+            print(f"{r['type']:>6} {r['setting']:>13} {r['build_s']:>8.1f} {r['size_mb']:>8.1f} "
+                  f"{r['recall']:>7.3f} {r['p50_ms']:>7.3f} {r['p99_ms']:>7.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Micro-benchmark: caption lookup with TextBlockIndex vs the linear block scan
+"""
+import argparse
+import random
+import time
+import fitz
+import document_processor as dp
+
+PAGE_HEIGHT = 792.0
+PAGE_WIDTH = 612.0
+
+def make_page(num_blocks, num_items, seed=0):
+    """Synthetic page: num_blocks text blocks in reading order and num_items item bboxes"""
+    rng = random.Random(seed)
+    line_height = PAGE_HEIGHT / max(num_blocks, 1)
+    blocks = []
+    for i in range(num_blocks):
+        y0 = i * line_height
+        x0 = rng.uniform(0, PAGE_WIDTH / 2)
+        blocks.append((x0, y0, x0 + rng.uniform(50, PAGE_WIDTH / 2), y0 + line_height * 0.8, f"block {i}", i, 0))
+    items = []
+    for _ in range(num_items):
+        y0 = rng.uniform(0, PAGE_HEIGHT * 0.9)
+        items.append(fitz.Rect(0, y0, PAGE_WIDTH, y0 + rng.uniform(10, PAGE_HEIGHT * 0.1)))
+    return blocks, items
+
+def run(num_blocks, num_items, repeat):
+    """Time caption lookups for every item on a synthetic page"""
+    blocks, items = make_page(num_blocks, num_items)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        linear = [dp.extract_text_around_item(blocks, bbox, PAGE_HEIGHT) for bbox in items]
+    linear_time = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        block_index = dp.TextBlockIndex(blocks)
+        indexed = [dp.extract_text_around_item(blocks, bbox, PAGE_HEIGHT, block_index=block_index) for bbox in items]
+    indexed_time = (time.perf_counter() - start) / repeat
+
+    return {
+        "blocks": num_blocks,
+        "items": num_items,
+        "linear_ms": linear_time * 1000,
+        "indexed_ms": indexed_time * 1000,
+        "speedup": linear_time / indexed_time if indexed_time else 0.0,
+        "identical": linear == indexed
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'blocks':>8} {'items':>6} {'linear ms':>10} {'indexed ms':>11} {'speedup':>8} {'identical':>10}")
+    for num_blocks in args.blocks:
+        r = run(num_blocks, args.items, args.repeat)
+        print(f"{r['blocks']:>8} {r['items']:>6} {r['linear_ms']:>10.2f} {r['indexed_ms']:>11.2f} "
+              f"{r['speedup']:>8.1f} {str(r['identical']):>10}")
+
+if __name__ == "__main__":
+    main()
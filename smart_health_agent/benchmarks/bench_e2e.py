@@ -0,0 +1,235 @@
+"""
+Benchmark: end-to-end ingest, initialization workflow and concurrent chat latency
+
+Runs against the fake Ollama and Open-Meteo servers (or real ones via --ollama-url
+and --open-meteo-url) on a generated PDF corpus, in a scratch working directory.
+Reports p50/p95/p99 latencies, chat throughput per number of concurrent
+sessions and ingest rates as JSON, for diffing between releases:
+    python -m benchmarks.bench_e2e --sessions 1,4,16 --output bench.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import fitz
+import numpy as np
+from benchmarks.fake_services import FakeOllama, FakeOpenMeteo
+from benchmarks.synthetic_corpus import generate_corpus
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def latency_summary(seconds) -> dict:
+    """count, mean and p50/p95/p99/max in milliseconds"""
+    if not len(seconds):
+        return {"count": 0}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": int(len(ms)),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2)
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=SOURCE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def bench_ingest(corpus: dict) -> dict:
+    """Cold build of the vectorstore from the corpus, then a reload with nothing changed"""
+    from config import FAISS_DB_PATH
+    from core.rag_system import rag_system
+
+    rag_system.reset_vectorstore()
+    shutil.rmtree(FAISS_DB_PATH, ignore_errors=True)
+    start = time.perf_counter()
+    vectorstore = rag_system.setup_vectorstore(corpus["folder"])
+    cold = time.perf_counter() - start
+    chunks = vectorstore.num_vectors() if vectorstore else 0
+
+    rag_system.reset_vectorstore()
+    start = time.perf_counter()
+    rag_system.setup_vectorstore(corpus["folder"])
+    reload = time.perf_counter() - start
+    return {
+        "docs": corpus["docs"],
+        "pages": corpus["pages"],
+        "chunks": chunks,
+        "cold_seconds": round(cold, 3),
+        "pages_per_second": round(corpus["pages"] / cold, 2) if cold else None,
+        "chunks_per_second": round(chunks / cold, 2) if cold else None,
+        "mb_per_second": round(corpus["bytes"] / 2**20 / cold, 3) if cold else None,
+        "reload_seconds": round(reload, 3)
+    }
+
+def bench_initialize(folder: str, runs: int) -> dict:
+    """The "Activate Agent System" handler: index load, weather, agent workflow and recommendation"""
+    from ui.event_handlers import event_handlers
+
+    timings, failures = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        status = None
+        for status, _ in event_handlers.on_initialize(folder):
+            pass
+        timings.append(time.perf_counter() - start)
+        if not status or status.startswith("Error"):
+            failures += 1
+    return {
+        "first_ms": round(timings[0] * 1000, 2) if timings else None,
+        "latency": latency_summary(timings),
+        "failures": failures
+    }
+
+def _chat_session(session_id: str, messages: int, results: list, lock: threading.Lock):
+    from ui.event_handlers import event_handlers
+
+    history = []
+    for turn in range(messages):
+        question = f"Question {turn} in {session_id}: how do sleep and daily steps affect resting heart rate?"
+        start = time.perf_counter()
+        first_token = None
+        for _, history in event_handlers.chat_interact(question, history, use_cache=False, session_id=session_id):
+            if first_token is None and history and history[-1]["content"].strip("`"):
+                first_token = time.perf_counter() - start
+        total = time.perf_counter() - start
+        failed = "Error generating response" in history[-1]["content"]
+        with lock:
+            results.append((first_token, total, failed))
+
+def bench_chat(levels, messages: int) -> list:
+    """Chat latency and throughput with N sessions chatting concurrently, for each N in levels"""
+    report = []
+    for sessions in levels:
+        results, lock = [], threading.Lock()
+        threads = [
+            threading.Thread(target=_chat_session, args=(f"bench-{sessions}-{i}", messages, results, lock))
+            for i in range(sessions)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+        report.append({
+            "sessions": sessions,
+            "messages": len(results),
+            "wall_seconds": round(wall, 3),
+            "messages_per_second": round(len(results) / wall, 3) if wall else None,
+            "time_to_first_token": latency_summary([r[0] for r in results if r[0] is not None]),
+            "latency": latency_summary([r[1] for r in results]),
+            "failures": sum(1 for r in results if r[2])
+        })
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=10, help="synthetic PDFs in the corpus")
+    parser.add_argument("--pages", type=int, default=5, help="pages per PDF")
+    parser.add_argument("--charts", action="store_true", help="add a chart image per PDF (for when image parsing is enabled)")
+    parser.add_argument("--corpus", help="use this PDF folder instead of a generated corpus")
+    parser.add_argument("--init-runs", type=int, default=5, help="runs of the initialization workflow")
+    parser.add_argument("--sessions", default="1,4,16", help="comma-separated concurrent chat session counts")
+    parser.add_argument("--messages", type=int, default=3, help="chat messages per session")
+    parser.add_argument("--ttft", type=float, default=0.2, help="fake Ollama time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="fake Ollama token rate")
+    parser.add_argument("--num-tokens", type=int, default=60, help="fake Ollama tokens per text response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of fake Ollama requests failing")
+    parser.add_argument("--weather-latency", type=float, default=0.05, help="fake Open-Meteo latency (s)")
+    parser.add_argument("--ollama-url", help="benchmark a real Ollama server instead of the fake")
+    parser.add_argument("--open-meteo-url", help="use a real Open-Meteo forecast URL instead of the fake")
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="deterministic hash embeddings instead of the embedding model (pipeline overhead only)")
+    parser.add_argument("--workdir", help="working directory for the index and caches (default: a temp dir)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    fake_ollama = None if args.ollama_url else FakeOllama(
+        args.ttft, args.tokens_per_second, args.num_tokens, args.failure_rate
+    ).start()
+    fake_weather = None if args.open_meteo_url else FakeOpenMeteo(args.weather_latency).start()
+    # Must be set before config is imported
+    os.environ["OLLAMA_HOST"] = args.ollama_url or fake_ollama.url
+    os.environ["OPEN_METEO_URL"] = args.open_meteo_url or fake_weather.forecast_url
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="health_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    output = os.path.abspath(args.output) if args.output else None
+    corpus_folder = os.path.abspath(args.corpus) if args.corpus else None
+    # Index, embedding and response caches are relative paths: keep them out of the source tree
+    os.chdir(workdir)
+    if corpus_folder:
+        pdfs = [name for name in os.listdir(corpus_folder) if name.lower().endswith(".pdf")]
+        corpus = {
+            "folder": corpus_folder, "docs": len(pdfs), "charts": None,
+            "pages": sum(fitz.open(os.path.join(corpus_folder, name)).page_count for name in pdfs),
+            "bytes": sum(os.path.getsize(os.path.join(corpus_folder, name)) for name in pdfs)
+        }
+    else:
+        corpus = generate_corpus(os.path.join(workdir, "corpus"), args.docs, args.pages, args.charts)
+
+    import config
+    from core.rag_system import rag_system
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        rag_system.embeddings = DeterministicFakeEmbedding(size=384)
+
+    levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+    # The app logs with print; keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        ingest = bench_ingest(corpus)
+        initialize = bench_initialize(corpus["folder"], args.init_runs)
+        chat = bench_chat(levels, args.messages)
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": vars(args),
+            "config": {
+                "default_model": config.DEFAULT_MODEL,
+                "embedding_model": "fake" if args.fake_embeddings else config.EMBEDDING_MODEL,
+                "faiss_index_type": config.FAISS_INDEX_TYPE,
+                "faiss_num_shards": config.FAISS_NUM_SHARDS,
+                "hybrid_search": config.ENABLE_HYBRID_SEARCH
+            }
+        },
+        "ingest": ingest,
+        "initialize": initialize,
+        "chat": chat
+    }
+    from core.llm_manager import llm_manager
+    report["llm"] = llm_manager.pool_stats()
+    if fake_ollama is not None:
+        report["fake_ollama"] = fake_ollama.stats()
+    if fake_weather is not None:
+        report["fake_open_meteo"] = fake_weather.stats()
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {output}")
+    else:
+        print(text)
+    if not args.workdir:
+        os.chdir(SOURCE_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
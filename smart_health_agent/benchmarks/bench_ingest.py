@@ -0,0 +1,67 @@
+"""
+Benchmark: PDF ingestion scaling from 1 to N worker processes
+"""
+import argparse
+import os
+import time
+import document_processor as dp
+
+def _fingerprint(docs):
+    """Order-sensitive summary of a document list used to verify determinism"""
+    return [(doc.metadata.get("source"), doc.page_content) for doc in docs]
+
+def _worker_counts(max_workers):
+    """1, 2, 4, ... up to max_workers (always including max_workers)"""
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+def run(folder, max_workers, pages_per_task, repeat):
+    """Time process_health_documents for increasing worker counts"""
+    baseline_time = None
+    baseline_docs = None
+    results = []
+
+    for workers in _worker_counts(max_workers):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            docs = dp.process_health_documents(
+                folder, is_directory=True, num_workers=workers, pages_per_task=pages_per_task
+            )
+            timings.append(time.perf_counter() - start)
+        elapsed = min(timings)
+
+        if baseline_docs is None:
+            baseline_time, baseline_docs = elapsed, _fingerprint(docs)
+        identical = _fingerprint(docs) == baseline_docs
+
+        results.append({
+            "workers": workers,
+            "seconds": elapsed,
+            "documents": len(docs),
+            "speedup": baseline_time / elapsed if elapsed else 0.0,
+            "identical": identical
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("folder", help="Folder containing PDF documents")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages-per-task", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per worker count (best time is reported)")
+    args = parser.parse_args()
+
+    results = run(args.folder, args.max_workers, args.pages_per_task, args.repeat)
+
+    print(f"\n{'workers':>8} {'seconds':>10} {'speedup':>8} {'docs':>8} {'identical':>10}")
+    for r in results:
+        print(f"{r['workers']:>8} {r['seconds']:>10.2f} {r['speedup']:>8.2f} {r['documents']:>8} {str(r['identical']):>10}")
+
+if __name__ == "__main__":
+    main()
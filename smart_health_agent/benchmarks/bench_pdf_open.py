@@ -0,0 +1,70 @@
+"""
+Benchmark: peak memory of parsing a PDF opened by path or mmap vs from a bytes copy
+
+Each mode runs in a fresh subprocess so its peak RSS (ru_maxrss) is measured
+in isolation.
+"""
+import argparse
+import json
+import mmap
+import os
+import resource
+import subprocess
+import sys
+import time
+
+MODES = ("copy", "path", "mmap")
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def child(mode, pdf_path):
+    """Parse every page of pdf_path and print timing and peak memory as JSON"""
+    import document_processor as dp
+
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "copy":
+        # Previous behaviour: the whole file is read into a bytes object first
+        with open(pdf_path, "rb") as f:
+            source = f.read()
+    elif mode == "mmap":
+        with open(pdf_path, "rb") as f:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    else:
+        source = pdf_path
+    num_docs = sum(1 for _ in dp.iter_pdf_documents(source))
+    print(json.dumps({
+        "mode": mode,
+        "documents": num_docs,
+        "seconds": time.perf_counter() - start,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": _peak_rss_mb()
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf", help="PDF file to parse (use a large scanned PDF)")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.pdf)
+        return
+
+    size_mb = os.path.getsize(args.pdf) / (1024 * 1024)
+    print(f"PDF: {args.pdf} ({size_mb:.1f} MB)")
+    print(f"{'mode':>6} {'docs':>8} {'seconds':>9} {'peak RSS MB':>12} {'over baseline MB':>17}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_pdf_open", args.pdf, "--child", mode],
+            check=True, capture_output=True, text=True
+        ).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{r['mode']:>6} {r['documents']:>8} {r['seconds']:>9.2f} {r['peak_rss_mb']:>12.1f} "
+              f"{r['peak_rss_mb'] - r['baseline_rss_mb']:>17.1f}")
+
+if __name__ == "__main__":
+    main()
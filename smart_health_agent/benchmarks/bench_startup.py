@@ -0,0 +1,85 @@
+"""
+Benchmark: cold import times of the app's entry modules, and optionally the background warm-up
+
+Each import is timed in a fresh interpreter. With --check, the run fails if a
+module exceeds its budget, so heavy imports creeping back into the UI path are caught.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules on the path to binding the UI must stay light; the rest are reported for reference
+BUDGETS = {
+    "ui.event_handlers": 0.5,
+    "core.warmup": 0.5
+}
+REFERENCE_MODULES = ["core.rag_system", "core.workflow"]
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+WARMUP_SNIPPET = """
+import json, time
+t = time.perf_counter()
+from core.warmup import warmup
+warmup.start()
+warmup.wait({timeout})
+status = warmup.status()
+status["total_seconds"] = time.perf_counter() - t
+print(json.dumps(status))
+"""
+
+def time_import(module, repeat):
+    """Median seconds to import module in a fresh interpreter, or None if it fails to import"""
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)], capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return None
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def run_warmup(timeout):
+    """Run the background warm-up in a fresh interpreter and return its status"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", WARMUP_SNIPPET.format(timeout=timeout)], capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1:], "process_seconds": time.perf_counter() - start}
+    status = json.loads(result.stdout.strip().splitlines()[-1])
+    status["process_seconds"] = time.perf_counter() - start
+    return status
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", action="store_true", help="also time the background warm-up")
+    parser.add_argument("--warmup-timeout", type=float, default=600)
+    parser.add_argument("--check", action="store_true", help="exit with an error if a budget is exceeded")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':>20} {'import s':>9} {'budget s':>9}")
+    for module in list(BUDGETS) + REFERENCE_MODULES:
+        seconds = time_import(module, args.repeat)
+        budget = BUDGETS.get(module)
+        shown = f"{seconds:.3f}" if seconds is not None else "error"
+        print(f"{module:>20} {shown:>9} {budget if budget is not None else '-':>9}")
+        if budget is not None and (seconds is None or seconds > budget):
+            failures.append(module)
+
+    if args.warmup:
+        status = run_warmup(args.warmup_timeout)
+        print(json.dumps(status, indent=2))
+
+    if args.check and failures:
+        print(f"Import budget exceeded: {', '.join(failures)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Local stand-ins for Ollama and Open-Meteo, for benchmarks without a GPU or network
+
+Both servers run in a background thread on a free localhost port; point the
+app at them through OLLAMA_HOST and OPEN_METEO_URL before importing config.
+Run standalone to keep them up for manual testing:
+    python -m benchmarks.fake_services --ttft 0.3 --tokens-per-second 40
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+WORDS = ("rest hydrate walk sleep heart rate steps moderate intensity recovery stretch "
+         "breathing routine balance nutrition protein fiber vegetables cardio strength").split()
+
+class _FakeServer:
+    """A ThreadingHTTPServer on a free port, run in a daemon thread"""
+
+    def __init__(self, handler_class):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def sample_from_schema(schema: dict, rng: random.Random):
+    """A value matching a (simple) JSON schema: objects, enums, strings, numbers, booleans"""
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: sample_from_schema(sub, rng) for key, sub in schema.get("properties", {}).items()}
+    if kind == "boolean":
+        return rng.random() < 0.5
+    if kind in ("number", "integer"):
+        return rng.randint(0, 100)
+    if kind == "array":
+        return [sample_from_schema(schema.get("items", {}), rng) for _ in range(2)]
+    return " ".join(rng.choice(WORDS) for _ in range(8))
+
+class _OllamaHandler(_JSONHandler):
+    def do_GET(self):
+        fake = self.server.fake
+        if self.path == "/api/tags":
+            self.send_json(200, {"models": [{"name": name} for name in sorted(fake.models_seen)]})
+        elif self.path == "/api/version":
+            self.send_json(200, {"version": "0.0.0-fake"})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        fake = self.server.fake
+        if self.path != "/api/generate":
+            self.send_json(404, {"error": "not found"})
+            return
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        fake.record_request(payload)
+        if not payload.get("prompt"):
+            # Load/unload request (keep_alive only)
+            self.send_json(200, {"model": payload.get("model"), "response": "", "done": True})
+            return
+        if fake.rng_random() < fake.failure_rate:
+            fake.count("failures")
+            self.send_json(503, {"error": "injected failure"})
+            return
+
+        tokens = fake.response_tokens(payload)
+        fake.enter()
+        try:
+            time.sleep(fake.ttft)
+            if payload.get("stream", True):
+                self._stream(tokens, payload)
+            else:
+                time.sleep(len(tokens) / fake.tokens_per_second)
+                self.send_json(200, {"model": payload["model"], "response": "".join(tokens), "done": True})
+        except (BrokenPipeError, ConnectionResetError):
+            fake.count("cancelled")
+        finally:
+            fake.exit()
+
+    def _stream(self, tokens, payload):
+        fake = self.server.fake
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        interval = 1.0 / fake.tokens_per_second
+        for token in tokens:
+            self._chunk({"model": payload["model"], "response": token, "done": False})
+            time.sleep(interval)
+        self._chunk({"model": payload["model"], "response": "", "done": True, "eval_count": len(tokens)})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _chunk(self, body: dict):
+        line = (json.dumps(body) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+class FakeOllama(_FakeServer):
+    """
+    Fake Ollama /api/generate with a configurable time to first token, token
+    rate and injected failure rate (HTTP 503).
+
+    Plain prompts get num_tokens words of filler text. Requests with a format
+    get JSON: a value sampled from the schema, or an object with a "response"
+    key for format="json". Counters (requests, failures, cancelled streams,
+    peak concurrency) are returned by stats().
+    """
+
+    def __init__(self, ttft: float = 0.2, tokens_per_second: float = 50.0, num_tokens: int = 60,
+                 failure_rate: float = 0.0, seed: int = 0):
+        super().__init__(_OllamaHandler)
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.num_tokens = num_tokens
+        self.failure_rate = failure_rate
+        self.models_seen = set()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "generations": 0, "failures": 0, "cancelled": 0}
+        self._in_flight = 0
+        self._peak_in_flight = 0
+
+    def rng_random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def record_request(self, payload: dict):
+        with self._lock:
+            self._counters["requests"] += 1
+            self.models_seen.add(payload.get("model"))
+
+    def enter(self):
+        with self._lock:
+            self._counters["generations"] += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+    def exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def response_tokens(self, payload: dict) -> list:
+        """The response split into tokens"""
+        with self._lock:
+            rng = random.Random(self._rng.random())
+        fmt = payload.get("format")
+        if isinstance(fmt, dict):
+            text = json.dumps(sample_from_schema(fmt, rng))
+        elif fmt:
+            text = json.dumps({"response": " ".join(rng.choice(WORDS) for _ in range(8))})
+        else:
+            return [rng.choice(WORDS) + " " for _ in range(self.num_tokens)]
+        # Roughly 4 characters per token
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "peak_in_flight": self._peak_in_flight, "models": sorted(self.models_seen)}
+
+class _OpenMeteoHandler(_JSONHandler):
+    def do_GET(self):
+        fake = self.server.fake
+        if urlparse(self.path).path != "/v1/forecast":
+            self.send_json(404, {"error": True, "reason": "not found"})
+            return
+        with fake.lock:
+            fake.requests += 1
+        time.sleep(fake.latency)
+        self.send_json(200, {"current": dict(fake.current)})
+
+class FakeOpenMeteo(_FakeServer):
+    """Fake Open-Meteo /v1/forecast returning fixed current conditions after latency seconds"""
+
+    def __init__(self, latency: float = 0.05, temperature: float = 21.0, humidity: float = 45, weather_code: int = 1):
+        super().__init__(_OpenMeteoHandler)
+        self.latency = latency
+        self.current = {"temperature_2m": temperature, "relative_humidity_2m": humidity, "weather_code": weather_code}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def forecast_url(self) -> str:
+        return f"{self.url}/v1/forecast"
+
+    def stats(self) -> dict:
+        return {"requests": self.requests}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ttft", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--num-tokens", type=int, default=60, help="tokens per plain-text response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--weather-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    ollama = FakeOllama(args.ttft, args.tokens_per_second, args.num_tokens, args.failure_rate).start()
+    weather = FakeOpenMeteo(args.weather_latency).start()
+    print(f"OLLAMA_HOST={ollama.url}")
+    print(f"OPEN_METEO_URL={weather.forecast_url}")
+    try:
+        while True:
+            time.sleep(10)
+            print(json.dumps({"ollama": ollama.stats(), "open_meteo": weather.stats()}))
+    except KeyboardInterrupt:
+        ollama.stop()
+        weather.stop()
+
+if __name__ == "__main__":
+    main()
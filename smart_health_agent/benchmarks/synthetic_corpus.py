@@ -0,0 +1,91 @@
+"""
+Synthetic medical PDF corpus for ingestion and retrieval benchmarks
+
+Generates deterministic PDFs of health-themed paragraphs, optionally with a
+captioned bar-chart image per document for the image/chart description path
+(when image parsing is enabled in document_processor):
+    python -m benchmarks.synthetic_corpus /tmp/corpus --docs 20 --pages 5 --charts
+"""
+import argparse
+import os
+import random
+from io import BytesIO
+import fitz
+from PIL import Image, ImageDraw
+
+TOPICS = {
+    "heart rate": ["resting heart rate", "bradycardia", "tachycardia", "heart rate variability", "beats per minute"],
+    "sleep": ["sleep duration", "insomnia", "circadian rhythm", "sleep hygiene", "deep sleep"],
+    "activity": ["daily steps", "sedentary behaviour", "aerobic exercise", "strength training", "walking"],
+    "nutrition": ["dietary fiber", "protein intake", "hydration", "sodium", "whole grains"],
+    "weather": ["heat exhaustion", "cold exposure", "humidity", "air quality", "indoor exercise"]
+}
+FILLER = ("is associated with", "may improve", "should be monitored alongside", "is a risk factor for",
+          "can be reduced by", "is recommended together with", "varies with age and")
+OUTCOMES = ("cardiovascular health", "blood pressure", "recovery", "mood", "metabolic health", "energy levels",
+            "long-term mortality", "insulin sensitivity")
+
+def paragraph(rng: random.Random, sentences: int = 6) -> str:
+    """A paragraph of plausible health statements"""
+    text = []
+    for _ in range(sentences):
+        topic = rng.choice(list(TOPICS))
+        term = rng.choice(TOPICS[topic])
+        number = rng.randint(5, 120)
+        text.append(f"{term.capitalize()} {rng.choice(FILLER)} {rng.choice(OUTCOMES)} "
+                    f"in about {number}% of adults studied for {topic}.")
+    return " ".join(text)
+
+def chart_png(rng: random.Random, width: int = 400, height: int = 240) -> bytes:
+    """A small bar chart image"""
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    bars = 6
+    for i in range(bars):
+        value = rng.randint(20, height - 40)
+        x = 30 + i * (width - 60) // bars
+        draw.rectangle([x, height - 20 - value, x + 30, height - 20], fill=(70, 130, 180))
+    draw.line([20, height - 20, width - 20, height - 20], fill="black", width=2)
+    draw.line([20, 20, 20, height - 20], fill="black", width=2)
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def write_pdf(path: str, rng: random.Random, pages: int, chart: bool = False):
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        page.insert_text((50, 60), f"Clinical notes, section {page_number + 1}", fontsize=14)
+        y = 90
+        for _ in range(3):
+            page.insert_textbox(fitz.Rect(50, y, 545, y + 150), paragraph(rng), fontsize=9)
+            y += 160
+        if chart and page_number == 0:
+            page.insert_textbox(fitz.Rect(50, 560, 545, 580), "Figure 1: weekly activity levels", fontsize=9)
+            page.insert_image(fitz.Rect(50, 590, 350, 770), stream=chart_png(rng))
+    doc.save(path)
+    doc.close()
+
+def generate_corpus(folder: str, docs: int = 10, pages: int = 5, charts: bool = False, seed: int = 0) -> dict:
+    """Write docs PDFs of pages pages each into folder; returns a summary"""
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    total_bytes = 0
+    for i in range(docs):
+        path = os.path.join(folder, f"synthetic_{i:04d}.pdf")
+        write_pdf(path, random.Random(rng.random()), pages, chart=charts)
+        total_bytes += os.path.getsize(path)
+    return {"folder": folder, "docs": docs, "pages": docs * pages, "charts": charts, "bytes": total_bytes}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder")
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--charts", action="store_true", help="add a bar chart image to each document")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate_corpus(args.folder, args.docs, args.pages, args.charts, args.seed))
+
+if __name__ == "__main__":
+    main()
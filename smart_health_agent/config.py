@@ -5,21 +5,91 @@ import os
 
 # Ollama configuration
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MAX_CONCURRENCY = 4  # parallel requests the Ollama server can serve (OLLAMA_NUM_PARALLEL)
+OLLAMA_REQUEST_TIMEOUT = 120  # seconds per request
+OLLAMA_MAX_RETRIES = 3
+OLLAMA_RETRY_BACKOFF = 0.5  # seconds; doubled after each retry
+OLLAMA_KEEP_ALIVE = "30m"  # how long Ollama keeps a model loaded after a request (the model pool unloads idle ones sooner)
+OLLAMA_MODEL_CONCURRENCY = {}  # per-model concurrent request limits for the LLM client (default OLLAMA_MAX_CONCURRENCY)
 
 # Model configuration
 DEFAULT_MODEL = "qwen3:4b"
 MODEL_TEMPERATURE = 0.2
 ENABLE_STREAMING = True
+VISION_MODEL = "gemma3:12b-it-q4_K_M"  # used for image/chart descriptions during ingestion
+LLM_CACHE_SIZE = 256  # in-memory responses kept for LLMManager.invoke(..., cache=True)
+LLM_CACHE_TTL = 3600  # seconds
+LLM_DISK_CACHE_ENABLED = True  # also keep cached responses on disk across restarts
+LLM_DISK_CACHE_PATH = "vectorstore/llm_response_cache.sqlite"
+LLM_DISK_CACHE_MAX_BYTES = 64 * 1024 * 1024
+SMALL_MODEL = "qwen3:1.7b"  # fast model for structured, low-temperature tasks
+# Task type -> model and options for LLMManager (no "model": the chat model, DEFAULT_MODEL unless changed in the UI)
+MODEL_ROUTES = {
+    "weather_json": {"model": SMALL_MODEL, "temperature": 0.0},
+    "image_description": {"model": VISION_MODEL},
+    "chart_explanation": {"model": DEFAULT_MODEL, "temperature": 0.2},
+    "recommendation": {},
+    "chat": {},
+    "summary": {"model": SMALL_MODEL, "temperature": 0.0}
+}
+MODEL_IDLE_TIMEOUT = 600  # seconds a routed model may stay unused before it is unloaded (0 disables)
 
 # RAG configuration
 FAISS_DB_PATH = "./faiss_health_db"
+FAISS_MANIFEST_PATH = os.path.join(FAISS_DB_PATH, "manifest.json")  # per-file hashes and chunk IDs for incremental updates
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 EMBEDDING_DEVICE = "cpu"
+EMBEDDING_ENCODE_BATCH_SIZE = 32  # texts per forward pass; texts are length-sorted to minimise padding
+EMBEDDING_NUM_WORKERS = 1  # >1 encodes with a multi-process pool on many-core CPUs
+EMBEDDING_COUNT_TOKENS = False  # report encoder tokens/s (tokenizes every batch a second time)
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_DIR = "./embedding_cache"  # cleared automatically when EMBEDDING_MODEL changes
 SIMILARITY_SEARCH_K = 3
+QUERY_CACHE_SIZE = 1024  # cached query vectors (and top-k results)
+QUERY_CACHE_TTL = 3600  # seconds
+RESULT_CACHE_ENABLED = True  # also cache top-k results per (query, k, index version)
+ENABLE_HYBRID_SEARCH = True  # fuse BM25 (exact terms, drug names, codes) with vector search
+HYBRID_FETCH_K = 20  # candidates taken from each retriever before fusion
+HYBRID_RRF_K = 60  # reciprocal rank fusion constant
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 100
 
+# FAISS index type: "flat" (exact), "ivf", "hnsw", "ivfpq" (IVF + product quantization) or "sq8" (int8 scalar quantization)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_NLIST = 1024  # IVF inverted lists; reduced automatically for small corpora
+FAISS_NPROBE = 16  # IVF lists searched per query (recall vs latency)
+FAISS_HNSW_M = 32  # HNSW links per node
+FAISS_HNSW_EF_CONSTRUCTION = 80
+FAISS_HNSW_EF_SEARCH = 64  # HNSW candidates visited per query (recall vs latency)
+FAISS_PQ_M = 16  # bytes per vector for ivfpq; must divide the embedding dimension (lowered if not)
+FAISS_TRAIN_SAMPLE_SIZE = 50000  # vectors used to train ivf/ivfpq/sq8 indexes
+FAISS_NUM_SHARDS = int(os.getenv("FAISS_NUM_SHARDS", "1"))  # >1 partitions chunks by source file into FAISS_DB_PATH/shard-<i>
+
+# Semantic answer cache for chat (same question meaning + same retrieved context -> cached answer)
+SEMANTIC_CACHE_ENABLED = True
+SEMANTIC_CACHE_THRESHOLD = 0.95  # cosine similarity between question embeddings
+SEMANTIC_CACHE_MAX_ENTRIES = 1000
+SEMANTIC_CACHE_TTL = 24 * 3600  # seconds
+
+# Chat memory (per browser session)
+CHAT_HISTORY_TOKEN_BUDGET = 1024  # recent turns kept verbatim in the chat prompt (estimated tokens)
+CHAT_SUMMARY_TOKEN_BUDGET = 256  # older turns are folded into a running summary of about this size
+CHAT_MEMORY_MAX_SESSIONS = 256
+CHAT_MEMORY_TTL = 24 * 3600  # seconds a session's memory is kept unused
+
+# Ingestion configuration
+INGEST_NUM_WORKERS = int(os.getenv("INGEST_NUM_WORKERS", "1"))  # >1 enables multi-process PDF ingestion
+INGEST_PAGES_PER_TASK = 50  # large PDFs are split into page ranges of this size across workers
+EMBEDDING_BATCH_SIZE = 256  # chunks embedded and appended to the index per batch; bounds ingest memory
+
+# Near-duplicate chunk elimination (exact hash + MinHash/LSH) before embedding
+DEDUP_ENABLED = True
+DEDUP_THRESHOLD = 0.9  # estimated Jaccard similarity of word 5-shingles
+DEDUP_NUM_PERM = 128
+DEDUP_SHINGLE_SIZE = 5
+
 # UI configuration
+WARMUP_ENABLED = True  # load imports, embeddings, the saved vectorstore and the LLM in the background at startup
 SERVER_NAME = "127.0.0.1"
 SERVER_PORT = 7860
 ENABLE_SHARE = False
@@ -29,12 +99,21 @@ ENABLE_DEBUG = False
 HEART_RATE_NORMAL_RANGE = (60, 100)
 SLEEP_OPTIMAL_RANGE = (7, 9)
 ACTIVITY_THRESHOLD = 10000
+KNOWLEDGE_BUCKETED_RETRIEVAL = True  # retrieve knowledge per metric bucket (cached) instead of per raw value
 
 # Default coordinates (Las Vegas) - used for weather data
 DEFAULT_LATITUDE = 36.1699
 DEFAULT_LONGITUDE = -115.1398
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+
+# Table and image extraction (tables are stored as Parquet; both are described by the vision model)
+PARSE_TABLES = False
+PARSE_IMAGES = False
+TABLE_CONTEXT_MAX_ROWS = 20  # rows of a retrieved table added to the chat prompt
 
 # Paths
 TEMP_UPLOADS_DIR = "temp_uploads"
 TABLE_REFERENCES_DIR = "vectorstore/table_references"
 IMAGE_REFERENCES_DIR = "vectorstore/image_references"
+IMAGE_DESCRIPTION_CACHE_PATH = "vectorstore/image_description_cache.sqlite"
+IMAGE_DESCRIPTION_CACHE_MAX_BYTES = 256 * 1024 * 1024
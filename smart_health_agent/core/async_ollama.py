@@ -0,0 +1,217 @@
+"""
+Asyncio Ollama client with per-model concurrency limits and single-flight coalescing
+"""
+import json
+import asyncio
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional
+import httpx
+from config import (
+    OLLAMA_HOST, OLLAMA_MAX_CONCURRENCY, OLLAMA_MODEL_CONCURRENCY, OLLAMA_REQUEST_TIMEOUT,
+    OLLAMA_MAX_RETRIES, OLLAMA_RETRY_BACKOFF
+)
+
+class _Flight:
+    """One upstream call shared by every caller that asked for the same request"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.callers = 1
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, chunk: str):
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self, error: BaseException = None):
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def follow(self) -> AsyncIterator[str]:
+        """
+        Yield every chunk from the start, then the ones still to come.
+
+        When the last caller stops reading before the end, the upstream call is
+        cancelled, which makes Ollama stop generating.
+        """
+        position = 0
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: self.done or position < len(self.chunks))
+                    chunks = self.chunks[position:]
+                    done, error = self.done, self.error
+                for chunk in chunks:
+                    yield chunk
+                position += len(chunks)
+                if done and position >= len(self.chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            self.callers -= 1
+            if self.callers == 0 and not self.done and self.task is not None:
+                self.task.cancel()
+
+class AsyncOllamaClient:
+    """
+    Ollama /api/generate client for asyncio callers.
+
+    All calls share one pooled httpx.AsyncClient. Each model has its own
+    semaphore (OLLAMA_MODEL_CONCURRENCY, else OLLAMA_MAX_CONCURRENCY), so a slow
+    model cannot starve the others. Identical concurrent requests (same model,
+    prompt and options) are coalesced: the first caller makes the upstream
+    call and everyone else replays its chunks, for both generate() and
+    stream(). Connection errors and 429/5xx responses are retried with
+    exponential backoff as long as nothing has been streamed yet.
+
+    The client belongs to the event loop it is first used on.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url: str = None, timeout: float = None, model_limits: Dict[str, int] = None,
+                 default_limit: int = None, max_retries: int = None, backoff_factor: float = None):
+        self.base_url = (base_url or OLLAMA_HOST).rstrip("/")
+        self.timeout = timeout or OLLAMA_REQUEST_TIMEOUT
+        self.model_limits = dict(OLLAMA_MODEL_CONCURRENCY if model_limits is None else model_limits)
+        self.default_limit = default_limit or OLLAMA_MAX_CONCURRENCY
+        self.max_retries = OLLAMA_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_factor = OLLAMA_RETRY_BACKOFF if backoff_factor is None else backoff_factor
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._flights: Dict[tuple, _Flight] = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            max_connections = max([self.default_limit, *self.model_limits.values()]) * 2
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            )
+        return self._client
+
+    def semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.model_limits.get(model, self.default_limit))
+        return self._semaphores[model]
+
+    def set_limit(self, model: str, limit: int):
+        """Change a model's concurrency limit (applies to requests queued from now on)"""
+        self.model_limits[model] = limit
+        self._semaphores.pop(model, None)
+
+    async def _upstream(self, flight: _Flight, payload: dict):
+        """Stream one /api/generate call into flight, holding the model's semaphore"""
+        try:
+            async with self.semaphore(payload["model"]):
+                self.upstream_calls += 1
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        async with self.client.stream("POST", "/api/generate", json=payload) as response:
+                            if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                                await asyncio.sleep(self.backoff_factor * 2 ** attempt)
+                                continue
+                            if response.is_error:
+                                await response.aread()
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                if not line.strip():
+                                    continue
+                                data = json.loads(line)
+                                if "error" in data:
+                                    raise ValueError(f"Ollama error: {data['error']}")
+                                if data.get("response"):
+                                    await flight.publish(data["response"])
+                                if data.get("done"):
+                                    break
+                        break
+                    except httpx.TransportError:
+                        if flight.chunks or attempt >= self.max_retries:
+                            raise
+                        await asyncio.sleep(self.backoff_factor * 2 ** attempt)
+        except BaseException as e:
+            # Callers that joined while it was being cancelled get an ordinary error
+            await flight.finish(e if isinstance(e, Exception) else RuntimeError("Request cancelled"))
+            if not isinstance(e, Exception):
+                raise
+        else:
+            await flight.finish()
+        finally:
+            self._flights.pop(self._key(payload), None)
+
+    @staticmethod
+    def _key(payload: dict) -> tuple:
+        return (payload["model"], payload["prompt"], json.dumps(payload.get("options"), sort_keys=True),
+                json.dumps(payload.get("images")), json.dumps(payload.get("format"), sort_keys=True))
+
+    def _join(self, payload: dict) -> _Flight:
+        key = self._key(payload)
+        flight = self._flights.get(key)
+        if flight is not None:
+            flight.callers += 1
+            self.coalesced_calls += 1
+            return flight
+        flight = self._flights[key] = _Flight()
+        # A task of its own, so the call completes for the others if its first caller goes away
+        flight.task = asyncio.get_running_loop().create_task(self._upstream(flight, payload))
+        return flight
+
+    @staticmethod
+    def _payload(model: str, prompt: str, images=None, options: dict = None, format=None,
+                 keep_alive=None) -> dict:
+        payload = {"model": model, "prompt": prompt, "stream": True}
+        if images:
+            payload["images"] = images
+        if options:
+            payload["options"] = options
+        if format:
+            payload["format"] = format
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return payload
+
+    async def stream(self, model: str, prompt: str, images=None, options: dict = None,
+                     format=None, keep_alive=None) -> AsyncIterator[str]:
+        """
+        Stream the response text of a generate call, chunk by chunk.
+
+        format constrains the output: "json", or a JSON schema dict (Ollama 0.5+).
+
+        Raises:
+            httpx.HTTPError: on connection errors, timeouts or HTTP errors after retries
+            ValueError: if Ollama reports an error
+        """
+        flight = self._join(self._payload(model, prompt, images, options, format, keep_alive))
+        async with aclosing(flight.follow()) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    async def generate(self, model: str, prompt: str, images=None, options: dict = None,
+                       format=None, keep_alive=None) -> str:
+        """Run a generate call and return the complete response text (same errors as stream())"""
+        return "".join([chunk async for chunk in self.stream(model, prompt, images, options, format, keep_alive)])
+
+    async def unload(self, model: str):
+        """Ask Ollama to unload a model from memory now (keep_alive=0)"""
+        response = await self.client.post("/api/generate", json={"model": model, "keep_alive": 0})
+        response.raise_for_status()
+
+    def stats(self) -> dict:
+        return {"upstream_calls": self.upstream_calls, "coalesced_calls": self.coalesced_calls,
+                "in_flight": len(self._flights)}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
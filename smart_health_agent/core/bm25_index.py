@@ -0,0 +1,239 @@
+"""
+In-process inverted index with BM25 scoring for lexical chunk retrieval
+"""
+import os
+import re
+import json
+import math
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+FORMAT_VERSION = 1
+# Keeps codes and dotted/hyphenated terms (e.g. "e11.9", "covid-19", "hba1c") as single tokens
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+class BM25Index:
+    """
+    Inverted index over chunk texts, scored with Okapi BM25.
+
+    Each term's postings are two compact arrays: document rows (uint32) and
+    term frequencies (uint16). Chunks can be added and removed incrementally;
+    removed rows are tombstoned and dropped from the postings once they make up
+    more than compact_ratio of the index (and on save).
+
+    The per-document length normalization is computed once after the index
+    changes rather than on every query. Updates and searches may come from
+    different threads (an incremental re-index while the UI is querying) and
+    are serialized by a lock.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, compact_ratio: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self._terms: Dict[str, int] = {}
+        self._rows_by_term: List[array] = []
+        self._tfs_by_term: List[array] = []
+        self._doc_ids: List[str] = []
+        self._doc_len = array("I")
+        self._row_of: Dict[str, int] = {}
+        self._total_len = 0
+        self._deleted = 0
+        self._dead_rows: List[int] = []
+        # Length normalization per row and tombstoned rows as arrays, rebuilt on the first search after a change
+        self._norm = None
+        self._dead = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def __contains__(self, chunk_id: str):
+        return chunk_id in self._row_of
+
+    def add(self, chunk_id: str, text: str):
+        """Index a chunk (re-adding an existing ID replaces it)"""
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._add(chunk_id, counts)
+
+    def _add(self, chunk_id: str, counts: Counter):
+        if chunk_id in self._row_of:
+            self.remove([chunk_id])
+        self._norm = None
+        row = len(self._doc_ids)
+        self._doc_ids.append(chunk_id)
+        self._row_of[chunk_id] = row
+        length = sum(counts.values())
+        self._doc_len.append(length)
+        self._total_len += length
+        for term, tf in counts.items():
+            term_id = self._terms.get(term)
+            if term_id is None:
+                term_id = self._terms[term] = len(self._rows_by_term)
+                self._rows_by_term.append(array("I"))
+                self._tfs_by_term.append(array("H"))
+            self._rows_by_term[term_id].append(row)
+            self._tfs_by_term[term_id].append(min(tf, 65535))
+
+    def add_many(self, items: Iterable[Tuple[str, str]]):
+        for chunk_id, text in items:
+            self.add(chunk_id, text)
+
+    def remove(self, chunk_ids: Iterable[str]):
+        """Remove chunks by ID; unknown IDs are ignored"""
+        with self._lock:
+            for chunk_id in chunk_ids:
+                row = self._row_of.pop(chunk_id, None)
+                if row is None:
+                    continue
+                self._doc_ids[row] = None
+                self._total_len -= self._doc_len[row]
+                self._deleted += 1
+                self._dead_rows.append(row)
+                self._norm = None
+            if self._deleted > self.compact_ratio * max(len(self._doc_ids), 1):
+                self.compact()
+
+    def compact(self):
+        """Drop tombstoned rows from the postings and renumber the remaining ones"""
+        with self._lock:
+            if self._deleted:
+                self._compact()
+
+    def _compact(self):
+        new_row = np.full(len(self._doc_ids), -1, dtype=np.int64)
+        live_rows = [row for row, chunk_id in enumerate(self._doc_ids) if chunk_id is not None]
+        new_row[live_rows] = np.arange(len(live_rows))
+
+        terms, rows_by_term, tfs_by_term = {}, [], []
+        for term, term_id in self._terms.items():
+            rows = np.frombuffer(self._rows_by_term[term_id], dtype=np.uint32).astype(np.int64)
+            mapped = new_row[rows]
+            keep = mapped >= 0
+            if not keep.any():
+                continue
+            terms[term] = len(rows_by_term)
+            rows_by_term.append(array("I", mapped[keep].astype(np.uint32).tobytes()))
+            tfs_by_term.append(array("H", np.frombuffer(self._tfs_by_term[term_id], dtype=np.uint16)[keep].tobytes()))
+
+        self._terms, self._rows_by_term, self._tfs_by_term = terms, rows_by_term, tfs_by_term
+        self._doc_ids = [self._doc_ids[row] for row in live_rows]
+        self._doc_len = array("I", [self._doc_len[row] for row in live_rows])
+        self._row_of = {chunk_id: row for row, chunk_id in enumerate(self._doc_ids)}
+        self._deleted = 0
+        self._dead_rows = []
+        self._norm = None
+
+    def _prepare(self):
+        """Length normalization k1 * (1 - b + b * len / avg_len) per row, and the tombstoned rows"""
+        if self._norm is None:
+            avg_len = self._total_len / max(len(self._row_of), 1)
+            doc_len = np.frombuffer(self._doc_len, dtype=np.uint32).astype(np.float32)
+            self._norm = self.k1 * (1.0 - self.b + self.b * doc_len / max(avg_len, 1e-9))
+            self._dead = np.array(self._dead_rows, dtype=np.int64)
+        return self._norm, self._dead
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (chunk ID, BM25 score) pairs for the query's terms"""
+        terms = set(tokenize(query))
+        with self._lock:
+            return self._search(terms, k)
+
+    def _search(self, terms, k: int) -> List[Tuple[str, float]]:
+        num_docs = len(self._row_of)
+        if not num_docs:
+            return []
+        norm, dead = self._prepare()
+
+        # Score only the rows in the query terms' postings, never the whole index
+        term_rows, term_scores = [], []
+        for term in terms:
+            term_id = self._terms.get(term)
+            if term_id is None:
+                continue
+            rows = np.frombuffer(self._rows_by_term[term_id], dtype=np.uint32)
+            if not len(rows):
+                continue
+            tfs = np.frombuffer(self._tfs_by_term[term_id], dtype=np.uint16).astype(np.float32)
+            # Tombstoned rows still count towards df until compaction; the effect on idf is negligible
+            df = len(rows)
+            idf = math.log(1.0 + (num_docs - df + 0.5) / (df + 0.5))
+            term_rows.append(rows)
+            term_scores.append(idf * tfs * (self.k1 + 1.0) / (tfs + norm[rows]))
+        if not term_rows:
+            return []
+
+        candidates, inverse = np.unique(np.concatenate(term_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(term_scores)).astype(np.float32)
+        if len(dead):
+            live = ~np.isin(candidates, dead)
+            candidates, scores = candidates[live], scores[live]
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [(self._doc_ids[row], float(scores[i])) for i, row in zip(order, candidates[order])]
+
+    def save(self, folder: str):
+        """Persist the (compacted) index as bm25.json plus bm25_postings.npz"""
+        with self._lock:
+            self._save(folder)
+
+    def _save(self, folder: str):
+        self.compact()
+        os.makedirs(folder, exist_ok=True)
+        terms = sorted(self._terms, key=self._terms.get)
+        lengths = np.array([len(self._rows_by_term[self._terms[t]]) for t in terms], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        rows = np.concatenate([np.frombuffer(self._rows_by_term[self._terms[t]], dtype=np.uint32) for t in terms]) \
+            if terms else np.zeros(0, dtype=np.uint32)
+        tfs = np.concatenate([np.frombuffer(self._tfs_by_term[self._terms[t]], dtype=np.uint16) for t in terms]) \
+            if terms else np.zeros(0, dtype=np.uint16)
+        np.savez(os.path.join(folder, "bm25_postings.npz"), offsets=offsets, rows=rows, tfs=tfs,
+                 doc_len=np.frombuffer(self._doc_len, dtype=np.uint32))
+        with open(os.path.join(folder, "bm25.json"), 'w', encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "k1": self.k1, "b": self.b,
+                       "terms": terms, "doc_ids": self._doc_ids}, f)
+
+    @classmethod
+    def load(cls, folder: str):
+        """Load a persisted index, or return None if it is missing or unreadable"""
+        json_path = os.path.join(folder, "bm25.json")
+        if not os.path.exists(json_path):
+            return None
+        try:
+            with open(json_path, 'r', encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != FORMAT_VERSION:
+                return None
+            postings = np.load(os.path.join(folder, "bm25_postings.npz"))
+            index = cls(k1=data["k1"], b=data["b"])
+            offsets, rows, tfs = postings["offsets"], postings["rows"], postings["tfs"]
+            for term_id, term in enumerate(data["terms"]):
+                start, end = offsets[term_id], offsets[term_id + 1]
+                index._terms[term] = term_id
+                index._rows_by_term.append(array("I", rows[start:end].tobytes()))
+                index._tfs_by_term.append(array("H", tfs[start:end].tobytes()))
+            index._doc_ids = data["doc_ids"]
+            index._doc_len = array("I", postings["doc_len"].astype(np.uint32).tobytes())
+            index._row_of = {chunk_id: row for row, chunk_id in enumerate(index._doc_ids)}
+            index._total_len = int(postings["doc_len"].sum())
+        except Exception as e:
+            print(f"[BM25] Error loading BM25 index from {folder}: {e}")
+            return None
+        return index
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists: each ID scores sum(1 / (k + rank)) over the lists it appears in"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,155 @@
+"""
+Per-session chat memory: recent turns within a token budget plus a running summary
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    CHAT_HISTORY_TOKEN_BUDGET, CHAT_SUMMARY_TOKEN_BUDGET, CHAT_MEMORY_MAX_SESSIONS, CHAT_MEMORY_TTL
+)
+from core.json_stream import strip_reasoning
+from utils.cache import TTLCache
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and a health assistant.
+Keep the user's health facts, goals and questions, and the advice already given. Use at most {words} words.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+
+Updated summary:"""
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+def format_turn(role: str, text: str) -> str:
+    return f"{'User' if role == 'user' else 'AI'}: {text}\n"
+
+def summarize_with_llm(summary: str, turns: str, max_tokens: int) -> str:
+    """Fold turns into summary with the LLM's summary route (a reasoning model's <think> block is dropped)"""
+    from core.llm_manager import llm_manager
+    prompt = SUMMARY_PROMPT.format(words=max_tokens * 3 // 4, summary=summary or "(none)", turns=turns)
+    return strip_reasoning(llm_manager.invoke(prompt, task="summary"))
+
+class ConversationMemory:
+    """
+    Chat history of one session, kept within a token budget.
+
+    Turns are added one at a time with their formatted text and token count,
+    so render() joins a bounded window instead of re-serializing the whole
+    conversation. When the recent turns exceed token_budget, the oldest ones
+    are moved out and folded into a running summary by summarize_fn on a
+    background thread; until it finishes, those turns are left out of the
+    prompt. synced counts the UI history messages already added.
+    """
+
+    def __init__(self, token_budget: int = None, summary_budget: int = None, summarize_fn=None, executor=None):
+        self.token_budget = token_budget or CHAT_HISTORY_TOKEN_BUDGET
+        self.summary_budget = summary_budget or CHAT_SUMMARY_TOKEN_BUDGET
+        self.summarize_fn = summarize_fn or summarize_with_llm
+        self.executor = executor
+        self.summary = ""
+        self.synced = 0
+        self.summaries = 0
+        self._turns = deque()
+        self._tokens = 0
+        self._evicted = []
+        self._summarizing = False
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def add(self, role: str, text: str):
+        line = format_turn(role, text)
+        tokens = estimate_tokens(line)
+        with self._lock:
+            self._turns.append((line, tokens))
+            self._tokens += tokens
+            while self._tokens > self.token_budget and len(self._turns) > 1:
+                old_line, old_tokens = self._turns.popleft()
+                self._tokens -= old_tokens
+                self._evicted.append(old_line)
+            start = bool(self._evicted) and not self._summarizing
+            if start:
+                self._summarizing = True
+        if start:
+            self._schedule()
+
+    def _schedule(self):
+        if self.executor is None:
+            self._summarize()
+        else:
+            self.executor.submit(self._summarize)
+
+    def _summarize(self):
+        while True:
+            with self._lock:
+                summary, evicted, generation = self.summary, self._evicted, self._generation
+                self._evicted = []
+            turns = "".join(evicted)
+            try:
+                new_summary = self.summarize_fn(summary, turns, self.summary_budget)
+            except Exception as e:
+                print(f"[CHAT] Summarizing chat history failed: {e}")
+                # Keep the latest text within the summary budget rather than losing it
+                new_summary = (summary + "\n" + turns).strip()
+            new_summary = new_summary[-self.summary_budget * 4:]
+            with self._lock:
+                # Cleared meanwhile: the summary belongs to the old conversation
+                if generation == self._generation:
+                    self.summary = new_summary
+                    self.summaries += 1
+                if not self._evicted:
+                    self._summarizing = False
+                    return
+
+    def render(self) -> str:
+        """Summary of earlier turns followed by the recent turns, for the prompt"""
+        with self._lock:
+            recent = "".join(line for line, _ in self._turns)
+            summary = self.summary
+        if summary:
+            return f"Summary of earlier conversation: {summary}\n{recent}"
+        return recent
+
+    def sync(self, chat_history: list):
+        """Add the UI history messages not seen yet (a shorter history means the chat was cleared)"""
+        if len(chat_history) < self.synced:
+            self.clear()
+        for message in chat_history[self.synced:]:
+            if message and message.get('content') and message['role'] in ('user', 'assistant'):
+                self.add(message['role'], message['content'])
+        self.synced = len(chat_history)
+
+    def clear(self):
+        with self._lock:
+            self._turns.clear()
+            self._tokens = 0
+            self._evicted = []
+            self.summary = ""
+            self.synced = 0
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"turns": len(self._turns), "tokens": self._tokens, "summary_tokens": estimate_tokens(self.summary),
+                    "summaries": self.summaries, "summarizing": self._summarizing}
+
+class MemoryStore:
+    """ConversationMemory per session, expiring after ttl seconds unused"""
+
+    def __init__(self, max_sessions: int = None, ttl: float = None, summarize_fn=None):
+        self._sessions = TTLCache(max_sessions or CHAT_MEMORY_MAX_SESSIONS, ttl or CHAT_MEMORY_TTL, touch_on_read=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-summary")
+        self._summarize_fn = summarize_fn
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> ConversationMemory:
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = ConversationMemory(summarize_fn=self._summarize_fn, executor=self._executor)
+                self._sessions.set(session_id, memory)
+            return memory
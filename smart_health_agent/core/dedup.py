@@ -0,0 +1,209 @@
+"""
+Exact and near-duplicate chunk elimination before embedding
+"""
+import os
+import re
+import json
+import zlib
+import hashlib
+from typing import Dict, Iterable, List, Optional, Set
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_TOKEN_RE = re.compile(r"\w+")
+
+def _lsh_params(threshold: float, num_perm: int):
+    """Pick (bands, rows) with bands * rows == num_perm whose S-curve midpoint is closest to threshold"""
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+class ChunkDeduplicator:
+    """
+    Detects exact and near-duplicate chunks across an index.
+
+    Exact duplicates are found by hashing the normalized text. Near duplicates
+    are found with MinHash signatures over word shingles, bucketed with LSH and
+    confirmed by the estimated Jaccard similarity against threshold. For every
+    surviving chunk it records the (file, source) of each chunk merged into it,
+    so removing the survivor can re-index the files whose duplicates it absorbed.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _lsh_params(threshold, num_perm)
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+        self._ids: List[Optional[str]] = []
+        self._signatures: List[np.ndarray] = []
+        self._rows: Dict[str, int] = {}
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._exact: Dict[str, str] = {}
+        self._exact_by_id: Dict[str, str] = {}
+        # survivor chunk ID -> [[filepath, source], ...] of the chunks merged into it
+        self.merged: Dict[str, List[List[str]]] = {}
+        self.touched: Set[str] = set()
+        self.duplicates = 0
+
+    @staticmethod
+    def _normalize(text: str) -> List[str]:
+        return _TOKEN_RE.findall(text.lower())
+
+    def _signature(self, tokens: List[str]) -> np.ndarray:
+        """MinHash signature (uint32) of the text's word shingles"""
+        k = self.shingle_size
+        if len(tokens) <= k:
+            shingles = {" ".join(tokens)}
+        else:
+            shingles = {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        with np.errstate(over="ignore"):
+            permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return np.bitwise_and(permuted, _MAX_HASH).min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[bytes]:
+        for band in range(self.bands):
+            yield signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _merge(self, survivor_id: str, filepath: str, source: str) -> str:
+        self.merged.setdefault(survivor_id, []).append([filepath, source])
+        self.touched.add(survivor_id)
+        self.duplicates += 1
+        return survivor_id
+
+    def check(self, chunk_id: str, text: str, filepath: str = "", source: str = "") -> Optional[str]:
+        """
+        Register a chunk, or report what it duplicates.
+
+        Returns:
+            The ID of the surviving chunk this one duplicates, or None if the
+            chunk is new (it is then registered as a survivor).
+        """
+        tokens = self._normalize(text)
+        exact_key = hashlib.sha1(" ".join(tokens).encode("utf-8")).hexdigest()
+        if exact_key in self._exact:
+            return self._merge(self._exact[exact_key], filepath, source)
+
+        signature = self._signature(tokens)
+        band_keys = list(self._band_keys(signature))
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        best_row, best_similarity = None, self.threshold
+        for row in candidates:
+            if self._ids[row] is None:
+                continue
+            similarity = float(np.mean(self._signatures[row] == signature))
+            if similarity >= best_similarity:
+                best_row, best_similarity = row, similarity
+        if best_row is not None:
+            return self._merge(self._ids[best_row], filepath, source)
+
+        row = len(self._ids)
+        self._ids.append(chunk_id)
+        self._signatures.append(signature)
+        self._rows[chunk_id] = row
+        for band, key in enumerate(band_keys):
+            self._buckets[band].setdefault(key, []).append(row)
+        self._exact[exact_key] = chunk_id
+        self._exact_by_id[chunk_id] = exact_key
+        return None
+
+    def remove(self, chunk_ids: Iterable[str]) -> Set[str]:
+        """
+        Forget survivor chunks that were deleted from the index.
+
+        Returns:
+            Files that had duplicates merged into the removed chunks; they must
+            be re-indexed for their content to stay searchable.
+        """
+        dependent_files = set()
+        for chunk_id in chunk_ids:
+            row = self._rows.pop(chunk_id, None)
+            if row is not None:
+                self._ids[row] = None
+            exact_key = self._exact_by_id.pop(chunk_id, None)
+            if exact_key is not None and self._exact.get(exact_key) == chunk_id:
+                del self._exact[exact_key]
+            for filepath, _ in self.merged.pop(chunk_id, []):
+                dependent_files.add(filepath)
+            self.touched.discard(chunk_id)
+        return dependent_files
+
+    def forget_files(self, filepaths: Iterable[str]):
+        """Drop provenance entries that came from files being removed or re-indexed"""
+        filepaths = {os.path.abspath(f) for f in filepaths}
+        for survivor_id, entries in list(self.merged.items()):
+            kept = [entry for entry in entries if os.path.abspath(entry[0]) not in filepaths]
+            if len(kept) != len(entries):
+                self.touched.add(survivor_id)
+                if kept:
+                    self.merged[survivor_id] = kept
+                else:
+                    del self.merged[survivor_id]
+
+    def merged_sources(self, survivor_id: str) -> List[str]:
+        """Sources of all chunks merged into a survivor"""
+        return [source for _, source in self.merged.get(survivor_id, [])]
+
+    def settings(self) -> dict:
+        return {"threshold": self.threshold, "num_perm": self.num_perm, "shingle_size": self.shingle_size}
+
+    def save(self, folder: str):
+        """Persist survivors, signatures and provenance next to the index"""
+        os.makedirs(folder, exist_ok=True)
+        live_rows = [row for row, chunk_id in enumerate(self._ids) if chunk_id is not None]
+        signatures = (np.stack([self._signatures[row] for row in live_rows])
+                      if live_rows else np.zeros((0, self.num_perm), dtype=np.uint32))
+        np.save(os.path.join(folder, "dedup_signatures.npy"), signatures)
+        with open(os.path.join(folder, "dedup.json"), 'w', encoding="utf-8") as f:
+            json.dump({
+                "settings": self.settings(),
+                "ids": [self._ids[row] for row in live_rows],
+                "exact": self._exact_by_id,
+                "merged": self.merged
+            }, f)
+
+    @classmethod
+    def load(cls, folder: str, threshold: float, num_perm: int, shingle_size: int):
+        """Load persisted state, or return an empty deduplicator if missing or incompatible"""
+        dedup = cls(threshold, num_perm, shingle_size)
+        json_path = os.path.join(folder, "dedup.json")
+        if not os.path.exists(json_path):
+            return dedup
+        try:
+            with open(json_path, 'r', encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("settings") != dedup.settings():
+                return dedup
+            signatures = np.load(os.path.join(folder, "dedup_signatures.npy"))
+            for chunk_id, signature in zip(data["ids"], signatures):
+                row = len(dedup._ids)
+                dedup._ids.append(chunk_id)
+                dedup._signatures.append(signature)
+                dedup._rows[chunk_id] = row
+                for band, key in enumerate(dedup._band_keys(signature)):
+                    dedup._buckets[band].setdefault(key, []).append(row)
+            dedup._exact_by_id = data["exact"]
+            dedup._exact = {key: chunk_id for chunk_id, key in dedup._exact_by_id.items()}
+            dedup.merged = data["merged"]
+        except Exception as e:
+            print(f"[DEDUP] Error loading dedup state from {folder}: {e}")
+            return cls(threshold, num_perm, shingle_size)
+        return dedup
@@ -0,0 +1,177 @@
+"""
+Disk-backed embedding cache keyed by model name and chunk content hash
+"""
+import os
+import json
+import hashlib
+import threading
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+KEY_BYTES = 16
+
+class EmbeddingCache:
+    """
+    Persistent cache of document embeddings for one embedding model.
+
+    Vectors live in a memory-mapped float32 matrix (vectors.f32) and their keys,
+    a hash of model name and text, in an append-only file (keys.bin) whose
+    n-th key belongs to row n. meta.json records the model, dimension and row
+    count. Opening the cache for a different model clears it.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._meta_path = os.path.join(cache_dir, "meta.json")
+        self._vectors_path = os.path.join(cache_dir, "vectors.f32")
+        self._keys_path = os.path.join(cache_dir, "keys.bin")
+        self._dim = None
+        self._rows = 0
+        self._capacity = 0
+        self._matrix = None
+        self._index = {}
+        self._load()
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).digest()[:KEY_BYTES]
+
+    def _load(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if not os.path.exists(self._meta_path):
+            return
+        try:
+            with open(self._meta_path, 'r', encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception as e:
+            print(f"[EMBED_CACHE] Unreadable cache metadata ({e}); clearing cache.")
+            self.clear()
+            return
+        if meta.get("model") != self.model_name:
+            print(f"[EMBED_CACHE] Embedding model changed ({meta.get('model')} -> {self.model_name}); clearing cache.")
+            self.clear()
+            return
+
+        try:
+            self._dim = meta["dim"]
+            with open(self._keys_path, 'rb') as f:
+                keys = f.read()
+            # Rows are only counted once vectors, keys and meta have all been written
+            self._rows = min(meta["rows"], len(keys) // KEY_BYTES)
+            self._index = {keys[i * KEY_BYTES:(i + 1) * KEY_BYTES]: i for i in range(self._rows)}
+            self._capacity = os.path.getsize(self._vectors_path) // (4 * self._dim)
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self._dim))
+        except Exception as e:
+            print(f"[EMBED_CACHE] Error loading cache ({e}); clearing cache.")
+            self.clear()
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self._capacity:
+            return
+        new_capacity = max(rows, 2 * self._capacity, 1024)
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self._vectors_path, 'ab') as f:
+            f.truncate(new_capacity * self._dim * 4)
+        self._capacity = new_capacity
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self._dim))
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for texts, None for misses"""
+        with self._lock:
+            results = []
+            for text in texts:
+                row = self._index.get(self.key(text))
+                if row is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    results.append(np.array(self._matrix[row]))
+            return results
+
+    def put_many(self, texts: List[str], vectors):
+        """Add vectors for texts and persist them"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+        with self._lock:
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+            new_keys = []
+            new_vectors = []
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                if key not in self._index:
+                    self._index[key] = self._rows + len(new_keys)
+                    new_keys.append(key)
+                    new_vectors.append(vector)
+            if not new_keys:
+                return
+
+            start = self._rows
+            self._ensure_capacity(start + len(new_keys))
+            self._matrix[start:start + len(new_keys)] = np.stack(new_vectors)
+            self._matrix.flush()
+            with open(self._keys_path, 'r+b' if os.path.exists(self._keys_path) else 'wb') as f:
+                f.seek(start * KEY_BYTES)
+                f.write(b"".join(new_keys))
+                f.truncate()
+            self._rows = start + len(new_keys)
+            self._write_meta()
+
+    def _write_meta(self):
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, 'w', encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self._dim, "rows": self._rows}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def clear(self):
+        """Delete all cached vectors"""
+        self._matrix = None
+        for path in (self._meta_path, self._vectors_path, self._keys_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._dim = None
+        self._rows = 0
+        self._capacity = 0
+        self._index = {}
+
+    def __len__(self):
+        return self._rows
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": self._rows}
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves document vectors from an EmbeddingCache.
+
+    Only cache misses are encoded by the wrapped model. Query embeddings are
+    passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        cached = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if missing:
+            # Encode each distinct missing text once
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = self.embeddings.embed_documents(unique_texts)
+            self.cache.put_many(unique_texts, encoded)
+            by_text = dict(zip(unique_texts, encoded))
+            for i in missing:
+                cached[i] = by_text[texts[i]]
+        return [vector.tolist() if isinstance(vector, np.ndarray) else list(vector) for vector in cached]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
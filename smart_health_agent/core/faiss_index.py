@@ -0,0 +1,114 @@
+"""
+Configurable FAISS index construction: flat, IVF, HNSW and quantized indexes
+"""
+import numpy as np
+import faiss
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq", "sq8")
+
+# FAISS warns below ~39 training points per IVF centroid; 8-bit PQ needs 256 per sub-quantizer
+MIN_POINTS_PER_CENTROID = 39
+MIN_PQ_TRAINING_POINTS = 256
+
+class FaissIndexBuilder:
+    """
+    Creates, trains and tunes the FAISS index behind the vectorstore.
+
+    flat is exact search (IndexFlatL2, the LangChain default). ivf and ivfpq
+    partition vectors into nlist inverted lists (ivfpq also compresses them
+    with pq_m-byte product quantization) and search nprobe lists per query.
+    hnsw builds a graph with hnsw_m links per node and visits ef_search
+    candidates per query. sq8 stores int8 scalar-quantized vectors.
+    Trained types are trained on the first train_size vectors of a build;
+    nlist is reduced if the sample is too small for it.
+    """
+
+    def __init__(self, index_type: str = "flat", nlist: int = 1024, nprobe: int = 16,
+                 hnsw_m: int = 32, ef_construction: int = 80, ef_search: int = 64,
+                 pq_m: int = 16, train_size: int = 50000):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type '{index_type}', expected one of {INDEX_TYPES}")
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.pq_m = pq_m
+        self.train_size = train_size
+
+    @property
+    def needs_training(self) -> bool:
+        return self.index_type in ("ivf", "ivfpq", "sq8")
+
+    def settings(self) -> dict:
+        """Build-time settings; changing them requires rebuilding the index"""
+        settings = {"type": self.index_type}
+        if self.index_type in ("ivf", "ivfpq"):
+            settings["nlist"] = self.nlist
+        if self.index_type == "ivfpq":
+            settings["pq_m"] = self.pq_m
+        if self.index_type == "hnsw":
+            settings["m"] = self.hnsw_m
+            settings["ef_construction"] = self.ef_construction
+        return settings
+
+    def _pq_subquantizers(self, dim: int) -> int:
+        """Largest divisor of dim not above pq_m"""
+        for m in range(min(self.pq_m, dim), 0, -1):
+            if dim % m == 0:
+                return m
+        return 1
+
+    def create(self, dim: int, num_training: int = 0):
+        """Create an empty (untrained) index for dim-dimensional vectors"""
+        index_type = self.index_type
+        if index_type == "flat":
+            return faiss.IndexFlatL2(dim)
+        if index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, self.hnsw_m)
+            index.hnsw.efConstruction = self.ef_construction
+            return index
+        if index_type == "sq8":
+            return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit)
+
+        nlist = max(1, min(self.nlist, num_training // MIN_POINTS_PER_CENTROID))
+        if nlist < self.nlist:
+            print(f"[FAISS_INDEX] Only {num_training} training vectors; using nlist={nlist} instead of {self.nlist}.")
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivfpq":
+            if num_training >= MIN_PQ_TRAINING_POINTS:
+                return faiss.IndexIVFPQ(quantizer, dim, nlist, self._pq_subquantizers(dim), 8)
+            print(f"[FAISS_INDEX] Too few vectors ({num_training}) to train PQ codes; using IVF-Flat.")
+        return faiss.IndexIVFFlat(quantizer, dim, nlist)
+
+    def build(self, vectors) -> faiss.Index:
+        """Create an index and train it on (a sample of) vectors; vectors are not added"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        sample = vectors[:self.train_size] if self.needs_training else vectors[:0]
+        index = self.create(vectors.shape[1], len(sample))
+        if not index.is_trained:
+            print(f"[FAISS_INDEX] Training {self.index_type} index on {len(sample)} vectors.")
+            index.train(sample)
+        self.configure(index)
+        return index
+
+    def configure(self, index):
+        """Apply query-time parameters (nprobe, efSearch) to a new or loaded index"""
+        try:
+            faiss.extract_index_ivf(index).nprobe = self.nprobe
+        except RuntimeError:
+            pass
+        if hasattr(index, "hnsw"):
+            index.hnsw.efSearch = self.ef_search
+        return index
+
+def supports_remove(index) -> bool:
+    """
+    Whether vectors can be removed in place.
+
+    LangChain's FAISS.delete assumes remaining vectors are renumbered
+    contiguously, which only holds for flat-code indexes (flat, sq8). IVF keeps
+    the original IDs and HNSW cannot remove at all, so those are rebuilt.
+    """
+    return isinstance(index, faiss.IndexFlatCodes)
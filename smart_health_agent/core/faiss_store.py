@@ -0,0 +1,186 @@
+"""
+Pickle-free FAISS persistence: memory-mapped index, SQLite docstore and mapped chunk IDs
+"""
+import os
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+from typing import Dict, List, Optional
+import numpy as np
+import faiss
+from langchain.schema import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+
+INDEX_FILE = "index.faiss"
+IDS_FILE = "ids.npy"
+DOCSTORE_FILE = "docstore.sqlite"
+LEGACY_PICKLE_FILE = "index.pkl"
+STORE_FILES = (INDEX_FILE, IDS_FILE, DOCSTORE_FILE, LEGACY_PICKLE_FILE)
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Docstore keeping chunk text and metadata in SQLite, fetched one chunk at a time.
+
+    Implements the search/add/delete interface LangChain's FAISS expects. Writes
+    stay in an open transaction until commit(), so the file on disk always
+    matches the last saved index.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def search(self, search: str):
+        with self._lock:
+            row = self._conn.execute("SELECT content, metadata FROM docs WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts: Dict[str, Document]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO docs (id, content, metadata) VALUES (?, ?, ?)",
+                [(doc_id, doc.page_content, json.dumps(doc.metadata)) for doc_id, doc in texts.items()]
+            )
+
+    # Metadata edits must be written back explicitly, unlike with InMemoryDocstore
+    update = add
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM docs WHERE id = ?", [(doc_id,) for doc_id in ids])
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class MappedIds(Mapping):
+    """
+    index_to_docstore_id backed by a memory-mapped array of fixed-width IDs.
+
+    Rows added after loading are kept in a small overlay dict, so LangChain's
+    FAISS can keep appending to it.
+    """
+
+    def __init__(self, path: str):
+        self._base = np.load(path, mmap_mode="r")
+        self._overlay: Dict[int, str] = {}
+
+    def __getitem__(self, row: int) -> str:
+        if 0 <= row < len(self._base):
+            return self._base[row].decode("utf-8")
+        return self._overlay[row]
+
+    def __len__(self):
+        return len(self._base) + len(self._overlay)
+
+    def __iter__(self):
+        return iter(range(len(self)))
+
+    def update(self, rows: Dict[int, str]):
+        self._overlay.update(rows)
+
+def _write_ids(vectorstore: FAISS, path: str):
+    ids = [vectorstore.index_to_docstore_id[row] for row in range(len(vectorstore.index_to_docstore_id))]
+    array = np.array([chunk_id.encode("utf-8") for chunk_id in ids], dtype=bytes) if ids else np.zeros(0, dtype="S1")
+    with open(path, 'wb') as f:
+        np.save(f, array)
+
+def save_faiss(vectorstore: FAISS, folder: str, write_index: bool = True):
+    """
+    Persist a FAISS vectorstore without pickle.
+
+    Writes index.faiss, ids.npy and docstore.sqlite. A vectorstore still using an
+    in-memory docstore is switched to the written SQLite docstore and mapped IDs,
+    so chunk texts no longer have to stay in memory. write_index=False only
+    commits docstore changes (for memory-mapped, unmodified indexes).
+    """
+    os.makedirs(folder, exist_ok=True)
+    docstore_path = os.path.join(folder, DOCSTORE_FILE)
+    docstore = vectorstore.docstore
+    in_place = isinstance(docstore, SQLiteDocstore) and os.path.exists(docstore_path) \
+        and os.path.samefile(docstore.path, docstore_path)
+    if not write_index:
+        if in_place:
+            docstore.commit()
+            return
+        write_index = True
+
+    index_path = os.path.join(folder, INDEX_FILE)
+    ids_path = os.path.join(folder, IDS_FILE)
+    faiss.write_index(vectorstore.index, f"{index_path}.tmp")
+    _write_ids(vectorstore, f"{ids_path}.tmp")
+    if in_place:
+        docstore.commit()
+    else:
+        tmp_docstore_path = f"{docstore_path}.tmp"
+        if os.path.exists(tmp_docstore_path):
+            os.remove(tmp_docstore_path)
+        new_docstore = SQLiteDocstore(tmp_docstore_path)
+        chunk_ids = list(vectorstore.index_to_docstore_id.values())
+        for start in range(0, len(chunk_ids), 1000):
+            batch = chunk_ids[start:start + 1000]
+            new_docstore.add({chunk_id: docstore.search(chunk_id) for chunk_id in batch})
+        new_docstore.commit()
+        new_docstore.close()
+        os.replace(tmp_docstore_path, docstore_path)
+    # Replace (rather than overwrite) files that may be memory-mapped by a live index
+    os.replace(f"{index_path}.tmp", index_path)
+    os.replace(f"{ids_path}.tmp", ids_path)
+    legacy_path = os.path.join(folder, LEGACY_PICKLE_FILE)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+    if not in_place:
+        vectorstore.docstore = SQLiteDocstore(docstore_path)
+    vectorstore.index_to_docstore_id = MappedIds(ids_path)
+
+def load_faiss(folder: str, embeddings, mmap: bool = False) -> Optional[FAISS]:
+    """
+    Load a vectorstore saved by save_faiss, or None if folder holds none.
+
+    With mmap=True the index is memory-mapped read-only: loading takes constant
+    time and pages are read on demand, but the index must be reloaded without
+    mmap before adding or removing vectors. A legacy LangChain save
+    (index.faiss + index.pkl) is loaded once with pickle and converted.
+    """
+    index_path = os.path.join(folder, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return None
+    if not os.path.exists(os.path.join(folder, DOCSTORE_FILE)):
+        if not os.path.exists(os.path.join(folder, LEGACY_PICKLE_FILE)):
+            return None
+        print(f"[FAISS_STORE] Converting pickled vectorstore in {folder} to the SQLite docstore format.")
+        save_faiss(FAISS.load_local(folder, embeddings, allow_dangerous_deserialization=True), folder)
+
+    if mmap:
+        try:
+            # Maps flat codes (flat, sq8, HNSW storage) ...
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_MMAP_IFC)
+        except RuntimeError:
+            # ... while IVF inverted lists only support the plain mmap flag
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+    else:
+        index = faiss.read_index(index_path)
+    return FAISS(
+        embeddings,
+        index,
+        SQLiteDocstore(os.path.join(folder, DOCSTORE_FILE)),
+        MappedIds(os.path.join(folder, IDS_FILE))
+    )
+
+def read_index(folder: str):
+    """Read a saved index fully into memory (e.g. to make a memory-mapped one writable)"""
+    return faiss.read_index(os.path.join(folder, INDEX_FILE))
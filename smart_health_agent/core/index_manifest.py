@@ -0,0 +1,176 @@
+"""
+Index manifest for incremental re-indexing of the document folder
+"""
+import os
+import json
+import hashlib
+from typing import Dict, List, Any
+
+MANIFEST_VERSION = 1
+
+def file_sha256(filepath: str, block_size: int = 1 << 20) -> str:
+    """Compute the SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def path_hash(filepath: str) -> str:
+    """Short stable hash of a file's absolute path; the first component of its chunk IDs"""
+    return hashlib.sha1(os.path.abspath(filepath).encode("utf-8")).hexdigest()[:12]
+
+def make_chunk_id(filepath: str, content_hash: str, n: int) -> str:
+    """Deterministic vectorstore ID for chunk n of one file version"""
+    return f"{path_hash(filepath)}-{content_hash[:12]}-{n}"
+
+class IndexChanges:
+    """Result of comparing the folder on disk against the manifest"""
+
+    def __init__(self):
+        self.added: List[str] = []
+        self.modified: List[str] = []
+        self.removed: List[str] = []
+        self.unchanged: List[str] = []
+        # Freshly computed (sha256, mtime, size) for every file still on disk
+        self.file_stats: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def to_index(self) -> List[str]:
+        """Files that need to be parsed and embedded"""
+        return self.added + self.modified
+
+    @property
+    def to_delete(self) -> List[str]:
+        """Files whose previous chunks must be removed from the index"""
+        return self.modified + self.removed
+
+    def mark_modified(self, filepath: str, stats: Dict[str, Any]):
+        """Force an unchanged file to be re-indexed"""
+        self.unchanged = [f for f in self.unchanged if f != filepath]
+        self.modified.append(filepath)
+        self.file_stats[filepath] = stats
+
+    def has_changes(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+    def __str__(self):
+        return (f"{len(self.added)} added, {len(self.modified)} modified, "
+                f"{len(self.removed)} removed, {len(self.unchanged)} unchanged")
+
+class IndexManifest:
+    """
+    Per-file record of what is in the vectorstore.
+
+    Stores the content hash, mtime, size and chunk IDs of every indexed file,
+    plus the settings the index was built with, as JSON next to the index.
+    """
+
+    def __init__(self, settings: Dict[str, Any] = None):
+        self.settings = settings or {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, path: str):
+        """Load a manifest from disk, or return None if missing or unreadable"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                print(f"[MANIFEST] Unsupported manifest version in {path}")
+                return None
+            manifest = cls(data.get("settings", {}))
+            manifest.files = data.get("files", {})
+            return manifest
+        except Exception as e:
+            print(f"[MANIFEST] Error reading manifest {path}: {e}")
+            return None
+
+    def save(self, path: str):
+        """Atomically write the manifest to disk"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding="utf-8") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "settings": self.settings,
+                "files": self.files
+            }, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def is_compatible(self, settings: Dict[str, Any]) -> bool:
+        """Whether the index was built with the same embedding/chunking settings"""
+        return self.settings == settings
+
+    def diff(self, filepaths: List[str]) -> IndexChanges:
+        """
+        Compare files on disk against the manifest.
+
+        Files whose mtime and size match the manifest are assumed unchanged;
+        anything else is hashed, so touching a file without editing it does not
+        trigger re-embedding. Files that failed to process are always re-indexed.
+        """
+        changes = IndexChanges()
+        current = set()
+
+        for filepath in filepaths:
+            key = os.path.abspath(filepath)
+            current.add(key)
+            stat = os.stat(filepath)
+            entry = self.files.get(key)
+
+            if entry and entry.get("failed"):
+                # Parsing failed last time: index it again even though the file is unchanged
+                changes.file_stats[filepath] = {"sha256": file_sha256(filepath), "mtime": stat.st_mtime, "size": stat.st_size}
+                changes.modified.append(filepath)
+                continue
+            if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                changes.unchanged.append(filepath)
+                continue
+
+            sha = file_sha256(filepath)
+            changes.file_stats[filepath] = {"sha256": sha, "mtime": stat.st_mtime, "size": stat.st_size}
+            if entry is None:
+                changes.added.append(filepath)
+            elif entry["sha256"] != sha:
+                changes.modified.append(filepath)
+            else:
+                changes.unchanged.append(filepath)
+
+        changes.removed = [key for key in self.files if key not in current]
+        return changes
+
+    def record_file(self, filepath: str, stats: Dict[str, Any], chunk_ids: List[str], failed: bool = False):
+        """Record the indexed version of a file (failed: only partly indexed, retried on the next diff)"""
+        entry = {
+            "sha256": stats["sha256"],
+            "mtime": stats["mtime"],
+            "size": stats["size"],
+            "chunk_ids": list(chunk_ids)
+        }
+        if failed:
+            entry["failed"] = True
+        self.files[os.path.abspath(filepath)] = entry
+
+    def touch_file(self, filepath: str, stats: Dict[str, Any]):
+        """Refresh mtime/size of a file whose content did not change"""
+        entry = self.files.get(os.path.abspath(filepath))
+        if entry is not None:
+            entry["mtime"] = stats["mtime"]
+            entry["size"] = stats["size"]
+
+    def file_stats(self, filepath: str) -> Dict[str, Any]:
+        """Recorded sha256/mtime/size of a file"""
+        entry = self.files[os.path.abspath(filepath)]
+        return {"sha256": entry["sha256"], "mtime": entry["mtime"], "size": entry["size"]}
+
+    def chunk_ids(self, filepath: str) -> List[str]:
+        """Chunk IDs currently indexed for a file"""
+        entry = self.files.get(os.path.abspath(filepath), {})
+        return entry.get("chunk_ids", [])
+
+    def forget_file(self, filepath: str):
+        """Drop a file from the manifest"""
+        self.files.pop(os.path.abspath(filepath), None)
@@ -0,0 +1,159 @@
+"""
+Streaming ingest pipeline: page -> chunk -> batched embed -> index append
+"""
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+from langchain.schema import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+import document_processor as dp
+
+class IngestProgress:
+    """Progress counters for a running ingest"""
+
+    def __init__(self, report_interval: float = 10.0):
+        self.start_time = time.perf_counter()
+        self.report_interval = report_interval
+        self._last_report = self.start_time
+        self._last_page = None
+        self.files = 0
+        self.pages = 0
+        self.documents = 0
+        self.chunks = 0
+        self.duplicates = 0
+        self.embedded = 0
+
+    def elapsed(self) -> float:
+        return max(time.perf_counter() - self.start_time, 1e-9)
+
+    def pages_per_second(self) -> float:
+        return self.pages / self.elapsed()
+
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed()
+
+    def on_document(self, filepath: str, doc: Document):
+        """Count a parsed document, and its page and file when first seen"""
+        if self._last_page is None or self._last_page[0] != filepath:
+            self.files += 1
+        page = (filepath, doc.metadata.get("page_num"))
+        if page != self._last_page:
+            self.pages += 1
+            self._last_page = page
+        self.documents += 1
+
+    def summary(self) -> str:
+        return (f"{self.files} files, {self.pages} pages ({self.pages_per_second():.1f} pages/s), "
+                f"{self.chunks} chunks ({self.chunks_per_second():.1f} chunks/s), "
+                f"{self.duplicates} duplicates dropped, {self.embedded} embedded in {self.elapsed():.1f}s")
+
+    def report(self, force: bool = False):
+        """Print progress at most once per report_interval seconds"""
+        now = time.perf_counter()
+        if force or now - self._last_report >= self.report_interval:
+            self._last_report = now
+            print(f"[INGEST] {self.summary()}")
+
+class IngestPipeline:
+    """
+    Streams documents through chunking and batched embedding into a FAISS index.
+
+    Documents are chunked as they arrive and chunks are embedded and appended to
+    the index every batch_size chunks, so peak memory depends on the batch size
+    rather than on the size of the corpus. If a ChunkDeduplicator is given,
+    exact and near-duplicate chunks are dropped before they are embedded.
+    If a FaissIndexBuilder is given it creates the index; for index types that
+    need training, embedded batches are held back until train_size vectors
+    (or the whole stream) are available to train on. If a BM25Index is given,
+    indexed chunks are added to it as well.
+    """
+
+    def __init__(self, embeddings, batch_size: int = 256, chunk_size: int = 1000,
+                 chunk_overlap: int = 100, vectorstore: FAISS = None, deduplicator=None,
+                 index_builder=None, lexical_index=None):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.deduplicator = deduplicator
+        self.index_builder = index_builder
+        self.lexical_index = lexical_index
+        self.text_splitter = dp.get_text_splitter(chunk_size, chunk_overlap)
+        self.vectorstore = vectorstore
+        self.progress = IngestProgress()
+        self._batch: List[Tuple[str, Document]] = []
+        # Embedded (id, text, vector, metadata) rows waiting for the index to be trained
+        self._untrained: List[tuple] = []
+
+    def run(self, document_stream: Iterable[Tuple[str, Document]],
+            chunk_id_fn: Callable[[str, int], str]) -> Dict[str, List[str]]:
+        """
+        Consume (filepath, Document) pairs and index their chunks.
+
+        Args:
+            document_stream: Iterable of (filepath, Document), e.g. dp.iter_document_stream
+            chunk_id_fn: Maps (filepath, chunk number within the file) to a chunk ID
+
+        Returns:
+            Dict mapping each filepath to the IDs of its indexed (surviving) chunks
+        """
+        chunk_ids: Dict[str, List[str]] = {}
+        chunk_counts: Dict[str, int] = {}
+
+        for filepath, doc in document_stream:
+            self.progress.on_document(filepath, doc)
+            file_ids = chunk_ids.setdefault(filepath, [])
+            for chunk in self.text_splitter.split_documents([doc]):
+                chunk_id = chunk_id_fn(filepath, chunk_counts.get(filepath, 0))
+                chunk_counts[filepath] = chunk_counts.get(filepath, 0) + 1
+                self.progress.chunks += 1
+                if self.deduplicator is not None and self.deduplicator.check(
+                    chunk_id, chunk.page_content, filepath, chunk.metadata.get("source", "")
+                ) is not None:
+                    self.progress.duplicates += 1
+                    continue
+                file_ids.append(chunk_id)
+                self._batch.append((chunk_id, chunk))
+                if len(self._batch) >= self.batch_size:
+                    self._flush()
+            self.progress.report()
+
+        self._flush()
+        self._create_vectorstore()
+        self.progress.report(force=True)
+        return chunk_ids
+
+    def _flush(self):
+        """Embed the pending batch and append it to the index"""
+        if not self._batch:
+            return
+        ids = [chunk_id for chunk_id, _ in self._batch]
+        texts = [chunk.page_content for _, chunk in self._batch]
+        metadatas = [chunk.metadata for _, chunk in self._batch]
+        self._batch = []
+
+        vectors = self.embeddings.embed_documents(texts)
+        self.progress.embedded += len(ids)
+        if self.lexical_index is not None:
+            self.lexical_index.add_many(zip(ids, texts))
+        if self.vectorstore is None and self.index_builder is not None:
+            self._untrained.extend(zip(ids, texts, vectors, metadatas))
+            if not self.index_builder.needs_training or len(self._untrained) >= self.index_builder.train_size:
+                self._create_vectorstore()
+            return
+
+        text_embeddings = list(zip(texts, vectors))
+        if self.vectorstore is None:
+            self.vectorstore = FAISS.from_embeddings(
+                text_embeddings, self.embeddings, metadatas=metadatas, ids=ids
+            )
+        else:
+            self.vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+
+    def _create_vectorstore(self):
+        """Build and train the index on the held-back vectors, then add them"""
+        if not self._untrained:
+            return
+        ids, texts, vectors, metadatas = (list(column) for column in zip(*self._untrained))
+        self._untrained = []
+        index = self.index_builder.build(vectors)
+        self.vectorstore = FAISS(self.embeddings, index, InMemoryDocstore(), {})
+        self.vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
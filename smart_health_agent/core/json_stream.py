@@ -0,0 +1,106 @@
+"""
+Incremental parser for a JSON object streamed token by token from an LLM
+"""
+import json
+from typing import Iterable, Optional
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+def strip_reasoning(text: str) -> str:
+    """Text without <think>...</think> blocks (an unclosed one runs to the end), stripped"""
+    while True:
+        start = text.find(THINK_OPEN)
+        if start < 0:
+            return text.strip()
+        end = text.find(THINK_CLOSE, start)
+        text = text[:start] + (text[end + len(THINK_CLOSE):] if end >= 0 else "")
+
+class IncrementalJSONParser:
+    """
+    Finds the first complete top-level JSON object in streamed text.
+
+    feed() takes chunks as they arrive and returns the parsed object as soon as
+    its closing brace is seen, so the caller can stop generation there.
+    Anything before the object (chatter, <think>...</think> reasoning) and
+    after it is ignored. Top-level keys are recorded as they arrive; required
+    lists the keys the object must have (see missing()).
+    """
+
+    def __init__(self, required: Iterable[str] = ()):
+        self.required = list(required)
+        self.keys = []
+        self.result: Optional[dict] = None
+        self._text = ""
+        self._pos = 0
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = None
+        self._previous = None
+        self._in_think = False
+
+    @property
+    def complete(self) -> bool:
+        return self.result is not None
+
+    def missing(self) -> list:
+        return [key for key in self.required if key not in self.keys]
+
+    def feed(self, chunk: str) -> Optional[dict]:
+        """Add streamed text; returns the object once complete (None before)"""
+        if self.result is not None:
+            return self.result
+        self._text += chunk
+        text = self._text
+        while self._pos < len(text):
+            if self._start is None:
+                # Outside the object: skip reasoning blocks and chatter up to the opening brace
+                if self._in_think:
+                    end = text.find(THINK_CLOSE, self._pos)
+                    if end < 0:
+                        self._pos = max(self._pos, len(text) - len(THINK_CLOSE))
+                        return None
+                    self._in_think = False
+                    self._pos = end + len(THINK_CLOSE)
+                    continue
+                if text.startswith(THINK_OPEN, self._pos):
+                    self._in_think = True
+                    self._pos += len(THINK_OPEN)
+                    continue
+                if THINK_OPEN.startswith(text[self._pos:]):
+                    return None  # could be the start of a <think> tag; wait for more
+                if text[self._pos] == "{":
+                    self._start = self._pos
+                    self._depth = 1
+                    self._previous = "{"
+                self._pos += 1
+                continue
+
+            char = text[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    # A top-level string right after { or , is a key
+                    if self._depth == 1 and self._previous in ("{", ","):
+                        self.keys.append(json.loads(text[self._string_start:self._pos + 1]))
+                    self._previous = char
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif not char.isspace():
+                self._previous = char
+                if char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self.result = json.loads(text[self._start:self._pos + 1])
+                        return self.result
+            self._pos += 1
+        return None
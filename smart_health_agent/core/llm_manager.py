@@ -1,40 +1,301 @@
 """
 LLM management and configuration
 """
-from langchain_ollama import OllamaLLM
-from config import OLLAMA_HOST, DEFAULT_MODEL, MODEL_TEMPERATURE, ENABLE_STREAMING
+import json
+import queue
+import asyncio
+import threading
+from contextlib import aclosing
+import httpx
+from config import (
+    DEFAULT_MODEL, ENABLE_STREAMING, OLLAMA_KEEP_ALIVE, LLM_CACHE_SIZE, LLM_CACHE_TTL,
+    LLM_DISK_CACHE_ENABLED, LLM_DISK_CACHE_PATH, LLM_DISK_CACHE_MAX_BYTES
+)
+from core.async_ollama import AsyncOllamaClient
+from core.json_stream import IncrementalJSONParser, strip_reasoning
+from core.model_pool import ModelPool
+from utils.cache import DiskCache, TTLCache, make_cache_key
+
+_DONE = object()
+
+class _LoopThread:
+    """A daemon thread running an asyncio event loop, for sync callers of async code"""
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-event-loop", daemon=True).start()
+            return self._loop
+
+    def run(self, coro):
+        """Run a coroutine on the loop and block until it returns"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def arun(self, coro):
+        """Run a coroutine on the loop and await it from another event loop"""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def _pump(self, async_iterator, put):
+        """Schedule a task on the loop passing every item of async_iterator (then an error or _DONE) to put"""
+        async def pump():
+            try:
+                async for item in async_iterator:
+                    put(item)
+            except Exception as e:
+                put(e)
+            finally:
+                put(_DONE)
+        return asyncio.run_coroutine_threadsafe(pump(), self.loop)
+
+    def iterate(self, async_iterator):
+        """Iterate an async iterator on the loop, yielding its items to a sync caller"""
+        items = queue.Queue()
+        future = self._pump(async_iterator, items.put)
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # The caller stopped early: stop reading (a shared upstream call keeps going)
+            future.cancel()
+
+    async def aiterate(self, async_iterator):
+        """Iterate an async iterator on the loop, yielding its items on the caller's event loop"""
+        caller_loop = asyncio.get_running_loop()
+        items = asyncio.Queue()
+        future = self._pump(async_iterator, lambda item: caller_loop.call_soon_threadsafe(items.put_nowait, item))
+        try:
+            while True:
+                item = await items.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
 
 class LLMManager:
-    """Manages LLM instances and configurations"""
-    
+    """
+    Manages the LLM models and their client.
+
+    Requests go through one AsyncOllamaClient running on a background event
+    loop, so every caller shares its connection pool, concurrency limits and
+    in-flight requests. astream()/ainvoke() serve asyncio callers on any loop;
+    stream_response()/invoke() are the sync adapters. Complete responses
+(invoke()/ainvoke()) come without a reasoning model's <think> block, so
+routes such as chart_explanation never pass it on into indexed text.
+
+    A task argument picks the model and options from the routing table
+    (MODEL_ROUTES) of the model pool; untagged calls use the chat model
+    (model_name). A routed model Ollama does not have falls back to the chat
+    model.
+
+    invoke()/ainvoke() with cache=True serve repeated prompts from a response
+    cache keyed by model, temperature and whitespace-normalized prompt: an
+    in-memory LRU tier and, with LLM_DISK_CACHE_ENABLED, a SQLite tier that
+    survives restarts. Both expire entries after LLM_CACHE_TTL seconds. Only
+    opt in for calls whose answer should not vary between runs.
+
+    invoke_json()/ainvoke_json() are the structured-output mode.
+    """
+
     def __init__(self, model_name: str = None):
         self.model_name = model_name or DEFAULT_MODEL
-        self._llm = None
-        
-    @property
-    def llm(self) -> OllamaLLM:
-        """Get or create LLM instance"""
-        if self._llm is None:
-            self._llm = OllamaLLM(
-                model=self.model_name,
-                temperature=MODEL_TEMPERATURE,
-                streaming=ENABLE_STREAMING,
-                base_url=OLLAMA_HOST
-            )
-        return self._llm
-    
+        self._runner = _LoopThread()
+        self.client = AsyncOllamaClient()
+        self.pool = ModelPool(self.client, self.model_name)
+        self._response_cache = TTLCache(LLM_CACHE_SIZE, LLM_CACHE_TTL)
+        self._disk_cache = DiskCache(LLM_DISK_CACHE_PATH, LLM_DISK_CACHE_MAX_BYTES) if LLM_DISK_CACHE_ENABLED else None
+        self._missing_models = set()
+        self._schema_unsupported = False
+
     def update_model(self, new_model: str):
-        """Update the model and recreate LLM instance"""
+        """Update the chat model used for new requests (the previous one stays pooled until idle)"""
         self.model_name = new_model
-        self._llm = None
-    
-    def stream_response(self, prompt: str):
+        self.pool.default_model = new_model
+
+    def route(self, task: str = None, model: str = None):
+        """(model, options) a request for task would use"""
+        name, options = self.pool.route(task, model)
+        if name in self._missing_models:
+            name = self.model_name
+        return name, options
+
+    def _fall_back(self, error: Exception, name: str) -> bool:
+        """Whether a failed request to name should be retried with the chat model"""
+        missing = isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 404
+        if missing and name != self.model_name:
+            print(f"[LLM_POOL] Model {name} is not available; routing its tasks to {self.model_name}.")
+            self._missing_models.add(name)
+            self.pool.discard(name)
+            return True
+        return False
+
+    async def _stream(self, prompt: str, task: str = None, model: str = None, images=None, format=None):
+        if not ENABLE_STREAMING and format is None:
+            yield await self._generate(prompt, task, model, images)
+            return
+        name, options = self.route(task, model)
+        streamed = False
+        try:
+            with self.pool.use(self.pool.get(name, options)):
+                stream = self.client.stream(name, prompt, images, options, format, keep_alive=OLLAMA_KEEP_ALIVE)
+                async with aclosing(stream) as chunks:
+                    async for chunk in chunks:
+                        streamed = True
+                        yield chunk
+        except Exception as e:
+            if streamed or not self._fall_back(e, name):
+                raise
+            async with aclosing(self._stream(prompt, task, model, images, format)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+
+    async def _generate(self, prompt: str, task: str = None, model: str = None, images=None) -> str:
+        name, options = self.route(task, model)
+        try:
+            with self.pool.use(self.pool.get(name, options)):
+                response = await self.client.generate(name, prompt, images, options, keep_alive=OLLAMA_KEEP_ALIVE)
+                return strip_reasoning(response)
+        except Exception as e:
+            if not self._fall_back(e, name):
+                raise
+            return await self._generate(prompt, task, model, images)
+
+    async def astream(self, prompt: str, task: str = None, model: str = None, images=None):
+        """Stream response chunks from the LLM (for asyncio callers)"""
+        async for chunk in self._runner.aiterate(self._stream(prompt, task, model, images)):
+            yield chunk
+
+    async def _generate_json(self, prompt: str, task: str = None, model: str = None, images=None,
+                             required=(), schema: dict = None) -> dict:
+        use_schema = schema is not None and not self._schema_unsupported
+        parser = IncrementalJSONParser(required)
+        try:
+            async with aclosing(self._stream(prompt, task, model, images, schema if use_schema else "json")) as chunks:
+                async for chunk in chunks:
+                    if parser.feed(chunk) is not None:
+                        # Closing the stream cancels the rest of the generation
+                        break
+        except httpx.HTTPStatusError as e:
+            if not use_schema or e.response.status_code != 400:
+                raise
+            print("[LLM_POOL] Ollama does not accept JSON schemas as format; using format=json.")
+            self._schema_unsupported = True
+            return await self._generate_json(prompt, task, model, images, required, schema)
+        if not parser.complete:
+            raise ValueError("Response contained no complete JSON object")
+        missing = parser.missing()
+        if missing:
+            raise ValueError(f"JSON response is missing keys: {', '.join(missing)}")
+        return parser.result
+
+    def _cache_key(self, prompt: str, task: str = None, model: str = None, images=None, *extra) -> str:
+        name, options = self.route(task, model)
+        return make_cache_key(
+            name, json.dumps(options, sort_keys=True), " ".join(prompt.split()), *(images or []), *extra
+        )
+
+    def _cached(self, key: str):
+        response = self._response_cache.get(key)
+        if response is None and self._disk_cache is not None:
+            response = self._disk_cache.get(key, max_age=LLM_CACHE_TTL)
+            if response is not None:
+                self._response_cache.set(key, response)
+        return response
+
+    def _store(self, key: str, response: str):
+        self._response_cache.set(key, response)
+        if self._disk_cache is not None:
+            self._disk_cache.set(key, response)
+
+    def cache_stats(self) -> dict:
+        stats = {"memory": self._response_cache.stats()}
+        if self._disk_cache is not None:
+            stats["disk"] = self._disk_cache.stats()
+        return stats
+
+    def preload(self, task: str = None, model: str = None):
+        """Load a task's model into Ollama (an empty prompt loads it without generating) and track it in the pool"""
+        self._runner.run(self._generate("", task, model))
+
+    def pool_stats(self) -> dict:
+        return self._runner.run(self._pool_stats())
+
+    async def _pool_stats(self) -> dict:
+        return {**self.pool.stats(), **self.client.stats()}
+
+    async def ainvoke(self, prompt: str, task: str = None, model: str = None, images=None,
+                      cache: bool = False) -> str:
+        """Get complete response from the LLM (for asyncio callers)"""
+        if not cache:
+            return await self._runner.arun(self._generate(prompt, task, model, images))
+        key = self._cache_key(prompt, task, model, images)
+        response = self._cached(key)
+        if response is None:
+            response = await self._runner.arun(self._generate(prompt, task, model, images))
+            self._store(key, response)
+        return response
+
+    def stream_response(self, prompt: str, task: str = None, model: str = None, images=None):
         """Stream response from LLM"""
-        return self.llm.stream(prompt)
-    
-    def invoke(self, prompt: str):
-        """Get complete response from LLM"""
-        return self.llm.invoke(prompt)
+        return self._runner.iterate(self._stream(prompt, task, model, images))
+
+    def invoke_json(self, prompt: str, task: str = None, model: str = None, images=None, required=(),
+                    schema: dict = None, cache: bool = False) -> dict:
+        """
+        Get a JSON object from the LLM, stopping generation as soon as it is complete.
+
+        The output is constrained with Ollama's format (the JSON schema if given,
+        else "json") and streamed into an incremental parser that skips any
+        text around the object, such as reasoning. Raises ValueError if no
+        complete object arrives or a required key is missing. With cache=True
+        valid objects are cached like invoke()'s responses.
+        """
+        key = self._cache_key(prompt, task, model, images, "json", json.dumps(schema, sort_keys=True)) if cache else None
+        if cache:
+            cached = self._cached(key)
+            if cached is not None:
+                return json.loads(cached)
+        result = self._runner.run(self._generate_json(prompt, task, model, images, required, schema))
+        if cache:
+            self._store(key, json.dumps(result))
+        return result
+
+    async def ainvoke_json(self, prompt: str, task: str = None, model: str = None, images=None, required=(),
+                           schema: dict = None, cache: bool = False) -> dict:
+        """invoke_json() for asyncio callers"""
+        key = self._cache_key(prompt, task, model, images, "json", json.dumps(schema, sort_keys=True)) if cache else None
+        if cache:
+            cached = self._cached(key)
+            if cached is not None:
+                return json.loads(cached)
+        result = await self._runner.arun(self._generate_json(prompt, task, model, images, required, schema))
+        if cache:
+            self._store(key, json.dumps(result))
+        return result
+
+    def invoke(self, prompt: str, task: str = None, model: str = None, images=None, cache: bool = False):
+        """Get complete response from LLM (cache=True: reuse a cached response to the same prompt)"""
+        if not cache:
+            return self._runner.run(self._generate(prompt, task, model, images))
+        key = self._cache_key(prompt, task, model, images)
+        response = self._cached(key)
+        if response is None:
+            response = self._runner.run(self._generate(prompt, task, model, images))
+            self._store(key, response)
+        return response
 
 # Global LLM instance
 llm_manager = LLMManager()
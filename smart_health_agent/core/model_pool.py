@@ -0,0 +1,115 @@
+"""
+Pool of Ollama models in use, with task routing and idle eviction
+"""
+import json
+import time
+import asyncio
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+from config import MODEL_ROUTES, MODEL_TEMPERATURE, MODEL_IDLE_TIMEOUT
+
+class PooledModel:
+    """A model with one set of generation options, and its usage"""
+
+    def __init__(self, model: str, options: dict):
+        self.model = model
+        self.options = options
+        self.in_flight = 0
+        self.requests = 0
+        self.last_used = time.monotonic()
+
+class ModelPool:
+    """
+    Models in use, keyed by model name and generation options.
+
+    route() maps a task type ("weather_json", "chart_explanation", ...) to a
+    model and options through the routing table (MODEL_ROUTES): small models
+    for structured tasks, the chat model (a route without "model") for
+    user-facing prose. Entries record requests in flight and last use; a model
+    left idle for idle_timeout seconds is unloaded from Ollama (keep_alive=0)
+    by evict_idle(), and loads again on its next request. Per-model
+    concurrency limits are enforced by the client.
+
+    Used from the LLM manager's event loop only.
+    """
+
+    def __init__(self, client, default_model: str, routes: Dict[str, dict] = None, idle_timeout: float = None):
+        self.client = client
+        self.default_model = default_model
+        self.routes = dict(MODEL_ROUTES if routes is None else routes)
+        self.idle_timeout = MODEL_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self.models: Dict[Tuple[str, str], PooledModel] = {}
+        self.evictions = 0
+        self._evictor: Optional[asyncio.Task] = None
+
+    def route(self, task: str = None, model: str = None) -> Tuple[str, dict]:
+        """(model, options) for a task; an explicit model overrides the route's"""
+        spec = self.routes.get(task, {}) if task else {}
+        options = {"temperature": spec.get("temperature", MODEL_TEMPERATURE), **spec.get("options", {})}
+        return model or spec.get("model") or self.default_model, options
+
+    def get(self, model: str, options: dict) -> PooledModel:
+        key = (model, json.dumps(options, sort_keys=True))
+        if key not in self.models:
+            self.models[key] = PooledModel(model, options)
+        self._start_evictor()
+        return self.models[key]
+
+    @contextmanager
+    def use(self, pooled: PooledModel):
+        """Track one request to a pooled model"""
+        pooled.in_flight += 1
+        pooled.requests += 1
+        try:
+            yield pooled
+        finally:
+            pooled.in_flight -= 1
+            pooled.last_used = time.monotonic()
+
+    def discard(self, model: str):
+        """Forget a model (e.g. one Ollama does not have)"""
+        for key in [key for key, pooled in self.models.items() if pooled.model == model]:
+            del self.models[key]
+
+    async def evict_idle(self):
+        """Unload every model whose entries have all been idle for idle_timeout seconds"""
+        now = time.monotonic()
+        by_model: Dict[str, list] = {}
+        for key, pooled in self.models.items():
+            by_model.setdefault(pooled.model, []).append(key)
+        for model, keys in by_model.items():
+            entries = [self.models[key] for key in keys if key in self.models]
+            if not entries or any(e.in_flight or now - e.last_used < self.idle_timeout for e in entries):
+                continue
+            try:
+                await self.client.unload(model)
+            except Exception as e:
+                print(f"[LLM_POOL] Could not unload {model}: {e}")
+                continue
+            for key in keys:
+                # A request may have started while unloading
+                pooled = self.models.get(key)
+                if pooled is not None and not pooled.in_flight:
+                    del self.models[key]
+            self.evictions += 1
+            print(f"[LLM_POOL] Unloaded {model} after {self.idle_timeout:.0f}s idle.")
+
+    def _start_evictor(self):
+        if self._evictor is None and self.idle_timeout:
+            self._evictor = asyncio.get_running_loop().create_task(self._run_evictor())
+
+    async def _run_evictor(self):
+        while True:
+            await asyncio.sleep(max(1.0, min(60.0, self.idle_timeout / 4)))
+            await self.evict_idle()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "models": [
+                {"model": p.model, "options": p.options, "in_flight": p.in_flight, "requests": p.requests,
+                 "idle_seconds": round(now - p.last_used, 1)}
+                for p in self.models.values()
+            ],
+            "evictions": self.evictions
+        }
@@ -2,32 +2,172 @@
 RAG (Retrieval Augmented Generation) system management
 """
 import os
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+import threading
+from langchain.schema import Document
 from config import (
-    FAISS_DB_PATH, EMBEDDING_MODEL, EMBEDDING_DEVICE, 
-    SIMILARITY_SEARCH_K, CHUNK_SIZE, CHUNK_OVERLAP
+    FAISS_DB_PATH, FAISS_MANIFEST_PATH, EMBEDDING_MODEL, EMBEDDING_DEVICE, 
+    SIMILARITY_SEARCH_K, CHUNK_SIZE, CHUNK_OVERLAP, EMBEDDING_BATCH_SIZE,
+    INGEST_NUM_WORKERS, INGEST_PAGES_PER_TASK,
+    DEDUP_ENABLED, DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_SHINGLE_SIZE,
+    EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_DIR, EMBEDDING_ENCODE_BATCH_SIZE, EMBEDDING_NUM_WORKERS,
+    EMBEDDING_COUNT_TOKENS,
+    QUERY_CACHE_SIZE, QUERY_CACHE_TTL, RESULT_CACHE_ENABLED,
+    FAISS_INDEX_TYPE, FAISS_NLIST, FAISS_NPROBE, FAISS_HNSW_M, FAISS_HNSW_EF_CONSTRUCTION,
+    FAISS_HNSW_EF_SEARCH, FAISS_PQ_M, FAISS_TRAIN_SAMPLE_SIZE,
+    ENABLE_HYBRID_SEARCH, HYBRID_FETCH_K, HYBRID_RRF_K, FAISS_NUM_SHARDS
 )
+from core.bm25_index import BM25Index, reciprocal_rank_fusion
+from core.dedup import ChunkDeduplicator
+from core.embedding_cache import CachedEmbeddings, EmbeddingCache
+from core.embedding_engine import EmbeddingEngine
+from core.faiss_index import FaissIndexBuilder, supports_remove
+from core.index_manifest import IndexManifest, make_chunk_id
+from core.ingest_pipeline import IngestPipeline
+from core.sharded_store import ShardedVectorStore
+from utils.cache import TTLCache
 import document_processor as dp
 
 class RAGSystem:
     """Manages RAG components including vectorstore and embeddings"""
     
     def __init__(self):
+        # Searchable index. Setup loads, builds or updates self._vectorstore/_bm25_index
+        # and publishes them here only once they are complete
         self.vectorstore = None
+        self._vectorstore = None
         self.embeddings = None
+        self.embedding_engine = None
+        self.deduplicator = None
+        self.bm25_index = None
+        self._bm25_index = None
+        # (vectorstore, BM25 index) loaded ahead of setup_vectorstore by preload()
+        self._preloaded = None
+        self._lock = threading.RLock()
+        self.index_builder = FaissIndexBuilder(
+            FAISS_INDEX_TYPE,
+            nlist=FAISS_NLIST,
+            nprobe=FAISS_NPROBE,
+            hnsw_m=FAISS_HNSW_M,
+            ef_construction=FAISS_HNSW_EF_CONSTRUCTION,
+            ef_search=FAISS_HNSW_EF_SEARCH,
+            pq_m=FAISS_PQ_M,
+            train_size=FAISS_TRAIN_SAMPLE_SIZE
+        )
+        # Bumped whenever the index changes; part of the result cache key
+        self.index_version = 0
+        self._query_cache = TTLCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+        self._result_cache = TTLCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL) if RESULT_CACHE_ENABLED else None
         
     def get_embeddings(self):
         """Get or create embeddings model"""
         if self.embeddings is None:
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=EMBEDDING_MODEL,
-                model_kwargs={'device': EMBEDDING_DEVICE}
+            self.embedding_engine = EmbeddingEngine(
+                EMBEDDING_MODEL,
+                device=EMBEDDING_DEVICE,
+                batch_size=EMBEDDING_ENCODE_BATCH_SIZE,
+                num_workers=EMBEDDING_NUM_WORKERS,
+                count_tokens=EMBEDDING_COUNT_TOKENS
             )
+            self.embeddings = self.embedding_engine
+            if EMBEDDING_CACHE_ENABLED:
+                # Rebuilds only encode chunks whose text has not been embedded before
+                self.embeddings = CachedEmbeddings(
+                    self.embeddings, EmbeddingCache(EMBEDDING_CACHE_DIR, EMBEDDING_MODEL)
+                )
         return self.embeddings
     
+    def _index_settings(self) -> dict:
+        """Settings an existing index must match to be updated incrementally"""
+        return {
+            "embedding_model": EMBEDDING_MODEL,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "faiss_index": self.index_builder.settings(),
+            "num_shards": FAISS_NUM_SHARDS,
+            "dedup": {
+                "threshold": DEDUP_THRESHOLD,
+                "num_perm": DEDUP_NUM_PERM,
+                "shingle_size": DEDUP_SHINGLE_SIZE
+            } if DEDUP_ENABLED else None
+        }
+
+    def _create_deduplicator(self, load_existing: bool = False):
+        """Create the chunk deduplicator, restoring its state from FAISS_DB_PATH if requested"""
+        if not DEDUP_ENABLED:
+            return None
+        if load_existing:
+            return ChunkDeduplicator.load(FAISS_DB_PATH, DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_SHINGLE_SIZE)
+        return ChunkDeduplicator(DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_SHINGLE_SIZE)
+
+    def _save(self, manifest):
+        """Persist the vectorstore, BM25 index, dedup state and manifest"""
+        self._vectorstore.save_local(FAISS_DB_PATH)
+        if self._bm25_index is not None:
+            self._bm25_index.save(FAISS_DB_PATH)
+        if self.deduplicator is not None:
+            self.deduplicator.save(FAISS_DB_PATH)
+        manifest.save(FAISS_MANIFEST_PATH)
+
+    def _load_bm25_index(self, bm25_index=None):
+        """Load the persisted BM25 index, rebuilding it from the docstore if missing or out of sync"""
+        bm25_index = bm25_index or BM25Index.load(FAISS_DB_PATH)
+        indexed_ids = set(self._vectorstore.chunk_ids())
+        if bm25_index is None or len(bm25_index) != len(indexed_ids) or any(i not in bm25_index for i in indexed_ids):
+            print("[RAG_SETUP] Building BM25 index from the vectorstore documents.")
+            bm25_index = BM25Index()
+            bm25_index.add_many(
+                (chunk_id, self._vectorstore.docstore.search(chunk_id).page_content) for chunk_id in indexed_ids
+            )
+        return bm25_index
+    
+    def _load_persisted_vectorstore(self):
+        """Load the vectorstore saved in FAISS_DB_PATH, or None"""
+        print(f"[RAG_SETUP] Loading existing FAISS vectorstore from {FAISS_DB_PATH}")
+        try:
+            # Indexes are memory-mapped; shards are read into memory only if an update modifies them
+            vectorstore = ShardedVectorStore.load(
+                FAISS_DB_PATH, self.get_embeddings(), FAISS_NUM_SHARDS,
+                mmap=True, configure_index=self.index_builder.configure
+            )
+            if vectorstore.is_empty():
+                raise FileNotFoundError(f"no index files in {FAISS_DB_PATH}")
+            print("[RAG_SETUP] Successfully loaded existing vectorstore.")
+            return vectorstore
+        except Exception as e:
+            print(f"[RAG_SETUP] Error loading existing vectorstore: {e}. Creating new one.")
+            return None
+
+    def preload(self):
+        """
+        Load the persisted vectorstore and BM25 index ahead of setup_vectorstore.
+
+        Used by the background warm-up; setup_vectorstore then only has to
+        apply changes from the documents folder.
+        """
+        with self._lock:
+            if self.vectorstore is not None or self._preloaded is not None or not os.path.exists(FAISS_DB_PATH):
+                return
+            vectorstore = self._load_persisted_vectorstore()
+            if vectorstore is None:
+                return
+            # Touch the index pages so the first query does not pay for reading them
+            vectorstore.similarity_search_by_vector(self.get_embeddings().embed_query("warm-up"), k=1)
+            self._preloaded = (vectorstore, BM25Index.load(FAISS_DB_PATH))
+
     def setup_vectorstore(self, docs_folder: str):
         """Initialize RAG with a user-specified folder"""
+        with self._lock:
+            try:
+                vectorstore = self._setup_vectorstore(docs_folder)
+                if vectorstore is not None:
+                    self._publish()
+                return vectorstore
+            finally:
+                # Searches are not locked out during setup: invalidate once the new index is in place,
+                # so results computed from the old index are never cached as current
+                self.invalidate_caches()
+
+    def _setup_vectorstore(self, docs_folder: str):
         print(f"\n[RAG_SETUP] Initializing RAG with folder: {docs_folder}")
 
         if not os.path.exists(docs_folder):
@@ -36,63 +176,282 @@ class RAGSystem:
             
         if self.vectorstore is None:
             print("[RAG_SETUP] No existing vectorstore found. Creating a new one.")
-            embeddings = self.get_embeddings()
+            filepaths = dp.list_pdf_files(docs_folder)
             
             # Check if FAISS vectorstore already exists on disk
-            if os.path.exists(FAISS_DB_PATH):
-                print(f"[RAG_SETUP] Loading existing FAISS vectorstore from {FAISS_DB_PATH}")
-                try:
-                    self.vectorstore = FAISS.load_local(
-                        FAISS_DB_PATH, 
-                        embeddings, 
-                        allow_dangerous_deserialization=True
-                    )
-                    print("[RAG_SETUP] Successfully loaded existing vectorstore.")
-                    return self.vectorstore
-                except Exception as e:
-                    print(f"[RAG_SETUP] Error loading existing vectorstore: {e}. Creating new one.")
-            
-            print(f"[RAG_SETUP] Processing documents from: {docs_folder}")
-            documents = dp.process_health_documents(docs_folder, is_directory=True)
-            print(f"[RAG_SETUP] Document processing complete. Found {len(documents)} documents.")
-            
-            if not documents:
-                print("[RAG_SETUP] Warning: No documents found or processed.")
-                return None
+            preloaded_bm25 = None
+            if self._preloaded is not None:
+                print("[RAG_SETUP] Using the vectorstore preloaded at startup.")
+                self._vectorstore, preloaded_bm25 = self._preloaded
+                self._preloaded = None
+            elif os.path.exists(FAISS_DB_PATH):
+                self._vectorstore = self._load_persisted_vectorstore()
 
-            chunked_docs = dp.chunk_documents(documents, CHUNK_SIZE, CHUNK_OVERLAP)
-            print(f"[RAG_SETUP] Chunked documents into {len(chunked_docs)} chunks.")
+            if self._vectorstore is not None:
+                manifest = IndexManifest.load(FAISS_MANIFEST_PATH)
+                if manifest is None:
+                    print("[RAG_SETUP] Vectorstore has no manifest. Rebuilding once to enable incremental updates.")
+                elif not manifest.is_compatible(self._index_settings()):
+                    print("[RAG_SETUP] Embedding, chunking or index settings changed. Rebuilding vectorstore.")
+                else:
+                    self.deduplicator = self._create_deduplicator(load_existing=True)
+                    self._bm25_index = self._load_bm25_index(preloaded_bm25)
+                    self._update_vectorstore(manifest, filepaths)
+                    return self._vectorstore
+                self._vectorstore = None
 
-            print("[RAG_SETUP] Creating FAISS vectorstore instance.")
-            self.vectorstore = FAISS.from_documents(
-                documents=chunked_docs,
-                embedding=embeddings
-            )
-            print(f"[RAG_SETUP] Added {len(chunked_docs)} chunks to the vectorstore.")
-            # Save the vectorstore to disk for persistence
-            self.vectorstore.save_local(FAISS_DB_PATH)
-            print("[RAG_SETUP] Documents successfully added to the vectorstore.")
+            self._build_vectorstore(filepaths)
         else:
             print("[RAG_SETUP] Using existing vectorstore.")
         
-        return self.vectorstore
+        return self._vectorstore
+
+    def _publish(self):
+        """Make the finished index searchable; searches never see one being loaded or updated"""
+        self.bm25_index = self._bm25_index
+        self.vectorstore = self._vectorstore
+
+    def _index_files(self, filepaths, file_stats, manifest):
+        """Stream files through the ingest pipeline shard by shard, recording their chunk IDs in the manifest"""
+        by_shard = {}
+        for filepath in filepaths:
+            by_shard.setdefault(self._vectorstore.shard_of_file(filepath), []).append(filepath)
+
+        num_documents = num_chunks = num_duplicates = num_embedded = 0
+        failures = set()
+        for shard_id, shard_files in sorted(by_shard.items()):
+            pipeline = IngestPipeline(
+                self.get_embeddings(),
+                batch_size=EMBEDDING_BATCH_SIZE,
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                vectorstore=self._vectorstore.writable_shard(shard_id),
+                deduplicator=self.deduplicator,
+                index_builder=self.index_builder,
+                lexical_index=self._bm25_index
+            )
+            document_stream = dp.iter_document_stream(
+                shard_files, num_workers=INGEST_NUM_WORKERS, pages_per_task=INGEST_PAGES_PER_TASK,
+                failures=failures
+            )
+            chunk_ids = pipeline.run(
+                document_stream,
+                lambda filepath, n: make_chunk_id(filepath, file_stats[filepath]["sha256"], n)
+            )
+            for filepath in shard_files:
+                # Chunks of a partly failed file are kept in the manifest so the retry can replace them
+                manifest.record_file(
+                    filepath, file_stats[filepath], chunk_ids.get(filepath, []), failed=filepath in failures
+                )
+            self._vectorstore.set_shard(shard_id, pipeline.vectorstore)
+            num_documents += pipeline.progress.documents
+            num_chunks += pipeline.progress.chunks
+            num_duplicates += pipeline.progress.duplicates
+            num_embedded += pipeline.progress.embedded
+
+        print(f"[RAG_SETUP] Document processing complete. Found {num_documents} documents.")
+        print(f"[RAG_SETUP] Chunked documents into {num_chunks} chunks.")
+        if failures:
+            print(f"[RAG_SETUP] {len(failures)} files failed to process; they will be retried on the next setup.")
+        if self.embedding_engine is not None:
+            metrics = self.embedding_engine.metrics()
+            tokens = f", {metrics['tokens_per_second']:.0f} tokens/s" if metrics["tokens"] is not None else ""
+            print(f"[RAG_SETUP] Encoder throughput: {metrics['chunks_per_second']:.1f} chunks/s{tokens}")
+        if self.deduplicator is not None:
+            print(f"[RAG_SETUP] Dropped {num_duplicates} duplicate chunks.")
+            self._apply_merged_sources()
+        return num_embedded
+
+    def _apply_merged_sources(self):
+        """Record on surviving chunks the sources of the duplicates merged into them"""
+        for chunk_id in self.deduplicator.touched:
+            doc = self._vectorstore.docstore.search(chunk_id)
+            if isinstance(doc, Document):
+                doc.metadata["merged_sources"] = self.deduplicator.merged_sources(chunk_id)
+                self._vectorstore.docstore.update(chunk_id, doc)
+        self.deduplicator.touched.clear()
+
+    def _shards_needing_rebuild(self, chunk_ids):
+        """Shards holding some of chunk_ids whose index cannot remove vectors in place"""
+        return {
+            shard_id for shard_id in self._vectorstore.group_by_shard(chunk_ids)
+            if self._vectorstore.shards[shard_id] is not None
+            and not supports_remove(self._vectorstore.shards[shard_id].index)
+        }
+
+    def _collect_stale_ids(self, changes, manifest):
+        """
+        Chunk IDs to delete for removed and modified files.
+
+        Unchanged files are marked for re-indexing (and their chunks deleted too)
+        if a deleted chunk had their duplicates merged into it, or if they share
+        a shard whose index type cannot remove vectors in place (that shard is
+        then rebuilt from its files).
+        """
+        stale_ids = [chunk_id for filepath in changes.to_delete for chunk_id in manifest.chunk_ids(filepath)]
+        if self.deduplicator is not None:
+            self.deduplicator.forget_files(changes.to_delete)
+        unchanged = {os.path.abspath(filepath): filepath for filepath in changes.unchanged}
+        pending = stale_ids
+        while pending:
+            reindex = {}
+            if self.deduplicator is not None:
+                for dependent in self.deduplicator.remove(pending):
+                    reindex[dependent] = "its duplicates were merged into removed chunks"
+            rebuild_shards = self._shards_needing_rebuild(pending)
+            for filepath in unchanged.values():
+                if self._vectorstore.shard_of_file(filepath) in rebuild_shards:
+                    reindex.setdefault(filepath, f"its shard's {FAISS_INDEX_TYPE} index is rebuilt")
+            pending = []
+            for dependent, reason in reindex.items():
+                filepath = unchanged.pop(os.path.abspath(dependent), None)
+                if filepath is None:
+                    continue
+                print(f"[RAG_SETUP] Re-indexing {filepath}: {reason}.")
+                changes.mark_modified(filepath, manifest.file_stats(filepath))
+                if self.deduplicator is not None:
+                    self.deduplicator.forget_files([filepath])
+                pending.extend(manifest.chunk_ids(filepath))
+            stale_ids = stale_ids + pending
+        return stale_ids
+
+    def _build_vectorstore(self, filepaths):
+        """Build the vectorstore and its manifest from scratch"""
+        print(f"[RAG_SETUP] Processing {len(filepaths)} documents.")
+        manifest = IndexManifest(self._index_settings())
+        changes = manifest.diff(filepaths)
+
+        print(f"[RAG_SETUP] Creating FAISS vectorstore instance with {FAISS_NUM_SHARDS} shard(s).")
+        self._vectorstore = ShardedVectorStore(
+            self.get_embeddings(), FAISS_NUM_SHARDS, FAISS_DB_PATH, configure_index=self.index_builder.configure
+        )
+        # Every shard is rewritten, so shards left over from an older build are removed
+        self._vectorstore.dirty.update(range(FAISS_NUM_SHARDS))
+        self.deduplicator = self._create_deduplicator()
+        self._bm25_index = BM25Index()
+        num_chunks = self._index_files(changes.to_index, changes.file_stats, manifest)
+        
+        if self._vectorstore.is_empty():
+            print("[RAG_SETUP] Warning: No documents found or processed.")
+            self._vectorstore = None
+            return None
+
+        print(f"[RAG_SETUP] Added {num_chunks} chunks to the vectorstore.")
+        # Save the vectorstore and manifest to disk for persistence
+        self._save(manifest)
+        print("[RAG_SETUP] Documents successfully added to the vectorstore.")
+        return self._vectorstore
+
+    def _update_vectorstore(self, manifest, filepaths):
+        """Apply added, modified and removed files to the loaded vectorstore"""
+        changes = manifest.diff(filepaths)
+        print(f"[RAG_SETUP] Changes since last index: {changes}")
+
+        for filepath in changes.unchanged:
+            if filepath in changes.file_stats:
+                manifest.touch_file(filepath, changes.file_stats[filepath])
+
+        if changes.has_changes():
+            stale_ids = self._collect_stale_ids(changes, manifest)
+            for filepath in changes.removed:
+                manifest.forget_file(filepath)
+
+            indexed_ids = set(self._vectorstore.chunk_ids())
+            stale_ids = [chunk_id for chunk_id in stale_ids if chunk_id in indexed_ids]
+            if stale_ids:
+                self._vectorstore.delete(stale_ids)
+                self._bm25_index.remove(stale_ids)
+                print(f"[RAG_SETUP] Removed {len(stale_ids)} stale chunks from the vectorstore.")
+
+            num_chunks = self._index_files(changes.to_index, changes.file_stats, manifest)
+            print(f"[RAG_SETUP] Added {num_chunks} chunks to the vectorstore.")
+            self._save(manifest)
+        else:
+            manifest.save(FAISS_MANIFEST_PATH)
+        return self._vectorstore
+    
+    def embed_query(self, query: str):
+        """Embed a query, reusing the vector of a recently seen identical query"""
+        vector = self._query_cache.get(query)
+        if vector is None:
+            vector = self.get_embeddings().embed_query(query)
+            self._query_cache.set(query, vector)
+        return vector
     
     def similarity_search(self, query: str, k: int = None):
         """Perform similarity search on the vectorstore"""
-        if self.vectorstore is None:
+        # One consistent (vectorstore, BM25) pair, even if setup publishes a new index meanwhile
+        vectorstore, bm25_index = self.vectorstore, self.bm25_index
+        if vectorstore is None:
             print("[RAG_SYSTEM] Warning: Vectorstore not initialized")
             return []
         
         k = k or SIMILARITY_SEARCH_K
+        index_version = self.index_version
+        cache_key = (query, k, index_version)
+        if self._result_cache is not None:
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                return list(cached)
         try:
-            return self.vectorstore.similarity_search(query, k=k)
+            if ENABLE_HYBRID_SEARCH and bm25_index is not None:
+                docs = self._hybrid_search(vectorstore, bm25_index, query, k)
+            else:
+                docs = vectorstore.similarity_search_by_vector(self.embed_query(query), k=k)
         except Exception as e:
             print(f"[RAG_SYSTEM] Error during similarity search: {e}")
             return []
+        # Not cached if the index changed during the search
+        if self._result_cache is not None and index_version == self.index_version:
+            self._result_cache.set(cache_key, docs)
+        return list(docs)
+
+    def hybrid_search(self, query: str, k: int = None, fetch_k: int = None):
+        """
+        Fuse BM25 and vector search results with reciprocal rank fusion.
+
+        Each retriever returns its top fetch_k chunks; chunks ranked well by
+        either (exact terms or meaning) end up near the top of the fused list.
+        """
+        return self._hybrid_search(self.vectorstore, self.bm25_index, query, k, fetch_k)
+
+    def _hybrid_search(self, vectorstore, bm25_index, query: str, k: int = None, fetch_k: int = None):
+        k = k or SIMILARITY_SEARCH_K
+        fetch_k = max(fetch_k or HYBRID_FETCH_K, k)
+        vector_docs = vectorstore.similarity_search_by_vector(self.embed_query(query), k=fetch_k)
+        vector_ids = [doc.id for doc in vector_docs]
+        lexical_ids = [chunk_id for chunk_id, _ in bm25_index.search(query, fetch_k)]
+
+        docs_by_id = {doc.id: doc for doc in vector_docs}
+        results = []
+        for chunk_id, _ in reciprocal_rank_fusion([vector_ids, lexical_ids], HYBRID_RRF_K):
+            doc = docs_by_id.get(chunk_id) or vectorstore.docstore.search(chunk_id)
+            if isinstance(doc, Document):
+                results.append(doc)
+            if len(results) == k:
+                break
+        return results
+
+    def invalidate_caches(self):
+        """Drop cached search results after the index changes (query vectors depend only on the model)"""
+        self.index_version += 1
+        if self._result_cache is not None:
+            self._result_cache.clear()
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the query vector and search result caches"""
+        return {
+            "query_embeddings": self._query_cache.stats(),
+            "results": self._result_cache.stats() if self._result_cache is not None else None
+        }
     
     def reset_vectorstore(self):
         """Reset the vectorstore"""
         self.vectorstore = None
+        self.bm25_index = None
+        self._vectorstore = None
+        self._bm25_index = None
+        self.invalidate_caches()
 
 # Global RAG system instance
 rag_system = RAGSystem()
@@ -0,0 +1,125 @@
+"""
+Semantic cache of chat answers keyed by query embedding and context fingerprint
+"""
+import re
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.cache import make_cache_key
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+def context_fingerprint(model: str, context: str, message: str = "", history: str = "") -> str:
+    """
+    Fingerprint of everything besides the question's meaning that shapes an answer.
+
+    Numbers in the message are included because embeddings barely distinguish
+    "is 75 bpm normal?" from "is 57 bpm normal?". The rendered chat history
+    (summary and recent turns) is included so an answer built from one
+    session's personal details is never served to another session; in
+    practice only answers to questions asked without history are shared.
+    """
+    return make_cache_key(model, context, history, *_NUMBER_RE.findall(message))
+
+class _Entry:
+    __slots__ = ("vector", "fingerprint", "answer", "created_at", "generation_seconds")
+
+    def __init__(self, vector, fingerprint, answer, generation_seconds):
+        self.vector = vector
+        self.fingerprint = fingerprint
+        self.answer = answer
+        self.created_at = time.monotonic()
+        self.generation_seconds = generation_seconds
+
+class SemanticCache:
+    """
+    In-memory cache of LLM answers for semantically equivalent questions.
+
+    A lookup hits when a stored question with the same context fingerprint has
+    a cosine similarity of at least threshold with the new one. Entries expire
+    after ttl seconds and the least recently used are evicted beyond
+    max_entries. Hits, misses and the generation time saved are tracked.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1000, ttl: float = 24 * 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._entries = OrderedDict()
+        self._by_fingerprint = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        ids = self._by_fingerprint[entry.fingerprint]
+        ids.remove(entry_id)
+        if not ids:
+            del self._by_fingerprint[entry.fingerprint]
+
+    def lookup(self, vector, fingerprint: str):
+        """Cached answer for a similar question with the same fingerprint, or None"""
+        vector = self._normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_similarity = None, self.threshold
+            for entry_id in list(self._by_fingerprint.get(fingerprint, ())):
+                entry = self._entries[entry_id]
+                if now - entry.created_at > self.ttl:
+                    self._drop(entry_id)
+                    continue
+                similarity = float(np.dot(entry.vector, vector))
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            self.hits += 1
+            self.saved_seconds += entry.generation_seconds
+            return entry.answer
+
+    def store(self, vector, fingerprint: str, answer: str, generation_seconds: float = 0.0):
+        """Add an answer, evicting the least recently used entries beyond max_entries"""
+        entry = _Entry(self._normalize(vector), fingerprint, answer, generation_seconds)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._by_fingerprint.setdefault(fingerprint, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_fingerprint.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "saved_seconds": self.saved_seconds
+        }
+
+def replay_stream(answer: str, chunk_size: int = 16):
+    """Yield a cached answer in small pieces, like a streamed LLM response"""
+    for start in range(0, len(answer), chunk_size):
+        yield answer[start:start + chunk_size]
@@ -0,0 +1,172 @@
+"""
+FAISS vectorstore partitioned into independently stored shards
+"""
+import os
+import heapq
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from langchain.schema import Document
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from core.faiss_index import supports_remove
+from core.faiss_store import STORE_FILES, SQLiteDocstore, load_faiss, read_index, save_faiss
+from core.index_manifest import path_hash
+
+class ShardedDocstore:
+    """Docstore facade that looks chunks up in the shard owning their ID"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def search(self, chunk_id: str):
+        shard = self.store.shards[self.store.shard_of_chunk(chunk_id)]
+        if shard is None:
+            return f"ID {chunk_id} not found."
+        return shard.docstore.search(chunk_id)
+
+    def update(self, chunk_id: str, doc: Document):
+        """Write back an edited document (in-memory docstores are edited in place)"""
+        shard = self.store.shards[self.store.shard_of_chunk(chunk_id)]
+        if shard is not None and isinstance(shard.docstore, SQLiteDocstore):
+            shard.docstore.update({chunk_id: doc})
+        self.store.mark_dirty(chunk_id)
+
+class ShardedVectorStore:
+    """
+    A set of FAISS shards searched as one vectorstore.
+
+    Chunks are assigned to shards by the hash of their source file's path (the
+    first component of their chunk ID), so all chunks of a file live in one
+    shard. Each shard is saved under its own directory (<path>/shard-<i>, or
+    <path> itself with a single shard), loaded independently and only rewritten
+    when it changed. Queries fan out to all shards in parallel threads and the
+    top-k results are merged by score. Loaded shards can be memory-mapped; they
+    are re-read into memory by writable_shard() before being modified.
+    configure_index, if given, is applied to every loaded index.
+    """
+
+    def __init__(self, embeddings, num_shards: int = 1, path: str = None, configure_index=None):
+        self.embeddings = embeddings
+        self.num_shards = num_shards
+        self.path = path
+        self.configure_index = configure_index
+        self.shards: List[Optional[FAISS]] = [None] * num_shards
+        self.dirty = set()
+        self.mmapped = set()
+        self.docstore = ShardedDocstore(self)
+        self._executor = ThreadPoolExecutor(max_workers=num_shards) if num_shards > 1 else None
+
+    def shard_path(self, shard_id: int, path: str = None) -> str:
+        path = path or self.path
+        return path if self.num_shards == 1 else os.path.join(path, f"shard-{shard_id}")
+
+    def shard_of_file(self, filepath: str) -> int:
+        return int(path_hash(filepath), 16) % self.num_shards
+
+    def shard_of_chunk(self, chunk_id: str) -> int:
+        return int(chunk_id.split("-", 1)[0], 16) % self.num_shards
+
+    def set_shard(self, shard_id: int, vectorstore: Optional[FAISS]):
+        """Replace a shard (None drops it) and mark it for saving"""
+        if vectorstore is not self.shards[shard_id]:
+            self.mmapped.discard(shard_id)
+        self.shards[shard_id] = vectorstore
+        self.dirty.add(shard_id)
+
+    def writable_shard(self, shard_id: int) -> Optional[FAISS]:
+        """The shard, with a memory-mapped (read-only) index first read fully into memory"""
+        shard = self.shards[shard_id]
+        if shard is not None and shard_id in self.mmapped:
+            shard.index = read_index(self.shard_path(shard_id))
+            if self.configure_index is not None:
+                self.configure_index(shard.index)
+            self.mmapped.discard(shard_id)
+        return shard
+
+    def mark_dirty(self, chunk_id: str):
+        """Mark the shard holding chunk_id as modified (e.g. after editing its metadata)"""
+        self.dirty.add(self.shard_of_chunk(chunk_id))
+
+    def chunk_ids(self) -> List[str]:
+        return [chunk_id for shard in self.shards if shard is not None
+                for chunk_id in shard.index_to_docstore_id.values()]
+
+    def num_vectors(self) -> int:
+        return sum(shard.index.ntotal for shard in self.shards if shard is not None)
+
+    def is_empty(self) -> bool:
+        return all(shard is None for shard in self.shards)
+
+    def group_by_shard(self, chunk_ids) -> Dict[int, List[str]]:
+        groups: Dict[int, List[str]] = {}
+        for chunk_id in chunk_ids:
+            groups.setdefault(self.shard_of_chunk(chunk_id), []).append(chunk_id)
+        return groups
+
+    def delete(self, chunk_ids: List[str]):
+        """Delete chunks from their shards; a shard losing all its chunks is dropped"""
+        for shard_id, ids in self.group_by_shard(chunk_ids).items():
+            shard = self.shards[shard_id]
+            if shard is None:
+                continue
+            if len(set(ids)) >= len(shard.index_to_docstore_id):
+                self.set_shard(shard_id, None)
+            elif not supports_remove(shard.index):
+                raise ValueError(f"Shard {shard_id} cannot remove vectors in place; rebuild it instead")
+            else:
+                self.writable_shard(shard_id).delete(ids)
+                self.dirty.add(shard_id)
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4):
+        """Search every shard (in parallel) and merge the top-k (Document, score) pairs"""
+        shards = [shard for shard in self.shards if shard is not None]
+        if not shards:
+            return []
+        search = lambda shard: shard.similarity_search_with_score_by_vector(embedding, k=k)
+        if self._executor is None or len(shards) == 1:
+            results = [search(shard) for shard in shards]
+        else:
+            results = list(self._executor.map(search, shards))
+        merged = [pair for result in results for pair in result]
+        if shards[0].distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+            return heapq.nlargest(k, merged, key=lambda pair: pair[1])
+        return heapq.nsmallest(k, merged, key=lambda pair: pair[1])
+
+    def similarity_search_by_vector(self, embedding, k: int = 4) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k)]
+
+    def save_local(self, path: str = None):
+        """Write the shards changed since the last save"""
+        for shard_id in sorted(self.dirty):
+            shard_path = self.shard_path(shard_id, path)
+            shard = self.shards[shard_id]
+            if shard is not None:
+                # A still memory-mapped index is unchanged; only docstore edits need saving
+                save_faiss(shard, shard_path, write_index=shard_id not in self.mmapped or path not in (None, self.path))
+            elif self.num_shards > 1 and os.path.isdir(shard_path):
+                shutil.rmtree(shard_path)
+            elif self.num_shards == 1:
+                for name in STORE_FILES:
+                    if os.path.exists(os.path.join(shard_path, name)):
+                        os.remove(os.path.join(shard_path, name))
+        self.dirty.clear()
+
+    def load_shard(self, shard_id: int, mmap: bool = False) -> Optional[FAISS]:
+        """Load one shard from disk, or None if it was never written"""
+        shard = load_faiss(self.shard_path(shard_id), self.embeddings, mmap=mmap)
+        self.shards[shard_id] = shard
+        if shard is not None:
+            if self.configure_index is not None:
+                self.configure_index(shard.index)
+            if mmap and isinstance(shard.docstore, SQLiteDocstore):
+                self.mmapped.add(shard_id)
+        return shard
+
+    @classmethod
+    def load(cls, path: str, embeddings, num_shards: int = 1, mmap: bool = False, configure_index=None):
+        """Load all shards stored under path"""
+        store = cls(embeddings, num_shards, path, configure_index)
+        for shard_id in range(num_shards):
+            store.load_shard(shard_id, mmap=mmap)
+        return store
@@ -0,0 +1,104 @@
+"""
+Background warm-up of slow-starting components after the UI is up
+"""
+import time
+import threading
+
+def _warm_modules():
+    # Import the agent workflow (langchain, langgraph, pandas) before the first click needs it
+    import core.workflow  # noqa: F401
+    import agents.weather_agent  # noqa: F401
+    import utils.health_data  # noqa: F401
+
+def _warm_embeddings():
+    from core.rag_system import rag_system
+    rag_system.get_embeddings().embed_query("warm-up")
+
+def _warm_vectorstore():
+    from core.rag_system import rag_system
+    rag_system.preload()
+
+def _warm_llm():
+    # Through the pool, so the chat model is evicted like any other once idle
+    from core.llm_manager import llm_manager
+    llm_manager.preload()
+
+class Warmup:
+    """
+    Loads heavy components in a background thread.
+
+    Each component goes pending -> loading -> ready (or failed); status() and
+    summary() report the states and load times and wait() blocks until all
+    steps have finished. A failed step only means the component loads on
+    first use instead.
+    """
+
+    STEPS = (
+        ("modules", _warm_modules),
+        ("embeddings", _warm_embeddings),
+        ("vectorstore", _warm_vectorstore)
+    )
+
+    def __init__(self):
+        self.states = {name: "pending" for name, _ in self.STEPS}
+        self.states["llm"] = "pending"
+        self.errors = {}
+        self.seconds = {}
+        self._thread = None
+        self._done = threading.Event()
+
+    def start(self):
+        """Start warming up in a daemon thread (once)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def _step(self, name, fn):
+        self.states[name] = "loading"
+        start = time.perf_counter()
+        try:
+            fn()
+            self.states[name] = "ready"
+        except Exception as e:
+            self.states[name] = "failed"
+            self.errors[name] = str(e)
+            print(f"[WARMUP] {name} failed: {e}")
+        self.seconds[name] = time.perf_counter() - start
+        print(f"[WARMUP] {name} {self.states[name]} in {self.seconds[name]:.1f}s")
+
+    def _run(self):
+        # The Ollama ping is remote I/O, so it runs alongside the local steps
+        llm_thread = threading.Thread(target=self._step, args=("llm", _warm_llm), daemon=True)
+        llm_thread.start()
+        for name, fn in self.STEPS:
+            self._step(name, fn)
+        llm_thread.join()
+        self._done.set()
+
+    def is_ready(self) -> bool:
+        return all(state == "ready" for state in self.states.values())
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until warm-up has finished; returns False on timeout"""
+        return self._done.wait(timeout)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.is_ready(),
+            "finished": self._done.is_set(),
+            "components": dict(self.states),
+            "seconds": dict(self.seconds),
+            "errors": dict(self.errors)
+        }
+
+    def summary(self) -> str:
+        """One-line readiness summary for the UI"""
+        parts = []
+        for name, state in self.states.items():
+            seconds = f" ({self.seconds[name]:.1f}s)" if name in self.seconds else ""
+            parts.append(f"{name}: {state}{seconds}")
+        return "System status: " + " · ".join(parts)
+
+# Global warm-up instance
+warmup = Warmup()
@@ -1,22 +1,42 @@
-
 import os
 import base64
+import bisect
+import hashlib
 import fitz
+import functools
+import itertools
+import mmap
+import multiprocessing
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
 from PIL import Image
-import requests
 from typing import List, Dict, Any, Union
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_ollama import OllamaLLM
-
-
-# Import Ollama host configuration from the main module
-try:
-    from smart_health_ollama import OLLAMA_HOST
-except ImportError:
-    # Fallback if import fails
-    OLLAMA_HOST = "http://localhost:11434" # Change this to your Ollama host on Google Cloud Run
+from config import (
+    IMAGE_DESCRIPTION_CACHE_PATH, IMAGE_DESCRIPTION_CACHE_MAX_BYTES, OLLAMA_MAX_CONCURRENCY,
+    TABLE_REFERENCES_DIR, IMAGE_REFERENCES_DIR, PARSE_TABLES, PARSE_IMAGES, TABLE_CONTEXT_MAX_ROWS
+)
+from core.llm_manager import llm_manager
+from utils.cache import DiskCache, make_cache_key
+from utils.table_store import TableStoreWriter, load_table
+
+DESCRIBE_IMAGE_PROMPT = "Describe what you see in this image in detail."
+EXPLAIN_CHART_PROMPT = "Explain this chart in detail with health implications: "
+IMAGE_DESCRIPTION_UNAVAILABLE = "Image description unavailable"
+UPLOAD_COPY_CHUNK_SIZE = 1024 * 1024
+
+_description_cache = None
+
+def get_description_cache():
+    """Get the on-disk cache shared by describe_image and process_graph."""
+    global _description_cache
+    if _description_cache is None:
+        _description_cache = DiskCache(IMAGE_DESCRIPTION_CACHE_PATH, IMAGE_DESCRIPTION_CACHE_MAX_BYTES)
+    return _description_cache
 
 # Utility functions for image processing
 def get_b64_image_from_content(image_content):
@@ -30,28 +50,20 @@ def get_b64_image_from_content(image_content):
 
 def describe_image(image_content):
     """Generate a description of an image using Ollama."""
+    cache = get_description_cache()
+    cache_key = make_cache_key("describe", image_content, llm_manager.route("image_description")[0], DESCRIBE_IMAGE_PROMPT)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         image_b64 = get_b64_image_from_content(image_content)
-        ollama_endpoint = f"{OLLAMA_HOST}/api/generate"
-        
-        payload = {
-            "model": "gemma3:12b-it-q4_K_M",
-            "prompt": "Describe what you see in this image in detail.",
-            "images": [image_b64],
-            "stream": False
-        }
-        
-        response = requests.post(ollama_endpoint, json=payload)
-        response_json = response.json()
-        
-        if "response" in response_json:
-            return response_json["response"]
-        else:
-            print(f"Unexpected response format: {response_json}")
-            return "Image description unavailable"
+        description = llm_manager.invoke(DESCRIBE_IMAGE_PROMPT, task="image_description", images=[image_b64])
+        cache.set(cache_key, description)
+        return description
     except Exception as e:
         print(f"Error describing image: {e}")
-        return "Image description unavailable"
+        return IMAGE_DESCRIPTION_UNAVAILABLE
 
 def is_graph(image_content):
     """Determine if an image is a graph or chart."""
@@ -64,19 +76,75 @@ def is_graph(image_content):
 
 def process_graph(image_content):
     """Process a graph image and generate a description."""
+    cache = get_description_cache()
+    cache_key = make_cache_key(
+        "explain", image_content, llm_manager.route("image_description")[0], DESCRIBE_IMAGE_PROMPT,
+        llm_manager.route("chart_explanation")[0], EXPLAIN_CHART_PROMPT
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        llm = OllamaLLM(model="gemma3:12b-it-q4_K_M", temperature=0.2, base_url=OLLAMA_HOST)
+        # Served from the cache when is_graph already described this image
         description = describe_image(image_content)
         
         # Get response from the LLM
-        response = llm.invoke("Explain this chart in detail with health implications: " + description)
+        response = llm_manager.invoke(EXPLAIN_CHART_PROMPT + description, task="chart_explanation")
+        if description != IMAGE_DESCRIPTION_UNAVAILABLE:
+            cache.set(cache_key, response)
         return response
     except Exception as e:
         print(f"Error processing graph: {e}")
         return f"Chart or graph (Error during analysis: {str(e)})"
 
-def extract_text_around_item(text_blocks, bbox, page_height, threshold_percentage=0.1):
-    """Extract text above and below a given bounding box on a page."""
+def describe_figure(image_content):
+    """Caption text for an embedded image: a chart explanation, or blank for non-charts."""
+    if is_graph(image_content):
+        return process_graph(image_content)
+    return " "
+
+class EnrichmentItem:
+    """A table or image whose Document is waiting for its vision-model description."""
+
+    def __init__(self, describe_fn, image_content, build_fn):
+        self.describe_fn = describe_fn
+        self.image_content = image_content
+        self.build_fn = build_fn
+
+    def describe(self):
+        if self.describe_fn is None:
+            return ""
+        try:
+            return self.describe_fn(self.image_content)
+        except Exception as e:
+            print(f"Error enriching item: {e}")
+            return ""
+
+def enrich_items(items, max_concurrency=None):
+    """
+    Describe pending table/image items concurrently and build their Documents.
+
+    Up to max_concurrency vision-model calls run at once over the shared
+    pooled client; the returned Documents keep the order of items.
+    """
+    if not items:
+        return []
+    max_concurrency = max_concurrency or OLLAMA_MAX_CONCURRENCY
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        descriptions = list(executor.map(EnrichmentItem.describe, items))
+    return [item.build_fn(description) for item, description in zip(items, descriptions)]
+
+def extract_text_around_item(text_blocks, bbox, page_height, threshold_percentage=0.1, block_index=None):
+    """
+    Extract text above and below a given bounding box on a page.
+
+    If a TextBlockIndex built from text_blocks is given, it is queried instead of
+    scanning every block; the result is the same.
+    """
+    if block_index is not None:
+        return block_index.text_around(bbox, page_height, threshold_percentage)
+
     before_text, after_text = "", ""
     vertical_threshold_distance = page_height * threshold_percentage
     
@@ -89,6 +157,55 @@ def extract_text_around_item(text_blocks, bbox, page_height, threshold_percentag
             break
     return before_text, after_text
 
+class TextBlockIndex:
+    """
+    Vertical index over a page's text blocks for caption lookup.
+
+    Block positions are kept sorted by top (y0) and bottom (y1) so each lookup
+    only visits blocks within the threshold distance of the item, instead of
+    every block on the page. Results match the linear scan in
+    extract_text_around_item, including its block-order tie-breaking.
+    """
+
+    def __init__(self, text_blocks):
+        self.text_blocks = text_blocks
+        by_top = sorted(range(len(text_blocks)), key=lambda i: text_blocks[i][1])
+        by_bottom = sorted(range(len(text_blocks)), key=lambda i: text_blocks[i][3])
+        self._top_order = by_top
+        self._tops = [text_blocks[i][1] for i in by_top]
+        self._bottom_order = by_bottom
+        self._bottoms = [text_blocks[i][3] for i in by_bottom]
+
+    def text_around(self, bbox, page_height, threshold_percentage=0.1):
+        """Return (before_text, after_text) for an item's bounding box."""
+        threshold = page_height * threshold_percentage
+        # Widen the bisect window slightly; exact comparisons below decide membership
+        slack = 1e-6 * max(1.0, abs(page_height))
+        blocks = self.text_blocks
+
+        # First block (in block order) starting below the item within the threshold
+        after_idx = len(blocks)
+        lo = bisect.bisect_right(self._tops, bbox.y1)
+        hi = bisect.bisect_right(self._tops, bbox.y1 + threshold + slack)
+        for i in self._top_order[lo:hi]:
+            y0, y1 = blocks[i][1], blocks[i][3]
+            if (i < after_idx and y0 > bbox.y1 and abs(y0 - bbox.y1) <= threshold
+                    and not (y1 < bbox.y0 and abs(y1 - bbox.y0) <= threshold)):
+                after_idx = i
+
+        # Last block ending above the item within the threshold, before the "after" block
+        before_idx = -1
+        lo = bisect.bisect_left(self._bottoms, bbox.y0 - threshold - slack)
+        hi = bisect.bisect_left(self._bottoms, bbox.y0)
+        for i in self._bottom_order[lo:hi]:
+            y1 = blocks[i][3]
+            if before_idx < i < after_idx and y1 < bbox.y0 and abs(y1 - bbox.y0) <= threshold:
+                before_idx = i
+
+        before_text = blocks[before_idx][4] if before_idx >= 0 else ""
+        after_text = blocks[after_idx][4] if after_idx < len(blocks) else ""
+        return before_text, after_text
+
 def process_text_blocks(text_blocks, char_count_threshold=500):
     """Group text blocks based on character count."""
     current_group = []
@@ -113,109 +230,238 @@ def save_uploaded_file(uploaded_file):
     """Save an uploaded file temporarily."""
     temp_dir = os.path.join(os.getcwd(), "temp_uploads")
     os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, uploaded_file.name)
+    temp_path = os.path.join(temp_dir, os.path.basename(uploaded_file.name))
     
+    # Copy in fixed-size chunks instead of reading the whole upload into memory
     with open(temp_path, "wb") as f:
-        f.write(uploaded_file.read())
+        shutil.copyfileobj(uploaded_file, f, UPLOAD_COPY_CHUNK_SIZE)
     return temp_path
 
+def get_local_path(source):
+    """Return the on-disk path behind a path string or file object, or None."""
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+    else:
+        path = getattr(source, 'name', None)
+    if isinstance(path, str) and os.path.isfile(path):
+        return path
+    return None
+
+def open_pdf(source):
+    """
+    Open a PDF without copying it into memory where possible.
+
+    Paths (and file objects backed by a file on disk) are opened by path, so
+    MuPDF reads pages from the file on demand. In-memory buffers (bytes,
+    bytearray, memoryview, mmap, BytesIO) are wrapped in a memoryview, which
+    MuPDF reads in place; only other file-like objects are read into memory.
+    The buffer must stay open until the document is closed.
+    """
+    path = get_local_path(source)
+    if path is not None:
+        return fitz.open(path, filetype="pdf")
+    if isinstance(source, BytesIO):
+        return fitz.open(stream=source.getbuffer(), filetype="pdf")
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        # PyMuPDF copies a bytearray (and rejects an mmap) but uses a memoryview as-is
+        return fitz.open(stream=source if isinstance(source, bytes) else memoryview(source), filetype="pdf")
+    return fitz.open(stream=source.read(), filetype="pdf")
+
+def get_pdf_name(source):
+    """Name used in document sources: the file path, or 'unknown_pdf'."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return source.name if hasattr(source, 'name') else 'unknown_pdf'
+
 # Main document processing functions
-def get_pdf_documents(pdf_file):
-    """Process a PDF file and extract text, tables, and images."""
-    all_pdf_documents = []
+def get_pdf_documents(pdf_file, page_range=None):
+    """
+    Process a PDF file and extract text, tables, and images.
+
+    Args:
+        pdf_file: Path of the PDF, an open binary file object, or the PDF bytes
+        page_range: Optional (start, end) tuple restricting processing to pages start..end-1
+
+    Returns:
+        List of Document objects in page order
+    """
+    return list(iter_pdf_documents(pdf_file, page_range=page_range))
+
+def iter_pdf_documents(pdf_file, page_range=None):
+    """Generator version of get_pdf_documents that yields Documents page by page."""
     ongoing_tables = {}
+    enrichment_items = []
+    # Opens its Parquet file lazily, on the first table
+    pdf_name = get_pdf_name(pdf_file)
+    table_store = TableStoreWriter(table_store_path(pdf_name, page_range))
+
+    # Errors opening the PDF propagate, so ingestion can tell a failed file from an empty one
+    f = open_pdf(pdf_file)
 
     try:
-        f = fitz.open(stream=pdf_file.read(), filetype="pdf")
-    except Exception as e:
-        print(f"Error opening or processing the PDF file: {e}")
-        return []
+        start, end = page_range if page_range else (0, len(f))
+        for i in range(start, min(end, len(f))):
+            page = f[i]
+            text_blocks = [block for block in page.get_text("blocks", sort=True) 
+                           if block[-1] == 0 and not (block[1] < page.rect.height * 0.1 or block[3] > page.rect.height * 0.9)]
+            grouped_text_blocks = process_text_blocks(text_blocks)
+            
+            block_index = TextBlockIndex(text_blocks)
+            table_bboxes = []
+            if PARSE_TABLES:
+                _, table_bboxes, ongoing_tables = parse_all_tables(pdf_name, page, i, text_blocks, ongoing_tables, enrichment_items, block_index, table_store)
+            if PARSE_IMAGES:
+                parse_all_images(pdf_name, page, i, text_blocks, enrichment_items, block_index)
+
+            for text_block_ctr, (heading_block, content) in enumerate(grouped_text_blocks, 1):
+                heading_bbox = fitz.Rect(heading_block[:4])
+                # Text inside a table is indexed with the table
+                if any(heading_bbox.intersects(table_bbox) for table_bbox in table_bboxes):
+                    continue
+                yield Document(
+                    page_content=f"{heading_block[4]}\\n{content}",
+                    metadata={
+                        "source": f"{pdf_name}-page{i}-block{text_block_ctr}",
+                        "type": "text",
+                        "page_num": i,
+                        "caption": "",
+                        "x1": heading_block[0],
+                        "y1": heading_block[1],
+                        "x2": heading_block[2],
+                        "x3": heading_block[3],
+                        "dataframe_path": "",
+                        "image_path": ""
+                    }
+                )
+
+        # Tables and images of the whole document are described concurrently
+        yield from enrich_items(enrichment_items)
+    finally:
+        table_store.close()
+        f.close()
+
+def parse_all_tables(filename, page, pagenum, text_blocks, ongoing_tables, enrichment_items=None,
+                     block_index=None, table_store=None):
+    """
+    Extract tables from a PDF page.
 
-    for i in range(len(f)):
-        page = f[i]
-        text_blocks = [block for block in page.get_text("blocks", sort=True) 
-                       if block[-1] == 0 and not (block[1] < page.rect.height * 0.1 or block[3] > page.rect.height * 0.9)]
-        grouped_text_blocks = process_text_blocks(text_blocks)
-        
-        # table_docs, table_bboxes, ongoing_tables = parse_all_tables(pdf_file.name, page, i, text_blocks, ongoing_tables)
-        # all_pdf_documents.extend(table_docs)
-
-        # image_docs = parse_all_images(pdf_file.name, page, i, text_blocks)
-        # all_pdf_documents.extend(image_docs)
-
-        for text_block_ctr, (heading_block, content) in enumerate(grouped_text_blocks, 1):
-            heading_bbox = fitz.Rect(heading_block[:4])
-            # if not any(heading_bbox.intersects(table_bbox) for table_bbox in table_bboxes):
-            text_doc = Document(
-                page_content=f"{heading_block[4]}\\n{content}",
-                metadata={
-                    "source": f"{pdf_file.name if hasattr(pdf_file, 'name') else 'unknown_pdf'}-page{i}-block{text_block_ctr}",
-                    "type": "text",
-                    "page_num": i,
-                    "caption": "",
-                    "x1": heading_block[0],
-                    "y1": heading_block[1],
-                    "x2": heading_block[2],
-                    "x3": heading_block[3],
-                    "dataframe_path": "",
-                    "image_path": ""
-                }
-            )
-            all_pdf_documents.append(text_doc)
-
-    f.close()
-    return all_pdf_documents
-
-def parse_all_tables(filename, page, pagenum, text_blocks, ongoing_tables):
-    """Extract tables from a PDF page."""
+    If enrichment_items is a list, table descriptions are deferred: an
+    EnrichmentItem is appended per table for enrich_items to complete, and the
+    returned table_docs is empty. block_index is the page's TextBlockIndex,
+    built here if not given. Tables are written to table_store, the document's
+    TableStoreWriter; without one, a store for this page is created and closed.
+    """
+    block_index = block_index or TextBlockIndex(text_blocks)
+    owns_table_store = table_store is None
+    if owns_table_store:
+        table_store = TableStoreWriter(table_store_path(filename, (pagenum, pagenum + 1)))
     table_docs = []
     table_bboxes = []
+    table_num = 0
     try:
         tables = page.find_tables(horizontal_strategy="lines_strict", vertical_strategy="lines_strict")
         for tab in tables:
             if not tab.header.external:
+                table_num += 1
                 pandas_df = tab.to_pandas()
-                tablerefdir = os.path.join(os.getcwd(), "vectorstore/table_references")
+                tablerefdir = os.path.join(os.getcwd(), TABLE_REFERENCES_DIR)
                 os.makedirs(tablerefdir, exist_ok=True)
-                df_xlsx_path = os.path.join(tablerefdir, f"table{len(table_docs)+1}-page{pagenum}.xlsx")
-                pandas_df.to_excel(df_xlsx_path)
+                df_path = table_store.add(f"page{pagenum}-table{table_num}", pandas_df)
                 bbox = fitz.Rect(tab.bbox)
                 table_bboxes.append(bbox)
 
-                before_text, after_text = extract_text_around_item(text_blocks, bbox, page.rect.height)
+                before_text, after_text = extract_text_around_item(text_blocks, bbox, page.rect.height, block_index=block_index)
 
                 table_img = page.get_pixmap(clip=bbox)
-                table_img_path = os.path.join(tablerefdir, f"table{len(table_docs)+1}-page{pagenum}.jpg")
+                table_img_path = os.path.join(tablerefdir, f"{document_file_prefix(filename)}-page{pagenum}-table{table_num}.jpg")
                 table_img.save(table_img_path)
-                description = process_graph(table_img.tobytes())
-
-                caption = before_text.replace("\n", " ") + description + after_text.replace("\n", " ")
-                if before_text == "" and after_text == "":
-                    caption = " ".join(tab.header.names)
-                
-                all_cols = ", ".join(list(pandas_df.columns.values))
-                table_content = f"This is a table with the caption: {caption}\nThe columns are {all_cols}"
-                
-                table_metadata = {
-                    "source": f"{filename[:-4] if isinstance(filename, str) else 'unknown'}-page{pagenum}-table{len(table_docs)+1}",
-                    "type": "table",
-                    "page_num": pagenum,
-                    "caption": caption if caption else "",
-                    "x1": -1.0,
-                    "y1": -1.0,
-                    "x2": -1.0,
-                    "x3": -1.0,
-                    "dataframe_path": df_xlsx_path if df_xlsx_path else "",
-                    "image_path": table_img_path if table_img_path else ""
-                }
-                doc = Document(page_content=table_content, metadata=table_metadata)
-                table_docs.append(doc)
+
+                build_fn = functools.partial(
+                    _build_table_document, filename, pagenum, table_num, before_text, after_text,
+                    " ".join(tab.header.names), ", ".join(list(pandas_df.columns.values)),
+                    df_path, table_img_path
+                )
+                # Without surrounding text the caption is the header row, so skip the description
+                describe_fn = process_graph if (before_text or after_text) else None
+                item = EnrichmentItem(describe_fn, table_img.tobytes(), build_fn)
+                if enrichment_items is None:
+                    table_docs.append(build_fn(item.describe()))
+                else:
+                    enrichment_items.append(item)
     except Exception as e:
         print(f"Error during table extraction: {e}")
+    finally:
+        if owns_table_store:
+            table_store.close()
     return table_docs, table_bboxes, ongoing_tables
 
-def parse_all_images(filename, page, pagenum, text_blocks):
-    """Extract images from a PDF page."""
+def table_store_path(filename, page_range=None):
+    """
+    Path of the Parquet table store for a document (or a page range of it).
+
+    Page-range tasks of the same document run in different processes, so each
+    range gets its own partition file.
+    """
+    suffix = f"-pages{page_range[0]}-{page_range[1] - 1}" if page_range else ""
+    return os.path.join(os.getcwd(), TABLE_REFERENCES_DIR, f"{document_file_prefix(filename)}{suffix}.parquet")
+
+def document_file_prefix(filename):
+    """"<name>-<path hash>" prefix of files extracted from a document, unique across documents"""
+    name = filename if isinstance(filename, str) else "unknown"
+    stem = os.path.splitext(os.path.basename(name))[0]
+    path_hash = hashlib.sha1(os.path.abspath(name).encode("utf-8")).hexdigest()[:8]
+    return f"{stem}-{path_hash}"
+
+def document_text(doc, max_table_rows=None):
+    """
+    Text of a retrieved Document for a prompt.
+
+    Table Documents only index their caption and column names; their first
+    max_table_rows rows are loaded from the table store and appended.
+    """
+    dataframe_path = doc.metadata.get("dataframe_path")
+    if doc.metadata.get("type") != "table" or not dataframe_path:
+        return doc.page_content
+    try:
+        df = load_table(dataframe_path)
+    except Exception as e:
+        print(f"[DOC_PROC] Could not load table {dataframe_path}: {e}")
+        return doc.page_content
+    max_table_rows = max_table_rows or TABLE_CONTEXT_MAX_ROWS
+    return f"{doc.page_content}\n{df.head(max_table_rows).to_csv(index=False)}"
+
+def _build_table_document(filename, pagenum, table_num, before_text, after_text, header_names,
+                          all_cols, df_path, table_img_path, description):
+    """Build the Document for an extracted table once its description is known."""
+    caption = before_text.replace("\n", " ") + description + after_text.replace("\n", " ")
+    if before_text == "" and after_text == "":
+        caption = header_names
+    
+    table_content = f"This is a table with the caption: {caption}\nThe columns are {all_cols}"
+    
+    table_metadata = {
+        "source": f"{filename[:-4] if isinstance(filename, str) else 'unknown'}-page{pagenum}-table{table_num}",
+        "type": "table",
+        "page_num": pagenum,
+        "caption": caption if caption else "",
+        "x1": -1.0,
+        "y1": -1.0,
+        "x2": -1.0,
+        "x3": -1.0,
+        "dataframe_path": df_path if df_path else "",
+        "image_path": table_img_path if table_img_path else ""
+    }
+    return Document(page_content=table_content, metadata=table_metadata)
+
+def parse_all_images(filename, page, pagenum, text_blocks, enrichment_items=None, block_index=None):
+    """
+    Extract images from a PDF page.
+
+    If enrichment_items is a list, image descriptions are deferred to
+    enrich_items in the same way as parse_all_tables. block_index is the
+    page's TextBlockIndex, built here if not given.
+    """
+    block_index = block_index or TextBlockIndex(text_blocks)
     image_docs = []
     image_info_list = page.get_image_info(xrefs=True)
     page_rect = page.rect
@@ -231,89 +477,230 @@ def parse_all_images(filename, page, pagenum, text_blocks):
 
         extracted_image = page.parent.extract_image(xref)
         image_data = extracted_image["image"]
-        imgrefpath = os.path.join(os.getcwd(), "vectorstore/image_references")
+        imgrefpath = os.path.join(os.getcwd(), IMAGE_REFERENCES_DIR)
         os.makedirs(imgrefpath, exist_ok=True)
-        image_path = os.path.join(imgrefpath, f"image{xref}-page{pagenum}.png")
+        image_path = os.path.join(imgrefpath, f"{document_file_prefix(filename)}-image{xref}-page{pagenum}.png")
         with open(image_path, "wb") as img_file:
             img_file.write(image_data)
 
-        before_text, after_text = extract_text_around_item(text_blocks, img_bbox, page.rect.height)
+        before_text, after_text = extract_text_around_item(text_blocks, img_bbox, page.rect.height, block_index=block_index)
         if before_text == "" and after_text == "":
             continue
 
-        image_description = " "
-        if is_graph(image_data):
-            image_description = process_graph(image_data)
-
-        caption = before_text.replace("\n", " ") + image_description + after_text.replace("\n", " ")
-
-        image_metadata = {
-            "source": f"{filename[:-4] if isinstance(filename, str) else 'unknown'}-page{pagenum}-image{xref}",
-            "type": "image",
-            "page_num": pagenum,
-            "caption": caption if caption else "",
-            "x1": -1.0,
-            "y1": -1.0,
-            "x2": -1.0,
-            "x3": -1.0,
-            "dataframe_path": "",
-            "image_path": image_path if image_path else ""
-        }
-        doc = Document(page_content=caption if caption else "Image content", metadata=image_metadata)
-        image_docs.append(doc)
+        build_fn = functools.partial(_build_image_document, filename, pagenum, xref, before_text, after_text, image_path)
+        item = EnrichmentItem(describe_figure, image_data, build_fn)
+        if enrichment_items is None:
+            image_docs.append(build_fn(item.describe()))
+        else:
+            enrichment_items.append(item)
     return image_docs
 
+def _build_image_document(filename, pagenum, xref, before_text, after_text, image_path, image_description):
+    """Build the Document for an extracted image once its description is known."""
+    caption = before_text.replace("\n", " ") + image_description + after_text.replace("\n", " ")
+
+    image_metadata = {
+        "source": f"{filename[:-4] if isinstance(filename, str) else 'unknown'}-page{pagenum}-image{xref}",
+        "type": "image",
+        "page_num": pagenum,
+        "caption": caption if caption else "",
+        "x1": -1.0,
+        "y1": -1.0,
+        "x2": -1.0,
+        "x3": -1.0,
+        "dataframe_path": "",
+        "image_path": image_path if image_path else ""
+    }
+    return Document(page_content=caption if caption else "Image content", metadata=image_metadata)
+
 # Primary functions for the health companion app integration
-def process_health_documents(file_path, is_directory=False):
-    """Process health documents from a file or directory."""
-    all_docs = []
+def process_health_documents(file_path, is_directory=False, num_workers=1, pages_per_task=50):
+    """
+    Process health documents from a file or directory.
+
+    Args:
+        file_path: Path to a PDF file or a folder of PDFs
+        is_directory: Whether file_path is a folder
+        num_workers: Number of worker processes; 1 processes files sequentially
+        pages_per_task: Large PDFs are split into page ranges of this size across workers
+
+    Returns:
+        List of Document objects, ordered by file name and page
+    """
     if is_directory:
         print(f"[DOC_PROC] Processing directory: {file_path}")
         if not os.path.isdir(file_path):
             print(f"[DOC_PROC] Error: Provided path is not a directory: {file_path}")
             return []
-        for filename in os.listdir(file_path):
-            print(f"[DOC_PROC] Found file: {filename}")
-            filepath = os.path.join(file_path, filename)
-            if os.path.isfile(filepath) and filepath.lower().endswith('.pdf'):
-                all_docs.extend(process_single_file(filepath))
-            else:
-                print(f"[DOC_PROC] Skipping non-PDF file: {filepath}")
+        filepaths = list_pdf_files(file_path)
     else:
         if os.path.isfile(file_path) and file_path.lower().endswith('.pdf'):
             print(f"[DOC_PROC] Processing single PDF file: {file_path}")
-            all_docs.extend(process_single_file(file_path))
+            filepaths = [file_path]
         else:
             print(f"[DOC_PROC] Error: Provided file path is not a PDF: {file_path}")
+            return []
 
-    return all_docs
+    return process_pdf_files(filepaths, num_workers=num_workers, pages_per_task=pages_per_task)
 
-def process_single_file(filepath):
-    """Process a single PDF file."""
+def list_pdf_files(folder):
+    """List the PDF files of a folder in a stable (sorted) order."""
+    filepaths = []
+    for filename in sorted(os.listdir(folder)):
+        print(f"[DOC_PROC] Found file: {filename}")
+        filepath = os.path.join(folder, filename)
+        if os.path.isfile(filepath) and filepath.lower().endswith('.pdf'):
+            filepaths.append(filepath)
+        else:
+            print(f"[DOC_PROC] Skipping non-PDF file: {filepath}")
+    return filepaths
+
+def plan_ingest_tasks(filepaths, pages_per_task=50):
+    """
+    Split PDF files into (filepath, page_range) tasks.
+
+    Files with more than pages_per_task pages are split into consecutive page
+    ranges; smaller files (and files whose page count cannot be read) become a
+    single whole-file task with page_range None.
+    """
+    tasks = []
+    for filepath in filepaths:
+        try:
+            with fitz.open(filepath) as f:
+                page_count = len(f)
+        except Exception as e:
+            print(f"[DOC_PROC] Could not read page count of {filepath}: {e}")
+            page_count = 0
+
+        if page_count <= pages_per_task:
+            tasks.append((filepath, None))
+        else:
+            for start in range(0, page_count, pages_per_task):
+                tasks.append((filepath, (start, min(start + pages_per_task, page_count))))
+    return tasks
+
+def _run_ingest_task(task):
+    """Worker entry point: process one (filepath, page_range) task; returns (documents, failed)."""
+    filepath, page_range = task
+    failures = set()
+    docs = process_single_file(filepath, page_range=page_range, failures=failures)
+    return docs, bool(failures)
+
+def process_pdf_files(filepaths, num_workers=1, pages_per_task=50):
+    """
+    Process a list of PDF files, optionally across a pool of worker processes.
+
+    Results are concatenated in task order (file order, then page order), so the
+    output is identical regardless of the number of workers. A file that fails
+    to process contributes no documents and does not stop the run.
+    """
+    return [doc for _, doc in iter_document_stream(filepaths, num_workers, pages_per_task)]
+
+def iter_document_stream(filepaths, num_workers=1, pages_per_task=50, max_pending_tasks=None, failures=None):
+    """
+    Yield (filepath, Document) pairs for a list of PDF files, in file and page order.
+
+    Sequentially, documents are yielded page by page as they are parsed. With
+    num_workers > 1, page-range tasks run in a process pool and at most
+    max_pending_tasks (default 2 * num_workers) are in flight at once, so memory
+    stays bounded by the task size rather than the corpus size. If a worker
+    process dies, the pool is recreated and only the task that crashed it is
+    skipped. Files that failed in whole or in part are added to failures.
+    """
+    if num_workers is None or num_workers <= 1:
+        for filepath in filepaths:
+            for doc in iter_single_file(filepath, failures=failures):
+                yield filepath, doc
+        return
+
+    tasks = plan_ingest_tasks(filepaths, pages_per_task)
+    max_pending_tasks = max_pending_tasks or 2 * num_workers
+    print(f"[DOC_PROC] Processing {len(filepaths)} files as {len(tasks)} tasks with {num_workers} workers")
+
+    # Spawn rather than fork: the parent may already hold torch/tokenizer threads
+    mp_context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=num_workers, mp_context=mp_context)
+    try:
+        task_iter = iter(tasks)
+        pending = deque()
+        for task in itertools.islice(task_iter, max_pending_tasks):
+            pending.append((task, executor.submit(_run_ingest_task, task)))
+
+        while pending:
+            task, future = pending.popleft()
+            filepath, page_range = task
+            try:
+                docs, failed = future.result()
+            except BrokenProcessPool:
+                # A worker died (segfault, OOM kill) and took every in-flight task with it.
+                # Re-run this task alone in a fresh pool: if it kills that one too it is the
+                # culprit and is skipped; the other in-flight tasks are resubmitted.
+                print(f"[DOC_PROC] Worker process died while {filepath} (pages {page_range}) was in flight; retrying it alone")
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=num_workers, mp_context=mp_context)
+                try:
+                    docs, failed = executor.submit(_run_ingest_task, task).result()
+                except BrokenProcessPool:
+                    print(f"[DOC_PROC] Worker process died on {filepath} (pages {page_range}); skipping it")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = ProcessPoolExecutor(max_workers=num_workers, mp_context=mp_context)
+                    docs, failed = [], True
+                except Exception as e:
+                    print(f"[DOC_PROC] Worker failed on {filepath} (pages {page_range}): {e}")
+                    docs, failed = [], True
+                pending = deque((other, executor.submit(_run_ingest_task, other)) for other, _ in pending)
+            except Exception as e:
+                print(f"[DOC_PROC] Worker failed on {filepath} (pages {page_range}): {e}")
+                docs, failed = [], True
+            if failed and failures is not None:
+                failures.add(filepath)
+
+            next_task = next(task_iter, None)
+            if next_task is not None:
+                pending.append((next_task, executor.submit(_run_ingest_task, next_task)))
+
+            for doc in docs:
+                yield filepath, doc
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def process_single_file(filepath, page_range=None, failures=None):
+    """Process a single PDF file, or a (start, end) page range of it."""
+    return list(iter_single_file(filepath, page_range=page_range, failures=failures))
+
+def iter_single_file(filepath, page_range=None, failures=None):
+    """Generator version of process_single_file that yields Documents page by page."""
     _, ext = os.path.splitext(filepath)
     ext = ext.lower()
     
     if ext != ".pdf":
         print(f"[DOC_PROC] Skipping non-PDF file: {filepath}")
-        return []
+        return
         
-    print(f"[DOC_PROC] Processing PDF file: {filepath}")
+    print(f"[DOC_PROC] Processing PDF file: {filepath}" + (f" (pages {page_range[0]}-{page_range[1] - 1})" if page_range else ""))
 
-    docs = []
+    num_docs = 0
     try:
-        with open(filepath, 'rb') as f:
-            docs = get_pdf_documents(f)
-        print(f"[DOC_PROC] Successfully processed PDF: {filepath}, extracted {len(docs)} documents.")
+        for doc in iter_pdf_documents(filepath, page_range=page_range):
+            num_docs += 1
+            yield doc
+        print(f"[DOC_PROC] Successfully processed PDF: {filepath}, extracted {num_docs} documents.")
     except Exception as e:
-        print(f"[DOC_PROC] Error processing PDF file {filepath}: {e}")
-
-    return docs
+        print(f"[DOC_PROC] Error processing PDF file {filepath} after {num_docs} documents: {e}")
+        if failures is not None:
+            failures.add(filepath)
 
 def process_uploaded_files(files):
     """Process files uploaded through the Gradio interface."""
     documents = []
     for file in files:
         if hasattr(file, 'name') and file.name.lower().endswith('.pdf'):
+            # Gradio already stores uploads in a temp file; read it in place
+            upload_path = get_local_path(file)
+            if upload_path is not None:
+                documents.extend(process_single_file(upload_path))
+                continue
+
             temp_path = save_uploaded_file(file)
             docs = process_single_file(temp_path)
             documents.extend(docs)
@@ -326,6 +713,14 @@ def process_uploaded_files(files):
             print(f"[DOC_PROC] Skipping non-PDF uploaded file: {file.name if hasattr(file, 'name') else 'unknown'}")
     return documents
 
+def get_text_splitter(chunk_size=1000, chunk_overlap=100):
+    """Create the text splitter used to chunk documents for RAG."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len
+    )
+
 def chunk_documents(documents, chunk_size=1000, chunk_overlap=100):
     """
     Split documents into smaller chunks for RAG.
@@ -338,9 +733,4 @@ def chunk_documents(documents, chunk_size=1000, chunk_overlap=100):
     Returns:
         List of chunked Document objects
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len
-    )
-    return text_splitter.split_documents(documents) 
\ No newline at end of file
+    return get_text_splitter(chunk_size, chunk_overlap).split_documents(documents) 
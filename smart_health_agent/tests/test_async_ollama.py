@@ -0,0 +1,53 @@
+import asyncio
+import time
+from contextlib import aclosing
+from benchmarks.fake_services import FakeOllama
+from core.async_ollama import AsyncOllamaClient
+
+def _run(coro):
+    return asyncio.run(coro)
+
+def test_identical_requests_share_one_upstream_call():
+    with FakeOllama(ttft=0.05, tokens_per_second=200, num_tokens=20) as fake:
+        client = AsyncOllamaClient(base_url=fake.url, max_retries=0)
+
+        async def main():
+            try:
+                return await asyncio.gather(*(client.generate("m", "same prompt") for _ in range(3)),
+                                            client.generate("m", "other prompt"))
+            finally:
+                await client.aclose()
+
+        first, second, third, other = _run(main())
+        assert first == second == third and len(first.split()) == 20
+        assert fake.stats()["generations"] == 2
+        assert client.stats() == {"upstream_calls": 2, "coalesced_calls": 2, "in_flight": 0}
+
+def test_upstream_is_cancelled_when_the_last_follower_leaves():
+    with FakeOllama(ttft=0.0, tokens_per_second=50, num_tokens=200) as fake:
+        client = AsyncOllamaClient(base_url=fake.url, max_retries=0)
+
+        async def read(n):
+            chunks = []
+            async with aclosing(client.stream("m", "long answer")) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    if len(chunks) == n:
+                        break
+            return chunks
+
+        async def main():
+            try:
+                short, longer = await asyncio.gather(read(2), read(5))
+                # The first reader leaving keeps the call alive for the second
+                assert longer[:2] == short
+                await asyncio.sleep(0)
+                assert client.stats()["in_flight"] == 0
+            finally:
+                await client.aclose()
+
+        _run(main())
+        deadline = time.monotonic() + 5
+        while fake.stats()["cancelled"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert fake.stats()["cancelled"] == 1
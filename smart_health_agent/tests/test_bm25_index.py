@@ -0,0 +1,77 @@
+import threading
+from core.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+CHUNKS = {
+    "a-0": "Resting heart rate between 60 and 100 bpm is normal for adults.",
+    "a-1": "HbA1c above 6.5% indicates diabetes; code E11.9 is type 2 diabetes.",
+    "b-0": "Sleep seven to nine hours; short sleep raises resting heart rate.",
+    "b-1": "Walking 10000 steps a day is a common activity goal."
+}
+
+def _index():
+    index = BM25Index()
+    index.add_many(CHUNKS.items())
+    return index
+
+def test_tokenize_keeps_codes_together():
+    assert tokenize("HbA1c 6.5% and E11.9, COVID-19") == ["hba1c", "6.5", "and", "e11.9", "covid-19"]
+
+def test_search_ranks_by_term_matches():
+    index = _index()
+    results = index.search("normal resting heart rate", k=3)
+    assert [chunk_id for chunk_id, _ in results] == ["a-0", "b-0"]
+    assert results[0][1] > results[1][1] > 0
+    assert [chunk_id for chunk_id, _ in index.search("e11.9 hba1c")] == ["a-1"]
+    assert index.search("unrelated words") == []
+
+def test_removed_chunks_are_not_returned():
+    index = BM25Index(compact_ratio=1.0)  # keep tombstones
+    index.add_many(CHUNKS.items())
+    index.remove(["a-0", "missing"])
+    assert "a-0" not in index and len(index) == 3
+    assert [chunk_id for chunk_id, _ in index.search("resting heart rate")] == ["b-0"]
+    # Re-adding replaces
+    index.add("b-0", "Nothing about that topic.")
+    assert index.search("resting heart rate") == []
+
+def test_top_k_matches_full_ranking():
+    index = BM25Index()
+    for i in range(200):
+        index.add(f"c-{i}", "heart " * (i % 7 + 1) + "rate " * (i % 3) + "filler text " * (i % 5))
+    index.remove([f"c-{i}" for i in range(0, 200, 4)])
+    ranked = index.search("heart rate", k=200)
+    assert index.search("heart rate", k=10) == ranked[:10]
+    assert not any(int(chunk_id.split("-")[1]) % 4 == 0 for chunk_id, _ in ranked)
+
+def test_save_and_load_round_trip(tmp_path):
+    index = _index()
+    index.remove(["b-1"])
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert len(loaded) == 3 and "b-1" not in loaded
+    assert loaded.search("resting heart rate") == index.search("resting heart rate")
+    assert BM25Index.load(str(tmp_path / "missing")) is None
+
+def test_concurrent_updates_and_searches():
+    index = _index()
+    errors = []
+
+    def update():
+        try:
+            for i in range(300):
+                index.add(f"x-{i}", f"heart rate note {i}")
+                if i % 3 == 0:
+                    index.remove([f"x-{i - 3}"])
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=update)
+    thread.start()
+    while thread.is_alive():
+        index.search("heart rate", k=5)
+    thread.join()
+    assert not errors
+
+def test_reciprocal_rank_fusion_prefers_ids_ranked_by_both():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]], k=60)
+    assert [chunk_id for chunk_id, _ in fused] == ["a", "c", "b", "d"]
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+from core.conversation_memory import ConversationMemory, MemoryStore, summarize_with_llm
+from core.llm_manager import llm_manager
+from core.rag_system import rag_system
+from ui.event_handlers import EventHandlers
+from utils import cache
+
+def test_summary_drops_reasoning(monkeypatch):
+    monkeypatch.setattr(llm_manager, "invoke", lambda prompt, task=None: "<think>\nThe user said...\n</think>\n\nUser is diabetic.")
+    assert summarize_with_llm("", "User: I am diabetic.\n", 100) == "User is diabetic."
+
+def test_evicted_turns_are_summarized_without_reasoning(monkeypatch):
+    monkeypatch.setattr(llm_manager, "invoke", lambda prompt, task=None: "<think>plan</think>Earlier: asked about sleep.")
+    memory = ConversationMemory(token_budget=20)
+    memory.add("user", "How much sleep do I need each night?")
+    memory.add("assistant", "Most adults need seven to nine hours.")
+    assert memory.summary == "Earlier: asked about sleep."
+    assert "<think>" not in memory.render()
+
+def test_session_expires_after_ttl_unused_not_after_creation(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    store = MemoryStore(ttl=60)
+    memory = store.get("a")
+    # Used every 30 s: kept well past 60 s after creation
+    for _ in range(5):
+        now[0] += 30
+        assert store.get("a") is memory
+    now[0] += 61
+    assert store.get("a") is not memory
+
+def test_failed_answer_is_not_remembered(monkeypatch):
+    def failing_stream(prompt, task=None):
+        yield "Partial adv"
+        raise ConnectionError("Ollama went away")
+
+    monkeypatch.setattr(rag_system, "vectorstore", None)
+    monkeypatch.setattr(llm_manager, "stream_response", failing_stream)
+    handlers = EventHandlers()
+    for _, history in handlers.chat_interact("How much should I walk?", [], use_cache=False, session_id="s"):
+        pass
+
+    assert "Error generating response" in history[-1]["content"]
+    memory = handlers.memory.get("s")
+    assert memory.render() == ""
+    # The error message in the UI history is not picked up on the next turn either
+    memory.sync(history)
+    assert memory.render() == ""
@@ -0,0 +1,35 @@
+from core.dedup import ChunkDeduplicator
+
+TEXT = ("Adults should aim for at least 150 minutes of moderate aerobic activity every week, "
+        "such as brisk walking or cycling, spread across most days, plus muscle strengthening "
+        "exercises on two or more days that work all the major muscle groups of the body.")
+
+def test_exact_and_near_duplicates_merge_into_the_survivor():
+    dedup = ChunkDeduplicator(threshold=0.8)
+    assert dedup.check("a-0", TEXT, "a.pdf", "a-page0-block1") is None
+    # Case and punctuation are normalized away
+    assert dedup.check("b-0", TEXT.upper().replace(",", ""), "b.pdf", "b-page0-block1") == "a-0"
+    assert dedup.check("c-0", TEXT + " Every week.", "c.pdf", "c-page3-block2") == "a-0"
+    assert dedup.check("d-0", "Most adults need seven to nine hours of sleep per night.", "d.pdf") is None
+    assert dedup.duplicates == 2
+    assert dedup.merged_sources("a-0") == ["b-page0-block1", "c-page3-block2"]
+
+def test_removing_a_survivor_returns_files_merged_into_it():
+    dedup = ChunkDeduplicator()
+    dedup.check("a-0", TEXT, "a.pdf", "a-page0-block1")
+    dedup.check("b-0", TEXT, "b.pdf", "b-page0-block1")
+    assert dedup.remove(["a-0"]) == {"b.pdf"}
+    # The text is new again once its survivor is gone
+    assert dedup.check("b-0", TEXT, "b.pdf", "b-page0-block1") is None
+
+def test_state_survives_save_and_load(tmp_path):
+    dedup = ChunkDeduplicator(threshold=0.8)
+    dedup.check("a-0", TEXT, "a.pdf", "a-page0-block1")
+    dedup.check("b-0", TEXT, "b.pdf", "b-page0-block1")
+    dedup.save(str(tmp_path))
+
+    loaded = ChunkDeduplicator.load(str(tmp_path), 0.8, 128, 5)
+    assert loaded.merged == {"a-0": [["b.pdf", "b-page0-block1"]]}
+    assert loaded.check("c-0", TEXT + " Every week.", "c.pdf") == "a-0"
+    # Different settings start empty
+    assert ChunkDeduplicator.load(str(tmp_path), 0.9, 128, 5).check("c-0", TEXT, "c.pdf") is None
@@ -0,0 +1,119 @@
+import gc
+import io
+import mmap
+import os
+import fitz
+import pytest
+import document_processor as dp
+
+def _write_pdf(path, text, pages=1):
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 200, 545, 400), f"{text} page {page_number}. " * 5, fontsize=10)
+    doc.save(path)
+    doc.close()
+    return path
+
+def _crash_on_marker(task):
+    """Stand-in for _run_ingest_task whose worker process dies on files named crash*"""
+    filepath, page_range = task
+    if os.path.basename(filepath).startswith("crash"):
+        os._exit(1)
+    return dp._run_ingest_task(task)
+
+def test_dead_worker_skips_only_its_file(tmp_path, monkeypatch):
+    files = [
+        _write_pdf(str(tmp_path / "a.pdf"), "Alpha"),
+        _write_pdf(str(tmp_path / "crash.pdf"), "Crash"),
+        _write_pdf(str(tmp_path / "c.pdf"), "Gamma", pages=3),
+        _write_pdf(str(tmp_path / "d.pdf"), "Delta")
+    ]
+    # Looked up by name at submit time and pickled by reference into the spawned workers
+    monkeypatch.setattr(dp, "_run_ingest_task", _crash_on_marker)
+
+    failures = set()
+    results = list(dp.iter_document_stream(files, num_workers=2, pages_per_task=1, failures=failures))
+
+    yielded = [filepath for filepath, _ in results]
+    assert files[1] not in yielded
+    assert failures == {files[1]}
+    assert sorted(set(yielded)) == sorted([files[0], files[2], files[3]])
+    expected = [(filepath, doc.page_content) for filepath in files if filepath != files[1]
+                for doc in dp.process_single_file(filepath)]
+    assert [(filepath, doc.page_content) for filepath, doc in results] == expected
+
+def test_open_pdf_reads_mmap_in_place(tmp_path):
+    path = _write_pdf(str(tmp_path / "mapped.pdf"), "Mapped", pages=2)
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    doc = dp.open_pdf(mapped)
+    assert len(doc) == 2
+    assert "Mapped page 1" in doc[1].get_text()
+    # MuPDF holds an exported view of the mapping rather than a copy of it
+    with pytest.raises(BufferError):
+        mapped.close()
+    doc.close()
+    del doc
+    gc.collect()
+    mapped.close()
+
+def test_open_pdf_keeps_buffers_uncopied(tmp_path):
+    data = bytearray(open(_write_pdf(str(tmp_path / "buffer.pdf"), "Buffer"), "rb").read())
+    for source in (data, memoryview(data), io.BytesIO(bytes(data))):
+        doc = dp.open_pdf(source)
+        assert isinstance(doc.stream, memoryview) and "Buffer page 0" in doc[0].get_text()
+        doc.close()
+
+def _write_table_pdf(path, label):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((50, 150), f"Table of {label} readings", fontsize=10)
+    left, top, width, height = 50, 170, 150, 20
+    for row in range(4):
+        for col in range(2):
+            page.draw_rect(fitz.Rect(left + col * width, top + row * height,
+                                     left + (col + 1) * width, top + (row + 1) * height), color=(0, 0, 0))
+            text = ("Metric", "Value")[col] if row == 0 else f"{label} {row}" if col == 0 else str(row * 10)
+            page.insert_text((left + col * width + 5, top + row * height + 14), text, fontsize=9)
+    page.insert_text((50, 270), "Values are weekly averages.", fontsize=10)
+    doc.save(path)
+    doc.close()
+    return path
+
+def test_tables_of_different_documents_are_stored_apart(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dp, "PARSE_TABLES", True)
+    monkeypatch.setattr(dp, "process_graph", lambda image: " described ")
+    paths = [_write_table_pdf(str(tmp_path / name), name.split(".")[0]) for name in ("sleep.pdf", "steps.pdf")]
+
+    tables = [[doc for doc in dp.get_pdf_documents(path) if doc.metadata["type"] == "table"] for path in paths]
+
+    assert [len(docs) for docs in tables] == [1, 1]
+    first, second = tables[0][0].metadata, tables[1][0].metadata
+    assert first["image_path"] != second["image_path"]
+    assert os.path.exists(first["image_path"]) and os.path.exists(second["image_path"])
+    assert first["dataframe_path"].split("#")[0] != second["dataframe_path"].split("#")[0]
+    assert "steps 2,20" in dp.document_text(tables[1][0])
+
+def test_images_are_parsed_with_tables_off(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dp, "PARSE_TABLES", False)
+    monkeypatch.setattr(dp, "PARSE_IMAGES", True)
+    monkeypatch.setattr(dp, "describe_figure", lambda image: " Weekly step counts. ")
+    path = str(tmp_path / "steps.pdf")
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 200), "Figure 1 shows activity.", fontsize=11)
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+    pixmap.set_rect(pixmap.irect, (200, 60, 60))
+    page.insert_image(fitz.Rect(72, 220, 272, 420), stream=pixmap.tobytes("png"))
+    page.insert_text((72, 440), "Steps rose over the week.", fontsize=11)
+    doc.save(path)
+    doc.close()
+
+    images = [doc for doc in dp.get_pdf_documents(path) if doc.metadata["type"] == "image"]
+
+    assert len(images) == 1
+    assert "Weekly step counts." in images[0].page_content
+    assert os.path.exists(images[0].metadata["image_path"])
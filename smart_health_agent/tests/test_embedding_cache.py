@@ -0,0 +1,33 @@
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from core.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    encoded: list = []
+
+    def embed_documents(self, texts):
+        self.encoded.extend(texts)
+        return super().embed_documents(texts)
+
+def test_only_misses_are_encoded_and_vectors_persist(tmp_path):
+    model = CountingEmbedding(size=8, encoded=[])
+    embeddings = CachedEmbeddings(model, EmbeddingCache(str(tmp_path), "model-a"))
+    first = embeddings.embed_documents(["sleep", "steps", "sleep"])
+    assert model.encoded == ["sleep", "steps"]
+    assert first[0] == first[2]
+    assert np.allclose(first[0], model.embed_query("sleep"))
+
+    second = embeddings.embed_documents(["steps", "heart rate"])
+    assert np.allclose(second[0], first[1])
+    assert np.allclose(second[1], model.embed_query("heart rate"))
+    assert model.encoded == ["sleep", "steps", "heart rate"]
+
+    reopened = EmbeddingCache(str(tmp_path), "model-a")
+    assert len(reopened) == 3
+    assert np.allclose(reopened.get_many(["steps"])[0], first[1])
+
+def test_changing_the_model_clears_the_cache(tmp_path):
+    EmbeddingCache(str(tmp_path), "model-a").put_many(["sleep"], [[1.0, 2.0]])
+    cache = EmbeddingCache(str(tmp_path), "model-b")
+    assert len(cache) == 0
+    assert cache.get_many(["sleep"]) == [None]
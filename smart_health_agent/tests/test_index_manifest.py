@@ -0,0 +1,22 @@
+from core.index_manifest import IndexManifest, file_sha256
+
+def _stats(path):
+    stat = path.stat()
+    return {"sha256": file_sha256(str(path)), "mtime": stat.st_mtime, "size": stat.st_size}
+
+def test_failed_file_is_reindexed_until_it_succeeds(tmp_path):
+    ok, broken = tmp_path / "ok.pdf", tmp_path / "broken.pdf"
+    ok.write_bytes(b"ok")
+    broken.write_bytes(b"broken")
+    manifest = IndexManifest()
+    manifest.record_file(str(ok), _stats(ok), ["a-0"])
+    manifest.record_file(str(broken), _stats(broken), ["b-0"], failed=True)
+
+    changes = manifest.diff([str(ok), str(broken)])
+    assert changes.unchanged == [str(ok)]
+    assert changes.to_index == [str(broken)]
+    # Its partial chunks are deleted before the retry
+    assert changes.to_delete == [str(broken)]
+
+    manifest.record_file(str(broken), changes.file_stats[str(broken)], ["b-0", "b-1"])
+    assert manifest.diff([str(ok), str(broken)]).unchanged == [str(ok), str(broken)]
@@ -0,0 +1,35 @@
+import pytest
+from core.json_stream import IncrementalJSONParser, strip_reasoning
+
+def _feed(parser, text, size):
+    """Feed text in chunks of size until the parser returns the object"""
+    for start in range(0, len(text), size):
+        result = parser.feed(text[start:start + size])
+        if result is not None:
+            return result
+    return None
+
+@pytest.mark.parametrize("size", [1, 3, 64])
+def test_object_is_returned_as_soon_as_it_closes(size):
+    text = '<think>{"not": "this"}</think> Sure! {"status": "ok", "advice": {"walk": "30 min {daily}"}} trailing'
+    parser = IncrementalJSONParser(required=["status", "advice"])
+    result = _feed(parser, text, size)
+    assert result == {"status": "ok", "advice": {"walk": "30 min {daily}"}}
+    assert parser.feed(' {"late": 1}') is result
+    assert parser.keys == ["status", "advice"] and parser.missing() == []
+
+def test_escaped_quotes_and_missing_keys():
+    parser = IncrementalJSONParser(required=["status", "advice"])
+    result = _feed(parser, '{"status": "say \\"hi\\" {", "other": 1}', 2)
+    assert result == {"status": 'say "hi" {', "other": 1}
+    assert parser.missing() == ["advice"]
+
+def test_incomplete_object():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"status": ') is None
+    assert not parser.complete
+
+def test_strip_reasoning():
+    assert strip_reasoning("<think>a</think>\n answer <think>b</think>more") == "answer more"
+    assert strip_reasoning("answer <think>cut off") == "answer"
+    assert strip_reasoning(" plain ") == "plain"
@@ -0,0 +1,15 @@
+from core.llm_manager import LLMManager
+
+def test_invoke_drops_reasoning(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the response disk cache lives under the working directory
+    llm = LLMManager()
+    calls = []
+
+    async def fake_generate(model, prompt, images=None, options=None, format=None, keep_alive=None):
+        calls.append(model)
+        return "<think>\nIt is a bar chart of steps.\n</think>\n\nDaily steps rose from 4000 to 9000."
+
+    monkeypatch.setattr(llm.client, "generate", fake_generate)
+    assert llm.invoke("Explain this chart", task="chart_explanation") == "Daily steps rose from 4000 to 9000."
+    assert llm.invoke("Explain this chart", task="chart_explanation", cache=True) == "Daily steps rose from 4000 to 9000."
+    assert len(calls) == 2
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from langchain.schema import Document
+import document_processor as dp
+from agents.medical_knowledge_agent import BucketedKnowledgeCache, bucket_query, metric_buckets
+from core.rag_system import rag_system
+
+@pytest.mark.parametrize("health_data, expected", [
+    ({"heart_rate": 59, "sleep_hours": 6.9, "steps": 9999}, ("low", "short", "sedentary")),
+    ({"heart_rate": 60, "sleep_hours": 7, "steps": 10000}, ("normal", "optimal", "active")),
+    ({"heart_rate": 100, "sleep_hours": 9, "steps": 20000}, ("normal", "optimal", "active")),
+    ({"heart_rate": 101, "sleep_hours": 9.5, "steps": 0}, ("high", "long", "sedentary")),
+    ({}, ("unknown", "unknown", "unknown"))
+])
+def test_metric_buckets_use_the_vitals_thresholds(health_data, expected):
+    assert metric_buckets(health_data) == expected
+
+def test_unknown_buckets_fall_back_to_generic_terms():
+    assert bucket_query(("unknown", "unknown", "unknown")) == "Health insights for: heart rate, sleep, physical activity"
+
+def test_cache_is_filled_per_bucket_and_dropped_with_the_index(monkeypatch):
+    queries = []
+
+    def fake_search(query, k=None):
+        queries.append(query)
+        return [Document(page_content=f"insight {len(queries)}")]
+
+    monkeypatch.setattr(rag_system, "similarity_search", fake_search)
+    monkeypatch.setattr(rag_system, "vectorstore", object())
+    monkeypatch.setattr(rag_system, "index_version", 1)
+    cache = BucketedKnowledgeCache()
+
+    assert cache.precompute() == 48
+    assert len(queries) == 48
+    buckets = metric_buckets({"heart_rate": 72, "sleep_hours": 8, "steps": 12000})
+    texts = cache.get(buckets)
+    assert cache.get(metric_buckets({"heart_rate": 65, "sleep_hours": 7.5, "steps": 15000})) is texts
+    assert len(queries) == 48 and cache.stats()["hits"] == 2
+
+    monkeypatch.setattr(rag_system, "index_version", 2)
+    assert cache.get(buckets) == ["insight 49"]
+    assert cache.stats()["entries"] == 1
+
+def test_retrieved_tables_include_their_rows(monkeypatch):
+    table = Document(page_content="Table: recommended sleep by age. Columns: age, hours",
+                     metadata={"type": "table", "dataframe_path": "tables/sleep.parquet#0"})
+    monkeypatch.setattr(rag_system, "similarity_search", lambda query, k=None: [table])
+    monkeypatch.setattr(dp, "load_table", lambda path: pd.DataFrame({"age": ["18-64"], "hours": ["7-9"]}))
+
+    texts = BucketedKnowledgeCache().get(("normal", "short", "active"))
+
+    assert texts == [f"{table.page_content}\nage,hours\n18-64,7-9\n"]
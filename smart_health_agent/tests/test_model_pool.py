@@ -0,0 +1,40 @@
+import asyncio
+from core.model_pool import ModelPool
+
+class FakeClient:
+    def __init__(self):
+        self.unloaded = []
+
+    async def unload(self, model):
+        self.unloaded.append(model)
+
+def test_routes_pick_model_and_options():
+    pool = ModelPool(FakeClient(), "chat", routes={"summary": {"model": "small", "temperature": 0.0}})
+    assert pool.route("summary") == ("small", {"temperature": 0.0})
+    assert pool.route("summary", model="other")[0] == "other"
+    assert pool.route("unknown")[0] == pool.route()[0] == "chat"
+
+def test_only_models_idle_for_the_timeout_are_unloaded():
+    client = FakeClient()
+    pool = ModelPool(client, "chat", routes={"summary": {"model": "small"}}, idle_timeout=60)
+
+    async def main():
+        busy = pool.get(*pool.route())
+        idle = pool.get(*pool.route("summary"))
+        # Entries of one model with different options are unloaded together
+        idle_variant = pool.get("small", {"temperature": 0.5})
+        idle.last_used -= 120
+        idle_variant.last_used -= 120
+        with pool.use(busy):
+            busy.last_used -= 120
+            await pool.evict_idle()
+            # "chat" is in use
+            assert client.unloaded == ["small"]
+            assert list(pool.models.values()) == [busy]
+        await pool.evict_idle()
+        # Just finished, so not idle yet
+        assert client.unloaded == ["small"]
+        pool._evictor.cancel()
+
+    asyncio.run(main())
+    assert pool.evictions == 1
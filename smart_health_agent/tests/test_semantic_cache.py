@@ -0,0 +1,36 @@
+from core.llm_manager import llm_manager
+from core.rag_system import rag_system
+from ui.event_handlers import EventHandlers
+
+def _chat(handlers, session_id, message, history):
+    for _, history in handlers.chat_interact(message, history, session_id=session_id):
+        pass
+    return history
+
+def test_answer_with_history_is_not_served_to_another_session(monkeypatch):
+    prompts = []
+
+    def fake_stream(prompt, task=None):
+        prompts.append(prompt)
+        yield f"answer {len(prompts)}"
+
+    monkeypatch.setattr(rag_system, "vectorstore", None)
+    # One orthogonal vector per distinct question
+    vectors = {}
+    monkeypatch.setattr(rag_system, "embed_query", lambda query: [float(vectors.setdefault(query, len(vectors)) == i)
+                                                                  for i in range(8)])
+    monkeypatch.setattr(llm_manager, "stream_response", fake_stream)
+    handlers = EventHandlers()
+
+    history_a = _chat(handlers, "a", "My doctor says I am diabetic.", [])
+    history_a = _chat(handlers, "a", "What should I eat for breakfast?", history_a)
+    assert "diabetic" in prompts[-1]
+    history_b = _chat(handlers, "b", "What should I eat for breakfast?", [])
+
+    # Session a's answer depended on its history: session b gets a fresh one
+    assert len(prompts) == 3
+    assert history_b[-1]["content"] == "```answer 3```"
+
+    # Without history the answer is shared
+    _chat(handlers, "c", "What should I eat for breakfast?", [])
+    assert len(prompts) == 3
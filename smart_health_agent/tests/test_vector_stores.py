@@ -0,0 +1,79 @@
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from core.faiss_store import MappedIds, SQLiteDocstore, load_faiss, save_faiss
+from core.index_manifest import make_chunk_id, path_hash
+from core.sharded_store import ShardedVectorStore
+
+EMBEDDINGS = DeterministicFakeEmbedding(size=16)
+FILES = {f"/docs/{name}.pdf": [f"{name} note {i}" for i in range(3)] for name in ("sleep", "steps", "heart", "diet")}
+
+def _chunk_ids(filepath, texts):
+    return [make_chunk_id(filepath, "v1", i) for i in range(len(texts))]
+
+def _sharded(num_shards):
+    store = ShardedVectorStore(EMBEDDINGS, num_shards)
+    for filepath, texts in FILES.items():
+        shard_id = store.shard_of_file(filepath)
+        ids = _chunk_ids(filepath, texts)
+        shard = store.shards[shard_id]
+        if shard is None:
+            store.set_shard(shard_id, FAISS.from_texts(texts, EMBEDDINGS, ids=ids))
+        else:
+            shard.add_texts(texts, ids=ids)
+            store.dirty.add(shard_id)
+    return store
+
+def test_faiss_round_trip_without_pickle(tmp_path):
+    texts = FILES["/docs/sleep.pdf"]
+    vectorstore = FAISS.from_texts(texts, EMBEDDINGS, metadatas=[{"page": i} for i in range(3)], ids=["a", "b", "c"])
+    save_faiss(vectorstore, str(tmp_path))
+    assert not (tmp_path / "index.pkl").exists()
+    # The saved store now reads chunks from SQLite and IDs from the mapped file
+    assert isinstance(vectorstore.docstore, SQLiteDocstore)
+    assert isinstance(vectorstore.index_to_docstore_id, MappedIds)
+
+    for mmap in (False, True):
+        loaded = load_faiss(str(tmp_path), EMBEDDINGS, mmap=mmap)
+        doc = loaded.similarity_search_by_vector(EMBEDDINGS.embed_query(texts[1]), k=1)[0]
+        assert (doc.id, doc.page_content, doc.metadata) == ("b", texts[1], {"page": 1})
+    assert load_faiss(str(tmp_path / "missing"), EMBEDDINGS) is None
+
+def test_chunks_of_a_file_share_a_shard():
+    store = _sharded(3)
+    for filepath, texts in FILES.items():
+        shard_id = store.shard_of_file(filepath)
+        assert {store.shard_of_chunk(chunk_id) for chunk_id in _chunk_ids(filepath, texts)} == {shard_id}
+        assert _chunk_ids(filepath, texts)[0].startswith(path_hash(filepath))
+    assert sorted(store.chunk_ids()) == sorted(i for f, t in FILES.items() for i in _chunk_ids(f, t))
+
+def test_search_merges_shards():
+    store = _sharded(3)
+    query = EMBEDDINGS.embed_query("heart note 2")
+    results = store.similarity_search_by_vector(query, k=4)
+    assert results[0].page_content == "heart note 2"
+    single = _sharded(1).similarity_search_by_vector(query, k=4)
+    assert [doc.id for doc in results] == [doc.id for doc in single]
+
+def test_delete_and_mmap_reload(tmp_path):
+    path = str(tmp_path / "store")
+    store = _sharded(2)
+    store.save_local(path)
+    sleep_ids = _chunk_ids("/docs/sleep.pdf", FILES["/docs/sleep.pdf"])
+    steps_ids = _chunk_ids("/docs/steps.pdf", FILES["/docs/steps.pdf"])
+
+    loaded = ShardedVectorStore.load(path, EMBEDDINGS, num_shards=2, mmap=True)
+    assert loaded.mmapped == {shard_id for shard_id in range(2) if loaded.shards[shard_id] is not None}
+    assert loaded.docstore.search(steps_ids[0]).page_content == "steps note 0"
+
+    # Deleting re-reads the mmapped shard into memory first
+    loaded.delete(sleep_ids + steps_ids[:1])
+    assert loaded.shard_of_file("/docs/sleep.pdf") not in loaded.mmapped
+    loaded.save_local()
+
+    reloaded = ShardedVectorStore.load(path, EMBEDDINGS, num_shards=2, mmap=True)
+    remaining = set(reloaded.chunk_ids())
+    assert not remaining & set(sleep_ids + steps_ids[:1])
+    assert set(steps_ids[1:]) <= remaining
+    assert reloaded.num_vectors() == len(remaining) == 8
+    results = reloaded.similarity_search_by_vector(EMBEDDINGS.embed_query("sleep note 1"), k=8)
+    assert all(not doc.page_content.startswith("sleep") for doc in results)
@@ -1,24 +1,60 @@
 """
 Event handlers for Gradio UI interactions
+
+Heavy modules (langchain, langgraph, FAISS, pandas, the embedding model) are
+imported inside the handlers so the UI can bind its port before they load.
 """
+import time
 import traceback
-from langchain_core.messages import HumanMessage
-from core.state import HealthAgentState
-from core.workflow import build_health_workflow
-from core.rag_system import rag_system
-from core.llm_manager import llm_manager
-from utils.health_data import get_health_data
-from agents.weather_agent import WeatherAgent
-from config import DEFAULT_LATITUDE, DEFAULT_LONGITUDE
+from config import (
+    DEFAULT_LATITUDE, DEFAULT_LONGITUDE, KNOWLEDGE_BUCKETED_RETRIEVAL,
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_TTL
+)
 
 class EventHandlers:
     """Handles all UI events and interactions"""
     
     def __init__(self):
-        self.weather_agent = WeatherAgent()
+        self._weather_agent = None
+        self._answer_cache = None
+        self._memory = None
+
+    @property
+    def weather_agent(self):
+        if self._weather_agent is None:
+            from agents.weather_agent import WeatherAgent
+            self._weather_agent = WeatherAgent()
+        return self._weather_agent
+
+    @property
+    def answer_cache(self):
+        if self._answer_cache is None and SEMANTIC_CACHE_ENABLED:
+            from core.semantic_cache import SemanticCache
+            self._answer_cache = SemanticCache(
+                SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_TTL
+            )
+        return self._answer_cache
+
+    @property
+    def memory(self):
+        if self._memory is None:
+            from core.conversation_memory import MemoryStore
+            self._memory = MemoryStore()
+        return self._memory
+    
+    def on_status(self):
+        """Readiness summary of the background warm-up"""
+        from core.warmup import warmup
+        return warmup.summary()
     
     def on_initialize(self, fpath):
         """Handler for initialization button click"""
+        from langchain_core.messages import HumanMessage
+        from core.state import HealthAgentState
+        from core.workflow import build_health_workflow
+        from core.rag_system import rag_system
+        from utils.health_data import get_health_data
+
         print("[UI] Initialize button clicked.")
         print(f"[UI] Folder/File Path: {fpath}")
         
@@ -41,6 +77,9 @@ class EventHandlers:
                     rag_folder_path = fpath
                 print(f"[UI] Using provided path for RAG: {rag_folder_path}")
                 rag_system.setup_vectorstore(rag_folder_path)
+                if KNOWLEDGE_BUCKETED_RETRIEVAL:
+                    from agents.medical_knowledge_agent import knowledge_cache
+                    knowledge_cache.precompute()
 
             # Get data
             health_data = get_health_data()
@@ -72,8 +111,18 @@ class EventHandlers:
             traceback.print_exc()
             yield error_msg, [{"role": "assistant", "content": f"An error occurred: {error_msg}"}]
     
-    def chat_interact(self, user_message, chat_history):
-        """Chat function with streaming support"""
+    def chat_interact(self, user_message, chat_history, use_cache=True, session_id=None):
+        """
+        Chat function with streaming support; use_cache=False bypasses the semantic answer cache.
+
+        session_id (the Gradio session) selects the conversation memory that
+        supplies the token-budgeted chat history for the prompt.
+        """
+        from core.rag_system import rag_system
+        from core.llm_manager import llm_manager
+        from core.semantic_cache import context_fingerprint, replay_stream
+        from document_processor import document_text
+
         print(f"\n[CHAT] Received message: {user_message}")
         
         if not user_message or not user_message.strip():
@@ -86,18 +135,14 @@ class EventHandlers:
         if rag_system.vectorstore:
             try:
                 relevant_docs = rag_system.similarity_search(user_message)
-                context = "\n".join([doc.page_content for doc in relevant_docs])
+                context = "\n".join([document_text(doc) for doc in relevant_docs])
             except Exception as e:
                 print(f"[CHAT] Error during similarity search: {e}")
                 context = "Error retrieving relevant documents."
         
-        history_str = ""
-        for h in chat_history:
-            if h and h.get('content'):
-                if h['role'] == 'user':
-                    history_str += f"User: {h['content']}\n"
-                elif h['role'] == 'assistant':
-                    history_str += f"AI: {h['content']}\n"
+        memory = self.memory.get(session_id or "default")
+        memory.sync(chat_history)
+        history_str = memory.render()
         
         prompt = f"""You are a helpful health assistant. Provide direct, clear answers.
 
@@ -113,15 +158,44 @@ Provide a direct answer:"""
         chat_history.append({"role": "user", "content": user_message})
         chat_history.append({"role": "assistant", "content": "```"})
         
-        try:
-            for chunk in llm_manager.stream_response(prompt):
-                if chunk:
-                    chat_history[-1]["content"] += chunk
-                    yield "", chat_history
-        except Exception as e:
-            print(f"[CHAT] Error during streaming: {e}")
-            chat_history[-1]["content"] = f"Error generating response: {str(e)}"
-            yield "", chat_history
+        query_vector = fingerprint = cached_answer = None
+        if use_cache and self.answer_cache is not None:
+            try:
+                query_vector = rag_system.embed_query(user_message)
+                fingerprint = context_fingerprint(llm_manager.model_name, context, user_message, history_str)
+                cached_answer = self.answer_cache.lookup(query_vector, fingerprint)
+            except Exception as e:
+                print(f"[CHAT] Semantic cache unavailable: {e}")
+                query_vector = None
+        
+        if cached_answer is not None:
+            print(f"[CHAT] Semantic cache hit. {self.answer_cache.stats()}")
+            for chunk in replay_stream(cached_answer):
+                chat_history[-1]["content"] += chunk
+                yield "", chat_history
+            answer = cached_answer
+        else:
+            answer = ""
+            start = time.perf_counter()
+            try:
+                for chunk in llm_manager.stream_response(prompt, task="chat"):
+                    if chunk:
+                        answer += chunk
+                        chat_history[-1]["content"] += chunk
+                        yield "", chat_history
+                if answer and query_vector is not None:
+                    self.answer_cache.store(query_vector, fingerprint, answer, time.perf_counter() - start)
+            except Exception as e:
+                print(f"[CHAT] Error during streaming: {e}")
+                chat_history[-1]["content"] = f"Error generating response: {str(e)}"
+                answer = None
+                yield "", chat_history
+        # Only a completed exchange is remembered; the UI history counts as synced either way
+        if answer is not None:
+            memory.add("user", user_message)
+            if answer:
+                memory.add("assistant", answer)
+        memory.synced = len(chat_history)
         chat_history[-1]["content"] += "```"
         yield "", chat_history
         return "", chat_history
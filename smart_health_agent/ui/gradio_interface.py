@@ -68,6 +68,7 @@ def create_gradio_layout(event_handlers):
         # Header
         gr.Markdown("# Smart Health Agent")
         gr.Markdown("### GPU-accelerated personalized health recommendations with specialized agents")
+        status = gr.Markdown(event_handlers.on_status())
         
         with gr.Column(scale=1):
             # Input components
@@ -106,6 +107,7 @@ def create_gradio_layout(event_handlers):
             with gr.Row():
                 submit = gr.Button("Send Message", scale=2)
                 clear_button = gr.Button("Clear Chat", scale=1)
+                use_cache = gr.Checkbox(label="Reuse answers to similar questions", value=True, scale=1)
         
         # Bind events within the Blocks context
         init_button.click(
@@ -114,15 +116,21 @@ def create_gradio_layout(event_handlers):
             outputs=[init_output, chatbot],
         )
         
+        def chat_interact(user_message, chat_history, use_cache, request: gr.Request):
+            """chat_interact with the browser session's conversation memory"""
+            yield from event_handlers.chat_interact(
+                user_message, chat_history, use_cache, session_id=request.session_hash if request else None
+            )
+        
         msg.submit(
-            fn=event_handlers.chat_interact,
-            inputs=[msg, chatbot],
+            fn=chat_interact,
+            inputs=[msg, chatbot, use_cache],
             outputs=[msg, chatbot],
         )
         
         submit.click(
-            fn=event_handlers.chat_interact,
-            inputs=[msg, chatbot],
+            fn=chat_interact,
+            inputs=[msg, chatbot, use_cache],
             outputs=[msg, chatbot],
         )
         
@@ -131,5 +139,15 @@ def create_gradio_layout(event_handlers):
             inputs=None, 
             outputs=[chatbot, msg]
         )
+        
+        # Refresh the warm-up status while components load in the background
+        status_timer = gr.Timer(2)
+
+        def refresh_status():
+            """Warm-up summary; the timer stops once every component is ready or failed"""
+            from core.warmup import warmup
+            return event_handlers.on_status(), gr.Timer(active=not warmup.wait(0))
+
+        status_timer.tick(fn=refresh_status, inputs=None, outputs=[status, status_timer])
     
     return demo
@@ -0,0 +1,180 @@
+"""
+Caching utilities
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+def make_cache_key(*parts) -> str:
+    """Build a content-addressed key from str/bytes parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        elif not isinstance(part, (bytes, bytearray, memoryview)):
+            part = repr(part).encode("utf-8")
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+class DiskCache:
+    """
+    Persistent, size-bounded key/value cache backed by SQLite.
+
+    Values are strings. When the total stored size exceeds max_bytes, the least
+    recently used entries are evicted. Safe to share between threads and between
+    processes (each process opens its own connection).
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            conn.commit()
+            self._conn = conn
+            self._total_bytes = self._query_total_bytes()
+        return self._conn
+
+    def _query_total_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: str, default=None, max_age: float = None):
+        """Return the cached value for key, or default (also if older than max_age seconds)"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (max_age is not None and time.time() - row[1] > max_age):
+                self.misses += 1
+                return default
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str):
+        """Store a value, evicting least recently used entries if over budget"""
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        # Other processes may have written too; resync before evicting
+        self._total_bytes = self._query_total_bytes()
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC")
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries")
+            conn.commit()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process"""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU cache with an optional time-to-live.
+
+    Holds at most maxsize entries; entries older than ttl seconds (if set) are
+    treated as missing. With touch_on_read, a hit restarts the entry's ttl, so
+    entries expire ttl seconds after their last use. Keeps hit/miss counters.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None, touch_on_read: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.touch_on_read = touch_on_read
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                now = time.monotonic()
+                if self.ttl is None or now - stored_at <= self.ttl:
+                    if self.touch_on_read:
+                        self._data[key] = (value, now)
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def clear(self):
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._data)
+        }
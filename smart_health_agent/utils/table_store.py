@@ -0,0 +1,100 @@
+"""
+Columnar storage for tables extracted from PDFs
+"""
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# One row per table: its column names and its cells as strings (None kept as null)
+TABLE_SCHEMA = pa.schema([
+    ("table_id", pa.string()),
+    ("columns", pa.list_(pa.string())),
+    ("rows", pa.list_(pa.list_(pa.string())))
+])
+
+def _cell_to_str(value):
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+class TableStoreWriter:
+    """
+    Writes all tables of one document into a single Parquet file.
+
+    Each table is written as its own row group, and add() returns a
+    "<path>#<row group>" reference that is stored as the document's
+    dataframe_path and resolved by load_table.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = None
+        self._num_tables = 0
+
+    def add(self, table_id: str, df: pd.DataFrame) -> str:
+        """Append a table and return its dataframe_path reference"""
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._writer = pq.ParquetWriter(self.path, TABLE_SCHEMA, compression="zstd")
+        record = pa.Table.from_pydict({
+            "table_id": [table_id],
+            "columns": [[str(col) for col in df.columns]],
+            "rows": [[[_cell_to_str(v) for v in row] for row in df.itertuples(index=False, name=None)]]
+        }, schema=TABLE_SCHEMA)
+        self._writer.write_table(record)
+        ref = f"{self.path}#{self._num_tables}"
+        self._num_tables += 1
+        return ref
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TableStoreReader:
+    """Loads individual tables by dataframe_path, keeping recently used files memory-mapped"""
+
+    def __init__(self, max_open_files: int = 32):
+        self.max_open_files = max_open_files
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _open(self, path: str) -> pq.ParquetFile:
+        with self._lock:
+            parquet_file = self._files.get(path)
+            if parquet_file is None:
+                parquet_file = pq.ParquetFile(path, memory_map=True)
+                self._files[path] = parquet_file
+                if len(self._files) > self.max_open_files:
+                    self._files.popitem(last=False)
+            else:
+                self._files.move_to_end(path)
+            return parquet_file
+
+    def load(self, dataframe_path: str) -> pd.DataFrame:
+        """Load a table from a "<path>#<row group>" reference (or a legacy .xlsx path)"""
+        if dataframe_path.lower().endswith(".xlsx"):
+            return pd.read_excel(dataframe_path, index_col=0)
+        path, _, row_group = dataframe_path.rpartition("#")
+        record = self._open(path).read_row_group(int(row_group)).to_pylist()[0]
+        return pd.DataFrame(record["rows"], columns=record["columns"])
+
+_reader = TableStoreReader()
+
+def load_table(dataframe_path: str) -> pd.DataFrame:
+    """Lazily load one extracted table from the table store"""
+    return _reader.load(dataframe_path)